@@ -12,42 +12,299 @@ import numpy as np
 from datetime import datetime
 import warnings
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from turkish_dates import add_parsed_dates
+from review_loader import load_reviews
+from review_store import ReviewStore
+from profiling import profiler, report_path
+from table_io import BASE_METRICS_SCHEMA, intermediate_path, read_table, write_table
+from product_aggregates import (ACTIVITY_WINDOWS, TIME_RELATIVE_COLUMNS, WINDOW_COLUMNS,
+                                ProductAggregates, to_day_numbers)
 warnings.filterwarnings('ignore')
 
+def _segment_sums(values, starts, counts):
+    """
+    Ardışık segmentlerin toplamı; her segmentte chunk.sum() ile BİREBİR aynı
+    numpy'nin ikili (pairwise) toplama sırası segment uzunluğuna bağlı (np.add.reduceat
+    sıralı toplar, son bitte ayrışır): aynı uzunluktaki segmentler tek (m, k) matriste
+    satır satır toplanır → döngü ürün sayısı değil farklı yorum sayısı kadar döner
+    """
+    sums = np.zeros(len(starts))
+    for length in np.unique(counts):
+        groups = np.flatnonzero(counts == length)
+        sums[groups] = values[starts[groups, None] + np.arange(length)].sum(axis=1)
+    return sums
+
+
+def _exact_group_std(values, starts, counts):
+    """
+    Ürün bazlı Series.std() ile BİREBİR aynı standart sapma
+    (pandas'ın iki geçişli varyans algoritması + numpy'nin toplama sırası)
+    """
+    filled = np.where(np.isnan(values), 0.0, values)
+    valid = ~np.isnan(values)
+    
+    valid_counts = np.add.reduceat(valid.astype(np.int64), starts)
+    sums = _segment_sums(filled, starts, counts)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg = sums / valid_counts
+        sqr = (np.repeat(avg, counts) - filled) ** 2
+        sqr[~valid] = 0
+        sq_sums = _segment_sums(sqr, starts, counts)
+        variance = sq_sums / (valid_counts - 1)
+    
+    variance[valid_counts - 1 <= 0] = np.nan
+    return np.sqrt(variance)
+
+
+def _grouped_slope(t, r, codes, n_groups):
+    """
+    Ürün bazlı en küçük kareler eğimi (puan ~ gün), tüm ürünler için tek geçişte
+    """
+    rated = ~np.isnan(r)
+    t, r, codes = t[rated], r[rated], codes[rated]
+    
+    counts = np.bincount(codes, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t_mean = np.bincount(codes, weights=t, minlength=n_groups) / counts
+        r_mean = np.bincount(codes, weights=r, minlength=n_groups) / counts
+        dt = t - t_mean[codes]
+        dr = r - r_mean[codes]
+        sxx = np.bincount(codes, weights=dt * dt, minlength=n_groups)
+        sxy = np.bincount(codes, weights=dt * dr, minlength=n_groups)
+        return np.where(sxx > 0, sxy / sxx, np.nan)
+
+
+def build_product_features(df, reference_date=None):
+    """
+    Tüm ürünlerin TEMEL özelliklerini tek bir gruplu geçişte hesapla
+    Ürün sırası: yorum tablosundaki ilk görülme sırası (Ürün.unique() ile aynı)
+    reference_date: pencere kolonlarının referansı (varsayılan: en son yorum tarihi)
+    """
+    df = df[df['Ürün'].notna()]
+    codes, products = pd.factorize(df['Ürün'], sort=False)
+    
+    # Ürünleri ardışık bloklara diz (stabil sıralama → ürün içi sıra korunur)
+    order = np.argsort(codes, kind='stable')
+    counts = np.bincount(codes, minlength=len(products))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    
+    first_rows = df.drop_duplicates(subset='Ürün')
+    puan = df['Puan']
+    grouped_puan = puan.groupby(codes)
+    grouped_dates = df['parsed_date'].groupby(codes)
+    
+    def ratio(mask):
+        return mask.groupby(codes).sum().to_numpy() / counts
+    
+    # Yorum hızı (günlük): tüm yorumları aynı günde olan ürünlerde yorum sayısı
+    date_range = (grouped_dates.max() - grouped_dates.min()).dt.days.to_numpy()
+    if (date_range == 0).all():
+        velocity = counts.copy()
+    else:
+        with np.errstate(divide='ignore'):
+            velocity = np.where(date_range == 0, counts, counts / date_range)
+    
+    # Zaman pencereli aktivite (referans: veri setindeki en son yorum tarihi)
+    days = to_day_numbers(df['parsed_date'])
+    reference_day = days.max() if reference_date is None else to_day_numbers(reference_date)
+    age = reference_day - days
+    windows = {
+        col: np.bincount(codes, weights=age < w, minlength=len(products)).astype('int64')
+        for w, col in zip(ACTIVITY_WINDOWS, WINDOW_COLUMNS)
+    }
+    slope = _grouped_slope(
+        days.astype('float64'), puan.to_numpy(dtype='float64', na_value=np.nan), codes, len(products)
+    )
+    last_review_age = reference_day - to_day_numbers(grouped_dates.max())
+    
+    return pd.DataFrame({
+        'Ürün': products,
+        'Marka': first_rows['Marka'].to_numpy(),
+        
+        # Genel metrikler
+        'Genel_Puan': first_rows['Genel Puan'].to_numpy(),
+        'Toplam_Yorum_Sayisi': counts,
+        'Puan_Standart_Sapma': _exact_group_std(
+            puan.to_numpy(dtype='float64')[order], starts, counts
+        ),
+        'Min_Puan': grouped_puan.min().to_numpy(),
+        'Max_Puan': grouped_puan.max().to_numpy(),
+        
+        # Puan dağılımı
+        'Puan_5_Oran': ratio(puan == 5),
+        'Puan_4_Oran': ratio(puan == 4),
+        'Puan_3_Oran': ratio(puan == 3),
+        'Puan_2_Oran': ratio(puan == 2),
+        'Puan_1_Oran': ratio(puan == 1),
+        
+        # Negatif/Pozitif oranlar
+        'Negatif_Yorum_Oran': ratio(puan <= 2),
+        'Pozitif_Yorum_Oran': ratio(puan >= 4),
+        
+        # Yorum hızı (günlük)
+        'Yorum_Hizi': velocity,
+        
+        # Son 7/30/90 gün yorum sayısı, puan trendi (puan/gün), son yorumdan geçen gün
+        **windows,
+        'Puan_Trend_Egim': slope,
+        'Son_Yorumdan_Gun': last_review_age.astype('int64'),
+    })
+
+
+# Özellik hesabı için gereken kolonlar (worker'lara sadece bunlar gönderilir)
+FEATURE_INPUT_COLUMNS = ['Ürün', 'Marka', 'Genel Puan', 'Puan', 'parsed_date']
+
+
+def build_product_features_parallel(df, n_workers):
+    """
+    Yorumları Ürün hash'ine göre n_workers parçaya böl, her parçayı ayrı
+    process'te hesapla ve tek process çıktısıyla AYNI sırada birleştir
+    """
+    df = df.loc[df['Ürün'].notna(), FEATURE_INPUT_COLUMNS]
+    
+    # Deterministik hash (Python hash() gibi process'e göre değişmez)
+    partition = pd.util.hash_pandas_object(df['Ürün'], index=False).to_numpy() % n_workers
+    partitions = [df[partition == i] for i in range(n_workers)]
+    partitions = [part for part in partitions if len(part) > 0]
+    
+    # Pencere referansı tüm veri için ortak olmalı (parça bazlı değil)
+    compute = partial(build_product_features, reference_date=df['parsed_date'].max())
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        results = list(executor.map(compute, partitions))
+    
+    # Ürün sırası: ilk görülme sırası (tek process ile aynı)
+    product_order = df['Ürün'].unique()
+    combined = pd.concat(results, ignore_index=True).set_index('Ürün')
+    return combined.loc[product_order].reset_index()
+
+
 class LeakFreeProductPreparator:
 
     
-    def __init__(self, csv_path):
-        self.df = pd.read_csv(csv_path, encoding='utf-8-sig')
+    def __init__(self, csv_path, chunksize=None, state_path=None, n_workers=1):
+        """
+        chunksize: verilirse ham CSV parça parça okunur (streaming mod),
+        bellek kullanımı dosya boyutuyla değil parça boyutuyla sınırlı kalır
+        state_path: verilirse artımlı (incremental) mod - sadece son çalıştırmadan
+        sonra eklenen yorumlar okunur, sadece etkilenen ürünler güncellenir
+        n_workers: 1'den büyükse ürün özellikleri çok çekirdekte hesaplanır
+        """
+        self.csv_path = csv_path
+        self.chunksize = chunksize
+        self.state_path = state_path
+        self.n_workers = n_workers
+        
+        streaming = chunksize or state_path
+        if streaming:
+            self.df = None
+        else:
+            with profiler.stage('load_reviews') as stage:
+                self.df = load_reviews(csv_path)
+                stage['rows_out'] = len(self.df)
+        self.aggregates = None
         self.product_features = None
         
+        # Artımlı mod durumu
+        self.rows_consumed = 0
+        self.changed_products = None
+        self.watermark_advanced = False
+        
     def parse_turkish_dates(self):
         """Türkçe tarihleri datetime'a çevir"""
         print("📅 Tarih parsing işlemi başlıyor...")
         
-        month_mapping = {
-            'Ocak': 'January', 'Şubat': 'February', 'Mart': 'March',
-            'Nisan': 'April', 'Mayıs': 'May', 'Haziran': 'June',
-            'Temmuz': 'July', 'Ağustos': 'August', 'Eylül': 'September',
-            'Ekim': 'October', 'Kasım': 'November', 'Aralık': 'December'
-        }
-        
-        def convert_date(date_str):
-            if pd.isna(date_str):
-                return None
-            for tr, en in month_mapping.items():
-                date_str = date_str.replace(tr, en)
-            try:
-                return pd.to_datetime(date_str, format='%d %B %Y')
-            except:
-                return None
-        
-        self.df['parsed_date'] = self.df['Tarih'].apply(convert_date)
-        self.df = self.df.dropna(subset=['parsed_date'])
+        if self.state_path:
+            self._update_aggregates_from_state()
+            return
+        
+        if self.chunksize:
+            self.aggregates, _ = self._stream_aggregates()
+            return
+        
+        with profiler.stage('date_parsing', rows_in=len(self.df)) as stage:
+            self.df, dropped = add_parsed_dates(self.df)
+            stage['rows_out'] = len(self.df)
         
         print(f"✅ {len(self.df):,} satır başarıyla tarih parse edildi")
+        print(f"   Atılan satır (parse edilemeyen tarih): {dropped:,}")
         print(f"   Tarih Aralığı: {self.df['parsed_date'].min()} → {self.df['parsed_date'].max()}")
         
+    def _stream_aggregates(self, skip_rows=0):
+        """
+        Ham CSV'yi parça parça oku, her parçada tarihleri parse et ve
+        ürün bazlı kısmi agregaları birleştir
+        skip_rows: baştan atlanacak veri satırı sayısı (artımlı mod)
+        Returns: (aggregates, okunan_ham_satir)
+        """
+        aggregates = ProductAggregates()
+        total_rows, total_dropped, row_offset = 0, 0, skip_rows
+        
+        reader = pd.read_csv(
+            self.csv_path,
+            encoding='utf-8-sig',
+            skiprows=range(1, skip_rows + 1),
+            chunksize=self.chunksize
+        )
+        chunks = reader if self.chunksize else [reader]
+        
+        for chunk in chunks:
+            raw_rows = len(chunk)
+            with profiler.stage('date_parsing', rows_in=raw_rows) as stage:
+                chunk, dropped = add_parsed_dates(chunk)
+                stage['rows_out'] = len(chunk)
+            
+            # Parça pozisyonları ham dosya sırasına göre (ürün sırası korunur)
+            with profiler.stage('chunk_aggregation', rows_in=len(chunk)) as stage:
+                chunk = chunk.reset_index(drop=True)
+                partial_aggregates = ProductAggregates.from_reviews(chunk, row_offset=row_offset)
+                aggregates = aggregates.merge(partial_aggregates)
+                stage['rows_out'] = len(partial_aggregates)
+            
+            total_rows += len(chunk)
+            total_dropped += dropped
+            row_offset += raw_rows
+        
+        mode = f"streaming, parça: {self.chunksize:,}" if self.chunksize else "tek parça"
+        print(f"✅ {total_rows:,} satır başarıyla tarih parse edildi ({mode})")
+        print(f"   Atılan satır (parse edilemeyen tarih): {total_dropped:,}")
+        if len(aggregates) > 0:
+            date_min, date_max = aggregates.date_range
+            print(f"   Tarih Aralığı: {date_min} → {date_max}")
+        
+        return aggregates, row_offset - skip_rows
+        
+    def _update_aggregates_from_state(self):
+        """
+        Kayıtlı durumu yükle, sadece yeni eklenen satırları oku ve birleştir
+        """
+        state = ProductAggregates.load_state(self.state_path)
+        
+        if state is None:
+            print("📂 Durum dosyası bulunamadı → tüm veri işlenecek")
+            self.aggregates, self.rows_consumed = self._stream_aggregates()
+            return
+        
+        previous, rows_consumed, watermark = state
+        print(f"📂 Durum dosyası: {len(previous):,} ürün, {rows_consumed:,} satır işlenmiş")
+        print(f"   Tarih watermark: {watermark}")
+        
+        new_aggregates, new_rows = self._stream_aggregates(skip_rows=rows_consumed)
+        
+        self.changed_products = new_aggregates.table.index
+        self.aggregates = previous.merge(new_aggregates)
+        self.rows_consumed = rows_consumed + new_rows
+        
+        if len(new_aggregates) > 0:
+            new_watermark = self.aggregates.date_range[1]
+            self.watermark_advanced = pd.isna(watermark) or new_watermark > watermark
+            if pd.notna(watermark) and new_aggregates.date_range[0] < watermark:
+                print(f"   ⚠️ Yeni satırlarda watermark'tan eski tarihler var (geç eklenen yorumlar)")
+            print(f"   Yeni watermark: {new_watermark}")
+        print(f"   Etkilenen ürün: {len(self.changed_products):,}")
+        
     def create_product_features(self):
         """
         Her ürün için TEMEL özellikleri oluştur
@@ -55,55 +312,80 @@ class LeakFreeProductPreparator:
         """
         print(f"\n🔧 Ürün özellikleri oluşturuluyor...")
         
-        product_stats = []
+        with profiler.stage('product_features', rows_in=None if self.df is None else len(self.df)) as stage:
+            self._compute_product_features()
+            stage['rows_out'] = len(self.product_features)
+        print(f"✅ {len(self.product_features)} ürün için özellikler oluşturuldu")
         
-        for product_name in self.df['Ürün'].unique():
-            product_df = self.df[self.df['Ürün'] == product_name].copy()
-            
-            # ✅ SADECE BAĞIMSIZ ÖZELLİKLER
-            stats = {
-                'Ürün': product_name,
-                'Marka': product_df['Marka'].iloc[0],
-                
-                # Genel metrikler
-                'Genel_Puan': product_df['Genel Puan'].iloc[0],
-                'Toplam_Yorum_Sayisi': len(product_df),
-                'Puan_Standart_Sapma': product_df['Puan'].std(),
-                'Min_Puan': product_df['Puan'].min(),
-                'Max_Puan': product_df['Puan'].max(),
-                
-                # Puan dağılımı
-                'Puan_5_Oran': (product_df['Puan'] == 5).sum() / len(product_df),
-                'Puan_4_Oran': (product_df['Puan'] == 4).sum() / len(product_df),
-                'Puan_3_Oran': (product_df['Puan'] == 3).sum() / len(product_df),
-                'Puan_2_Oran': (product_df['Puan'] == 2).sum() / len(product_df),
-                'Puan_1_Oran': (product_df['Puan'] == 1).sum() / len(product_df),
-                
-                # Negatif/Pozitif oranlar
-                'Negatif_Yorum_Oran': (product_df['Puan'] <= 2).sum() / len(product_df),
-                'Pozitif_Yorum_Oran': (product_df['Puan'] >= 4).sum() / len(product_df),
-                
-                # Yorum hızı (günlük)
-                'Yorum_Hizi': self._calculate_review_velocity(product_df),
-            }
-            
-            product_stats.append(stats)
+    def _compute_product_features(self):
+        if self.changed_products is not None:
+            # Artımlı mod: sadece yeni yorum alan ürünler yeniden hesaplanır
+            changed = self.aggregates.subset(self.changed_products)
+            self.product_features = changed.to_features(reference_date=self.aggregates.date_range[1])
+        elif self.aggregates is not None:
+            self.product_features = self.aggregates.to_features()
+        elif self.n_workers > 1:
+            print(f"   ⚡ Paralel mod: {self.n_workers} worker")
+            self.product_features = build_product_features_parallel(self.df, self.n_workers)
+        else:
+            self.product_features = build_product_features(self.df)
         
-        self.product_features = pd.DataFrame(product_stats)
-        print(f"✅ {len(self.product_features)} ürün için özellikler oluşturuldu")
+    def export_review_store(self, store_root):
+        """
+        Parse edilmiş yorumları Phase 2 için mmap yorum deposuna yaz
+        (ham dosyanın hash'i ile anahtarlanır, llm_extraction.py tekrar parse etmez)
+        """
+        if self.df is None:
+            print("⚠️ Yorum deposu sadece bellek içi modda oluşturulur (streaming/artımlı modda atlandı)")
+            return None
+        with profiler.stage('review_store', rows_in=len(self.df)):
+            return ReviewStore.open_or_build(self.csv_path, store_root, df_reviews=self.df)
+        
+    def _patch_existing_output(self, output_path):
+        """
+        Mevcut çıktıda sadece değişen ürünlerin satırlarını güncelle,
+        yeni ürünleri sona ekle. Diğer satırlara dokunulmaz.
+        """
+        existing = read_table(output_path, schema=BASE_METRICS_SCHEMA)
+        updates = self.product_features.set_index('Ürün')
         
-    def _calculate_review_velocity(self, product_df):
-        """Günlük ortalama yorum sayısı"""
-        date_range = (product_df['parsed_date'].max() - product_df['parsed_date'].min()).days
-        if date_range == 0:
-            return len(product_df)
-        return len(product_df) / date_range
+        is_changed = existing['Ürün'].isin(updates.index)
+        changed_names = existing.loc[is_changed, 'Ürün']
+        patched = existing.copy()
+        for col in updates.columns:
+            patched.loc[is_changed, col] = updates.loc[changed_names, col].to_numpy()
+        
+        new_products = self.product_features[~self.product_features['Ürün'].isin(existing['Ürün'])]
+        patched = pd.concat([patched, new_products], ignore_index=True)
+        
+        print(f"   Güncellenen: {is_changed.sum():,} ürün, Yeni: {len(new_products):,} ürün, "
+              f"Dokunulmayan: {(~is_changed).sum():,} ürün")
+        
+        # Referans tarih ilerlediyse pencere kolonları tüm ürünlerde kaydı:
+        # sadece bu kolonlar durumdan (ham veri okunmadan) yenilenir
+        if self.watermark_advanced:
+            refreshed = self.aggregates.to_features().set_index('Ürün')
+            for col in TIME_RELATIVE_COLUMNS:
+                patched[col] = refreshed.loc[patched['Ürün'], col].to_numpy()
+            print(f"   Watermark ilerledi → {', '.join(TIME_RELATIVE_COLUMNS)} tüm ürünlerde yenilendi")
+        return patched
         
     def save_processed_data(self, output_path):
         """İşlenmiş veriyi kaydet"""
-        self.product_features.to_csv(output_path, index=False, encoding='utf-8-sig')
+        if self.changed_products is not None and os.path.exists(output_path):
+            self.product_features = self._patch_existing_output(output_path)
+        elif self.changed_products is not None:
+            # Çıktı silinmişse tüm ürünleri durumdan yeniden üret
+            self.product_features = self.aggregates.to_features()
+        
+        with profiler.stage('save', rows_in=len(self.product_features)):
+            write_table(self.product_features, output_path, schema=BASE_METRICS_SCHEMA)
         print(f"\n💾 Veri kaydedildi: {output_path}")
         
+        if self.state_path:
+            self.aggregates.save_state(self.state_path, self.rows_consumed)
+            print(f"💾 Durum kaydedildi: {self.state_path}")
+        
         # Özet istatistikler
         print(f"\n📈 ÖZET İSTATİSTİKLER:")
         print(self.product_features[['Genel_Puan', 'Negatif_Yorum_Oran', 
@@ -123,15 +405,31 @@ if __name__ == "__main__":
     
     # Dosya yollarını göreceli olarak oluştur
     input_path = os.path.join(project_root, 'data', 'raw', 'sample_dataset.csv')
-    output_path = os.path.join(project_root, 'data', 'processed', 'base_metrics.csv')
+    output_path = intermediate_path(project_root, 'base_metrics')
+    review_store_root = os.path.join(project_root, 'data', 'processed', 'review_store')
+    
+    # Artımlı mod için durum dosyası (None → her seferinde baştan hesapla)
+    state_path = None  # örn. os.path.join(project_root, 'data', 'processed', 'base_metrics_state.pkl')
     
-    preparator = LeakFreeProductPreparator(input_path)
+    # Büyük dosyalar için parça boyutu verin (örn. chunksize=1_000_000)
+    preparator = LeakFreeProductPreparator(
+        input_path,
+        chunksize=None,
+        state_path=state_path,
+        n_workers=1  # Çok çekirdekli makinelerde örn. os.cpu_count()
+    )
     
     preparator.parse_turkish_dates()
     preparator.create_product_features()
     
     df_phase1 = preparator.save_processed_data(output_path)
     
+    # Phase 2 için yorum deposu (ham veri değişmedikçe bir kez oluşturulur)
+    preparator.export_review_store(review_store_root)
+    
+    # CHURN_PROFILE=1 ise aşama süre/bellek raporu
+    profiler.write_report(report_path(project_root, 'base_metrics'))
+    
  
     print("\n📌 SONRAKI ADIM:")
     print("python llm_extraction.py")
\ No newline at end of file
@@ -0,0 +1,298 @@
+"""
+==================================================================================
+LLM ÖZELLİK ÇIKARMA YÜK TESTİ (SAHTE API İLE, KREDİ HARCAMADAN)
+==================================================================================
+Sentetik ürün/yorum verisi üretir, Phase 1'i (base metrics + yorum deposu)
+çalıştırır ve process_all_products'ı yerel FakeAnthropicServer'a karşı ölçer:
+
+- ürün/saniye (process_all_products duvar saati)
+- checkpoint maliyeti: ürün başına depoya yazma (save_result) ve sondaki
+  compact (compact_results) süreleri
+- tepe bellek (RSS)
+
+Her boyut için veri üretimi + Phase 1 bir alt süreçte, ölçülen
+process_all_products ise ayrı bir alt süreçte çalışır; böylece tepe RSS sadece
+Phase 2'yi (extractor kurulumu + işleme) kapsar ve boyutlar arasında birikmez.
+Sahte sunucu da ayrı bir süreçtedir (aynı süreçte GIL için yarışıp ölçülen
+gecikmeyi şişirmesin). Sonuçlar outputs/benchmark/llm_extraction_<zaman>.json'a
+yazılır.
+
+Kullanım:
+    python benchmark_llm_extraction.py                          # 1k, 10k, 100k
+    python benchmark_llm_extraction.py --sizes 1000 --concurrency 32 \\
+        --latency-median 0.2 --rate-limit-rate 0.02 --malformed-rate 0.01
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from profiling import profiler, _current_rss_mb, _peak_rss_mb
+
+
+TURKISH_MONTHS = ['Ocak', 'Şubat', 'Mart', 'Nisan', 'Mayıs', 'Haziran',
+                  'Temmuz', 'Ağustos', 'Eylül', 'Ekim', 'Kasım', 'Aralık']
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+def make_synthetic_reviews(template_csv, n_products, output_csv, min_comments=3, max_comments=40, seed=0):
+    """
+    Örnek veri setindeki yorumları şablon olarak kullanıp n_products ürünlük ham CSV üret
+    Her ürünün bir kalite oranı var: yorumlar bu oranla olumlu (Puan >= 4) ya da
+    olumsuz (Puan <= 2) şablonlardan seçilir
+    Returns: satır sayısı
+    """
+    rng = np.random.default_rng(seed)
+    templates = pd.read_csv(template_csv, encoding='utf-8-sig')
+    good = templates[templates['Puan'] >= 4].reset_index(drop=True)
+    bad = templates[templates['Puan'] <= 2].reset_index(drop=True)
+
+    counts = rng.integers(min_comments, max_comments + 1, size=n_products)
+    product_idx = np.repeat(np.arange(n_products), counts)
+    quality = rng.random(n_products)[product_idx]
+    is_good = rng.random(len(product_idx)) < quality
+
+    rows = pd.concat([
+        good.iloc[rng.integers(0, len(good), size=int(is_good.sum()))],
+        bad.iloc[rng.integers(0, len(bad), size=int((~is_good).sum()))],
+    ], ignore_index=True)
+    order = np.concatenate([np.flatnonzero(is_good), np.flatnonzero(~is_good)])
+    rows.index = order
+    rows = rows.sort_index()
+
+    rows['Ürün'] = [f"Sentetik Ürün {i:06d}" for i in product_idx]
+    rows['Tarih'] = [f"{day} {TURKISH_MONTHS[month]} 2025" for day, month in
+                     zip(rng.integers(1, 29, size=len(rows)), rng.integers(0, 12, size=len(rows)))]
+    rows.to_csv(output_csv, index=False, encoding='utf-8-sig')
+    return len(rows)
+
+
+def _serve(port, args):
+    """Sahte API sunucusunu bu süreçte çalıştır (benchmark'tan ayrı süreç)"""
+    from fake_anthropic_server import FakeAnthropicServer, lognormal_latency
+
+    server = FakeAnthropicServer(
+        port=port,
+        latency_fn=lognormal_latency(args.latency_median, args.latency_sigma, args.seed) if args.latency_median else None,
+        rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+        malformed_rate=args.malformed_rate, seed=args.seed
+    )
+    server.serve_forever()
+
+
+def start_server_process(args, timeout=10.0):
+    """
+    Sunucuyu boş bir portta ayrı süreçte başlat, bağlantı kabul edene kadar bekle
+    Returns: (süreç, base_url)
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    process = multiprocessing.Process(target=_serve, args=(port, args), daemon=True)
+    process.start()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            if time.monotonic() > deadline or not process.is_alive():
+                process.terminate()
+                raise RuntimeError(f"Sahte API sunucusu başlatılamadı (port {port})")
+            time.sleep(0.05)
+
+
+def _inputs(workdir):
+    """(ham CSV, base metrics, yorum deposu) yolları"""
+    return (os.path.join(workdir, 'reviews.csv'), os.path.join(workdir, 'base_metrics.csv'),
+            os.path.join(workdir, 'review_store'))
+
+
+def prepare_inputs(n_products, workdir, args):
+    """
+    Sentetik veri + Phase 1 (base metrics + yorum deposu); ölçülen süreçten ayrı
+    bir alt süreçte çalışır ki tepe RSS'e karışmasın
+    Returns: hazırlık sözlüğü
+    """
+    from base_metrics import LeakFreeProductPreparator
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    raw_csv, base_csv, store_root = _inputs(workdir)
+
+    start = time.perf_counter()
+    n_reviews = make_synthetic_reviews(os.path.join(project_root, 'data', 'raw', 'sample_dataset.csv'),
+                                       n_products, raw_csv, seed=args.seed)
+    generate_s = time.perf_counter() - start
+
+    # Phase 1: base metrics + yorum deposu (ölçüme dahil değil, sadece süresi raporlanır)
+    start = time.perf_counter()
+    preparator = LeakFreeProductPreparator(raw_csv)
+    preparator.parse_turkish_dates()
+    preparator.create_product_features()
+    preparator.save_processed_data(base_csv)
+    preparator.export_review_store(store_root)
+    phase1_s = time.perf_counter() - start
+    return {'reviews': n_reviews, 'generate_s': generate_s, 'phase1_s': phase1_s,
+            'phase1_peak_rss_mb': _peak_rss_mb()}
+
+
+def run_one(n_products, workdir, args):
+    """
+    Tek boyut için process_all_products ölçümü (prepare_inputs'tan sonra, ayrı alt süreçte)
+    Returns: sonuç sözlüğü
+    """
+    from llm_extraction import LLMFeatureExtractor
+
+    raw_csv, base_csv, store_root = _inputs(workdir)
+    rss_start = _current_rss_mb()
+    profiler.enabled = True
+    server_process, base_url = start_server_process(args)
+    try:
+        extractor = LLMFeatureExtractor(
+            original_csv_path=raw_csv,
+            product_features_csv_path=base_csv,
+            output_path=os.path.join(workdir, 'llm_results.csv'),
+            api_key='benchmark',
+            base_url=base_url,
+            review_store_root=store_root
+        )
+        start = time.perf_counter()
+        extractor.process_all_products(
+            delay=0.0,
+            max_concurrency=args.concurrency,
+            pack_token_budget=args.pack_token_budget
+        )
+        process_s = time.perf_counter() - start
+        extractor.finalize_and_save(os.path.join(workdir, 'llm_extraction.csv'))
+    finally:
+        server_process.terminate()
+        server_process.join()
+
+    stages = profiler.stages
+    saved = len(extractor.result_store)
+    checkpoint_s = stages.get('save_result', {}).get('wall_s', 0.0)
+    # Ürün başına işlerin toplam thread süresi (eşzamanlı modda duvar saatinden büyük olabilir)
+    per_product_s = sum(stages.get(name, {}).get('wall_s', 0.0)
+                        for name in ('extract_comments', 'llm_call', 'llm_call_packed', 'save_result'))
+    metrics = extractor.metrics.summary()
+    rss_end = _current_rss_mb()
+    return {
+        'products': n_products,
+        'saved': saved,
+        'process_s': process_s,
+        'products_per_s': saved / process_s if process_s else None,
+        'api_calls': extractor.api_calls,
+        'retries': extractor.retries,
+        'dead_letters': len(extractor.dead_letters),
+        'checkpoint_s': checkpoint_s,
+        'checkpoint_ms_per_product': checkpoint_s / saved * 1000 if saved else None,
+        'checkpoint_share': checkpoint_s / per_product_s if per_product_s else None,
+        'compact_s': stages.get('compact_results', {}).get('wall_s', 0.0),
+        'invalid_responses': metrics['errors'] - len(extractor.dead_letters),
+        'latency_s': metrics['latency_s'],
+        # Bu alt süreç sadece Phase 2'yi çalıştırır (import'lar dahil)
+        'peak_rss_mb': _peak_rss_mb(),
+        'rss_start_mb': rss_start,
+        'rss_delta_mb': rss_end - rss_start if rss_end is not None and rss_start is not None else None,
+    }
+
+
+def _child_args(args):
+    """Alt sürece aynı ölçüm ayarlarını geçir"""
+    return ['--concurrency', str(args.concurrency),
+            '--latency-median', str(args.latency_median), '--latency-sigma', str(args.latency_sigma),
+            '--rate-limit-rate', str(args.rate_limit_rate), '--retry-after', str(args.retry_after),
+            '--malformed-rate', str(args.malformed_rate), '--seed', str(args.seed),
+            *(['--pack-token-budget', str(args.pack_token_budget)] if args.pack_token_budget else [])]
+
+
+def _run_child(step_flag, n_products, workdir, args):
+    """Adımı yeni bir Python sürecinde çalıştır (tepe RSS adımlar arasında taşınmaz)"""
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        result_path = f.name
+    env = {**os.environ, 'TQDM_DISABLE': '' if args.verbose else '1'}
+    try:
+        subprocess.run([sys.executable, os.path.abspath(__file__), step_flag, str(n_products),
+                        '--workdir', workdir, '--result-path', result_path, *_child_args(args),
+                        *(['--verbose'] if args.verbose else [])],
+                       check=True, env=env)
+        with open(result_path, encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(result_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="process_all_products yük testi (sahte API)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--latency-median', type=float, default=0.02, help="saniye (0 = beklemesiz)")
+    parser.add_argument('--latency-sigma', type=float, default=0.5)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=float, default=0.1)
+    parser.add_argument('--malformed-rate', type=float, default=0.0)
+    parser.add_argument('--pack-token-budget', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="sonuç JSON yolu")
+    parser.add_argument('--verbose', action='store_true', help="alt süreç çıktılarını göster")
+    parser.add_argument('--prepare', type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--run-one', type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--result-path', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Alt süreç: hazırlık ya da ölçüm, sonucu dosyaya yaz
+    if args.prepare is not None or args.run_one is not None:
+        step, n_products = (prepare_inputs, args.prepare) if args.prepare is not None else (run_one, args.run_one)
+        if args.verbose:
+            result = step(n_products, args.workdir, args)
+        else:
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                result = step(n_products, args.workdir, args)
+        with open(args.result_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        return
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = args.output or os.path.join(
+        project_root, 'outputs', 'benchmark',
+        f"llm_extraction_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+
+    print(f"🏁 Yük testi: {args.sizes} ürün, {args.concurrency} eşzamanlı istek, "
+          f"medyan gecikme {args.latency_median}s, 429 %{args.rate_limit_rate*100:g}, "
+          f"bozuk JSON %{args.malformed_rate*100:g}")
+    results = []
+    for n_products in args.sizes:
+        with tempfile.TemporaryDirectory(prefix='llm_bench_') as workdir:
+            prepared = _run_child('--prepare', n_products, workdir, args)
+            result = {**_run_child('--run-one', n_products, workdir, args), **prepared}
+        results.append(result)
+        print(f"   {n_products:>7,} ürün: {result['products_per_s']:8.1f} ürün/s, "
+              f"checkpoint {result['checkpoint_ms_per_product']:.2f} ms/ürün "
+              f"(%{result['checkpoint_share']*100:.1f}), compact {result['compact_s']:.2f}s, "
+              f"tepe RSS {result['peak_rss_mb']:.0f} MB"
+              + (f" (işleme sırasında {result['rss_delta_mb']:+.0f} MB)" if result['rss_delta_mb'] is not None else ""))
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'settings': {key: value for key, value in vars(args).items()
+                                if key not in ('prepare', 'run_one', 'workdir', 'result_path',
+                                               'output', 'verbose')},
+                   'results': results}, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 Yük testi sonuçları kaydedildi: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+==================================================================================
+YORUM SEÇİMİ: TEKRAR BİRLEŞTİRME + TOKEN BÜTÇESİ
+==================================================================================
+Şablon gibi tekrarlanan yorumlar ("kumaşı çok kalitesiz", "Görselle alakası yok")
+prompt'u şişirir ama yeni bilgi taşımaz. Aynı ve çok benzer yorumlar tek satırda
+"(×17) kumaşı çok kalitesiz" olarak birleştirilir; sayı korunduğu için prompt'un
+dayandığı şikayet oranları (%20 kuralı) değişmez.
+
+Benzerlik: normalize edilmiş metnin karakter 3-gram kümeleri üzerinde Jaccard.
+"""
+
+import re
+
+from rate_limit import estimate_tokens
+
+
+NEAR_DUPLICATE_THRESHOLD = 0.8
+
+_TURKISH_UPPER = str.maketrans({'I': 'ı', 'İ': 'i'})
+_NON_WORD = re.compile(r'[^\w\s]+')
+_REPEATED_CHAR = re.compile(r'(.)\1{2,}')
+_WHITESPACE = re.compile(r'\s+')
+_DOUBLE_SPACE = re.compile(r' {2,}')
+_LINE_EDGE = re.compile(r' ?\n ?')
+
+
+def normalize_comment(text):
+    """
+    Karşılaştırma anahtarı: Türkçe küçük harf, noktalama yok,
+    uzatılmış harfler kısaltılmış ("çoook" → "çok"), tek boşluk
+    """
+    text = str(text).translate(_TURKISH_UPPER).lower()
+    text = _NON_WORD.sub(' ', text)
+    text = _REPEATED_CHAR.sub(r'\1', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def normalize_comments(comments):
+    """
+    Geçerli yorumları tek seferde normalize et (yorum başına bir satır)
+    Satırlar normalize_comment çıktısıyla aynıdır; regex'ler yorum başına
+    değil ürün başına bir kez çalışır
+    Returns: (metin, geçerli yorum sayısı)
+    """
+    # Satır içi boşluklar baştan tek boşluğa indirilir; sonrasında metinde yalnızca ' ' ve '\n' kalır
+    lines = [' '.join(str(c).split()) for c in comments if _is_valid(c)]
+    # str.translate Türkçe metinde iki replace'ten çok daha yavaş
+    text = '\n'.join(lines).replace('I', 'ı').replace('İ', 'i').lower()
+    text = _NON_WORD.sub(' ', text)
+    text = _REPEATED_CHAR.sub(r'\1', text)
+    text = _DOUBLE_SPACE.sub(' ', text)
+    return _LINE_EDGE.sub('\n', text).strip(' '), len(lines)
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _is_valid(comment):
+    return comment is not None and comment == comment and str(comment) != 'HATA'
+
+
+def group_comments(comments, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """
+    Aynı / benzer yorumları grupla
+    Returns: [(temsilci yorum, adet), ...] ilk görülme sırasıyla
+             (temsilci = gruptaki ilk, yani en güncel yorum)
+    """
+    groups = []       # [temsilci, adet, trigramlar]
+    exact = {}        # normalize metin → grup indeksi
+    for comment in comments:
+        if not _is_valid(comment):
+            continue
+        key = normalize_comment(comment)
+        if key in exact:
+            groups[exact[key]][1] += 1
+            continue
+
+        grams = _trigrams(key)
+        match = None
+        if threshold < 1.0:
+            for i, (_, _, other) in enumerate(groups):
+                union = len(grams | other)
+                if union and len(grams & other) / union >= threshold:
+                    match = i
+                    break
+
+        if match is None:
+            match = len(groups)
+            groups.append([comment, 0, grams])
+        groups[match][1] += 1
+        exact[key] = match
+
+    return [(representative, count) for representative, count, _ in groups]
+
+
+def format_group(comment, count):
+    """Prompt satırı: tekrar sayısı 1'den büyükse "(×k) " öneki"""
+    return f"(×{count}) {comment}" if count > 1 else str(comment)
+
+
+def select_comments(comments, token_budget=None, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """
+    Yorumları birleştir ve token bütçesine sığdır
+    Çok tekrarlanan (oran sinyali güçlü) gruplar önce alınır; sığmayanlar atlanır.
+
+    Returns: (satırlar, temsil edilen yorum sayısı, atlanan yorum sayısı)
+    """
+    groups = group_comments(comments, threshold)
+    # Stabil sıralama: eşit adetlerde güncel olan önde kalır
+    groups = sorted(groups, key=lambda group: -group[1])
+
+    lines, used_tokens, omitted = [], 0, 0
+    for comment, count in groups:
+        line = format_group(comment, count)
+        tokens = estimate_tokens(line) + 1  # "- " öneki ve satır sonu
+        if token_budget is not None and used_tokens + tokens > token_budget:
+            omitted += count
+            continue
+        lines.append(line)
+        used_tokens += tokens
+
+    total = sum(count for _, count in groups)
+    return lines, total, omitted
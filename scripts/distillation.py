@@ -0,0 +1,270 @@
+"""
+==================================================================================
+LLM ETİKETLERİNDEN YEREL MODEL (DISTILLATION)
+==================================================================================
+Birikmiş llm_results etiketleri (Etiket_Kaynagi == 'llm') eğitim verisi olarak
+kullanılır; ürünün yorumlarından 8 alanı tahmin eden küçük bir CPU modeli eğitilir:
+
+- Özellikler: normalize edilmiş yorumların hash'lenmiş kelime 1-2 gramları
+  (HashingVectorizer: sözlük tutulmaz, bellek sabit) + ön elemedeki şikayet
+  kalıbı oranları (%20 kuralının doğrudan sinyali); yorumlar ürün başına tek
+  seferde normalize edilir, iki özellik aynı metinden çıkar
+- Başlıklar: alan başına lojistik regresyon (bool alanlar ikili, puan alanları
+  ve main_complaint çok sınıflı)
+
+Güven = her alanda seçilen sınıfın olasılığı; ürünün güveni alanların en düşüğü.
+confidence_threshold altındaki ürünler LLM'e gider (LLMFeatureExtractor local_model).
+
+Kullanım:
+    python distillation.py   # eğit, hold-out uyumunu raporla, data/models/distilled_labeler.pkl
+"""
+
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.special import expit, softmax
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+
+from comment_selection import normalize_comments
+from llm_schema import LLM_FIELDS, validate_result
+from triage import shares_from_text
+
+
+OTHER_LABEL = '__diger__'  # seyrek main_complaint değerleri (tahmin edilirse güven 0)
+SHARE_WEIGHT = 10.0  # oranlar l2-normlu n-gram vektörünün yanında ezilmesin
+
+
+class DistilledLabeler:
+    """
+    LLM etiketlerini taklit eden yerel model
+
+    confidence_threshold: bu güvenin altındaki ürünler için label() None döner (LLM'e gider)
+    n_features: hash uzayı boyutu
+    C: lojistik regresyon düzenlileştirme katsayısı (büyük = daha az düzenlileştirme)
+    min_label_count: main_complaint sınıfı olmak için gereken en az örnek
+    """
+
+    def __init__(self, confidence_threshold=0.8, n_features=2**16, C=10.0, min_label_count=5):
+        self.confidence_threshold = confidence_threshold
+        self.n_features = n_features
+        self.C = C
+        self.min_label_count = min_label_count
+        self.heads = {}  # alan → LogisticRegression ya da sabit değer (tek sınıf görüldüyse)
+        self.frequent_labels = {}  # str alan → eğitimde yeterince sık görülen değerler
+        self.counts = {'labeled': 0, 'fallback': 0}
+        self._lock = threading.Lock()
+        # Durumsuz: pickle'a girmez, aynı n_features ile hep aynı hash uzayı
+        self.vectorizer = HashingVectorizer(n_features=n_features, ngram_range=(1, 2),
+                                            alternate_sign=False, norm='l2', lowercase=False)
+
+    def features(self, comment_lists):
+        """Yorum listeleri → seyrek özellik matrisi"""
+        documents = [normalize_comments(comments) for comments in comment_lists]
+        hashed = self.vectorizer.transform([text for text, _ in documents])
+        shares = np.array([list(shares_from_text(text, n).values()) for text, n in documents])
+        return sparse.hstack([hashed, sparse.csr_matrix(shares * SHARE_WEIGHT)], format='csr')
+
+    def fit(self, comment_lists, labels):
+        """
+        comment_lists: ürün başına yorum listesi
+        labels: LLM_FIELDS kolonlarına sahip DataFrame (aynı sırada)
+        """
+        X = self.features(comment_lists)
+        self.heads = {}
+        for field, (field_type, _, _) in LLM_FIELDS.items():
+            if field_type is str:
+                counts = labels[field].astype(str).value_counts()
+                self.frequent_labels[field] = set(counts[counts >= self.min_label_count].index)
+            y = self._target(field, labels[field])
+            classes = pd.unique(y)
+            if len(classes) == 1:
+                self.heads[field] = classes[0]
+                continue
+            head = LogisticRegression(C=self.C, max_iter=300)
+            head.fit(X, y)
+            self.heads[field] = head
+        return self
+
+    def _target(self, field, values):
+        """Alanın eğitim hedefi (seyrek main_complaint değerleri OTHER_LABEL)"""
+        field_type = LLM_FIELDS[field][0]
+        if field_type is bool:
+            return values.astype(bool).to_numpy()
+        if field_type is int:
+            return values.astype('int64').to_numpy()
+        values = values.astype(str)
+        return values.where(values.isin(self.frequent_labels[field]), OTHER_LABEL).to_numpy()
+
+    @staticmethod
+    def _proba(head, X):
+        # predict_proba ile aynı sonuç; tek ürünlük çağrılarda sklearn'ün doğrulama
+        # maliyeti tahminin kendisinden büyük olduğu için doğrudan hesaplanır
+        scores = np.asarray(X @ head.coef_.T) + head.intercept_
+        if scores.shape[1] == 1:
+            positive = expit(scores)
+            return np.hstack([1 - positive, positive])
+        return softmax(scores, axis=1)
+
+    def _predict_arrays(self, comment_lists):
+        """Returns: ({alan: tahmin dizisi}, ürün güveni dizisi)"""
+        X = self.features(comment_lists)
+        n = X.shape[0]
+        predictions, confidence = {}, np.ones(n)
+        for field, head in self.heads.items():
+            if not isinstance(head, LogisticRegression):
+                predictions[field] = np.array([head] * n)
+                continue
+            proba = self._proba(head, X)
+            best = proba.argmax(axis=1)
+            field_confidence = proba[np.arange(n), best]
+            labels = head.classes_[best]
+            if LLM_FIELDS[field][0] is str:
+                field_confidence = np.where(labels == OTHER_LABEL, 0.0, field_confidence)
+            predictions[field] = labels
+            confidence = np.minimum(confidence, field_confidence)
+        return predictions, confidence
+
+    def predict(self, comment_lists):
+        """
+        Returns: (tahminler DataFrame'i [LLM_FIELDS], ürün güveni dizisi)
+        """
+        predictions, confidence = self._predict_arrays(comment_lists)
+        return pd.DataFrame(predictions, columns=list(LLM_FIELDS)), confidence
+
+    def label(self, comments):
+        """
+        Tek ürün: güven eşiğin üstündeyse LLM çıktısıyla aynı formatta dict, değilse None
+        """
+        predictions, confidence = self._predict_arrays([comments])
+        if confidence[0] < self.confidence_threshold:
+            with self._lock:
+                self.counts['fallback'] += 1
+            return None
+
+        # numpy tipleri → JSON / validate_result ile uyumlu Python tipleri
+        result = {field: LLM_FIELDS[field][0](predictions[field][0]) for field in LLM_FIELDS}
+        if validate_result(result):
+            with self._lock:
+                self.counts['fallback'] += 1
+            return None
+        with self._lock:
+            self.counts['labeled'] += 1
+        return result
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump({'params': {'confidence_threshold': self.confidence_threshold,
+                                    'n_features': self.n_features, 'C': self.C,
+                                    'min_label_count': self.min_label_count},
+                         'heads': self.heads, 'frequent_labels': self.frequent_labels}, f)
+
+    @classmethod
+    def load(cls, path, confidence_threshold=None):
+        """Kaydedilmiş modeli yükle (eşik istenirse değiştirilebilir)"""
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        labeler = cls(**state['params'])
+        labeler.heads = state['heads']
+        labeler.frequent_labels = state['frequent_labels']
+        if confidence_threshold is not None:
+            labeler.confidence_threshold = confidence_threshold
+        return labeler
+
+
+def field_agreement(llm_labels, predictions):
+    """Alan başına LLM ile birebir uyum oranı"""
+    return {field: float(np.mean(llm_labels[field].to_numpy() == predictions[field].to_numpy()))
+            for field in LLM_FIELDS}
+
+
+def evaluate(labeler, comment_lists, labels, test_size=0.2, seed=0):
+    """
+    Hold-out değerlendirme: eğit, test kısmında alan uyumu, eşikteki kapsama ve hız
+    Returns: rapor sözlüğü (labeler eğitim kısmıyla eğitilmiş olarak kalır)
+    """
+    labels = labels.reset_index(drop=True)
+    train_idx, test_idx = train_test_split(np.arange(len(labels)), test_size=test_size, random_state=seed)
+    labeler.fit([comment_lists[i] for i in train_idx], labels.iloc[train_idx])
+
+    test_comments = [comment_lists[i] for i in test_idx]
+    start = time.perf_counter()
+    predictions, confidence = labeler.predict(test_comments)
+    elapsed = time.perf_counter() - start
+
+    test_labels = labels.iloc[test_idx].reset_index(drop=True)
+    # LLM etiketlerini modelin sınıf uzayına çevir (seyrek main_complaint → OTHER_LABEL)
+    test_labels = pd.DataFrame({field: labeler._target(field, test_labels[field]) for field in LLM_FIELDS})
+    confident = confidence >= labeler.confidence_threshold
+    return {
+        'train': len(train_idx),
+        'test': len(test_idx),
+        'field_agreement': field_agreement(test_labels, predictions),
+        'coverage': float(confident.mean()),
+        'confident_field_agreement': (field_agreement(test_labels[confident].reset_index(drop=True),
+                                                      predictions[confident].reset_index(drop=True))
+                                      if confident.any() else None),
+        'products_per_s': len(test_idx) / elapsed if elapsed else None,
+    }
+
+
+def load_training_data(results_path, comments_fn):
+    """
+    LLM'in etiketlediği ürünler (ön eleme / yerel model etiketleri hariç) ve yorumları
+    comments_fn: ürün ismi → yorum listesi (LLM'e gönderilenle aynı seçim)
+    Returns: (yorum listeleri, etiket DataFrame'i)
+    """
+    from table_io import LLM_RESULTS_SCHEMA, read_table
+
+    df = read_table(results_path, schema=LLM_RESULTS_SCHEMA)
+    if 'Etiket_Kaynagi' in df.columns:
+        df = df[df['Etiket_Kaynagi'].fillna('llm') == 'llm']
+    df = df.dropna(subset=list(LLM_FIELDS)).reset_index(drop=True)
+    return [comments_fn(product) for product in df['Ürün']], df[list(LLM_FIELDS)]
+
+
+# ============================================================================
+# KULLANIM ÖRNEĞİ
+# ============================================================================
+if __name__ == "__main__":
+    from review_store import ReviewStore
+    from table_io import intermediate_path
+
+    print("=" * 80)
+    print("LLM ETİKETLERİNDEN YEREL MODEL EĞİTİMİ")
+    print("=" * 80)
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(script_dir)
+    RAW_DATA = os.path.join(project_root, 'data', 'raw', 'sample_dataset.csv')
+    LLM_RESULTS = intermediate_path(project_root, 'llm_results')
+    REVIEW_STORE = os.path.join(project_root, 'data', 'processed', 'review_store')
+    MODEL_PATH = os.path.join(project_root, 'data', 'models', 'distilled_labeler.pkl')
+
+    store = ReviewStore.open_or_build(RAW_DATA, REVIEW_STORE)
+    comment_lists, labels = load_training_data(LLM_RESULTS, store.product_comments)
+    print(f"\n✅ {len(labels)} LLM etiketli ürün yüklendi")
+
+    labeler = DistilledLabeler()
+    report = evaluate(labeler, comment_lists, labels)
+
+    print(f"\n📊 HOLD-OUT UYUMU ({report['test']} ürün, eğitim {report['train']}):")
+    for field, rate in report['field_agreement'].items():
+        confident = report['confident_field_agreement']
+        print(f"   {field:<24} %{rate*100:5.1f}"
+              + (f"   (güvenli tahminlerde %{confident[field]*100:5.1f})" if confident else ""))
+    print(f"\n   Güven >= {labeler.confidence_threshold}: ürünlerin %{report['coverage']*100:.1f}'i "
+          f"API'siz etiketlenir, gerisi LLM'e gider")
+    print(f"   Hız: {report['products_per_s']:,.0f} ürün/s (tek çekirdek, toplu tahmin)")
+
+    # Son model tüm veriyle eğitilir
+    labeler.fit(comment_lists, labels)
+    labeler.save(MODEL_PATH)
+    print(f"\n💾 Model kaydedildi: {MODEL_PATH}")
@@ -0,0 +1,460 @@
+"""
+==================================================================================
+YEREL SAHTE ANTHROPIC API SUNUCUSU (OFFLINE TEST)
+==================================================================================
+Messages API (POST /v1/messages) ve Message Batches API'nin
+(POST /v1/messages/batches, GET /v1/messages/batches/<id>,
+GET /v1/messages/batches/<id>/results) yerel bir taklidi.
+
+Yanıtlar yorumlardaki anahtar kelimelerden deterministik olarak üretilir;
+böylece LLMFeatureExtractor tüm akışıyla API anahtarı olmadan test edilebilir:
+
+    with FakeAnthropicServer(batch_delay=2.0) as server:
+        extractor = LLMFeatureExtractor(..., api_key='test', base_url=server.base_url)
+
+Yük testi için Messages API çağrılarına gecikme ve hata eklenebilir:
+- latency_fn: her çağrının bekleme süresi (örn. lognormal_latency(0.8, 0.5))
+- rate_limit_rate: bu oranda çağrı 429 + retry-after ile reddedilir
+- malformed_rate: bu oranda çağrı yarım kesilmiş JSON metni döner
+- canned_answer: anahtar kelime kuralları yerine her istekte aynı sabit yanıt
+Hata kararları seed + istek içeriği + aynı isteğin kaçıncı denemesi olduğundan
+hesaplanır; thread sırası değişse de aynı istekler aynı hataları alır.
+
+Komut satırından:
+    python fake_anthropic_server.py --port 8765 --latency-median 0.8 --rate-limit-rate 0.05
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rate_limit import estimate_tokens
+
+
+# Yorum satırlarında aranan anahtar kelimeler (alan → kelimeler)
+KEYWORDS = {
+    'fitment_problem': ['dar', 'bol', 'büyük', 'küçük', 'kalıp', 'beden'],
+    'fabric_quality_issue': ['kalitesiz', 'ince', 'kumaş kötü', 'tüylen', 'yırtıl'],
+    'delivery_issue': ['kargo', 'teslimat', 'geç geldi'],
+    'color_mismatch': ['renk', 'soluk'],
+}
+NEGATIVE_WORDS = ['kötü', 'berbat', 'kalitesiz', 'iade', 'pişman']
+COMPLAINTS = {
+    'fitment_problem': 'Beden/kalıp uyumsuz',
+    'fabric_quality_issue': 'Kumaş kalitesiz',
+    'delivery_issue': 'Teslimat sorunlu',
+    'color_mismatch': 'Renk farklı',
+}
+SHARE_THRESHOLD = 0.20  # prompt'taki %20 kuralı
+_GROUP_PREFIX = re.compile(r'^\(×(\d+)\) ')
+_TOTAL_HEADER = re.compile(r'toplam (\d+) yorum')
+_PACKED_SECTION = re.compile(r'^### ÜRÜN (\S+)$', re.MULTILINE)
+
+
+def _system_blocks(body):
+    """system alanını [{'text':..., 'cache_control':...}] listesine çevir"""
+    system = body.get('system')
+    if isinstance(system, str):
+        return [{'type': 'text', 'text': system}]
+    return system or []
+
+
+def _request_text(body):
+    """İstekteki mesaj metinlerini tek string'e indir (system hariç)"""
+    parts = []
+    for message in body.get('messages', []):
+        content = message.get('content')
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(block.get('text', '') for block in content or [])
+    return '\n'.join(parts)
+
+
+def default_answer(prompt_text):
+    """
+    Yorum satırlarından ('- ' ile başlayan) 8 alanlı özellik sözlüğü üret
+    "(×k) " önekli satırlar k yorum sayılır; oranlar başlıktaki toplama göre
+    Returns: dict (LLM'in döndüreceği JSON ile aynı alanlar)
+    """
+    comments = []
+    for line in prompt_text.splitlines():
+        if line.startswith('- '):
+            match = _GROUP_PREFIX.match(line[2:])
+            weight = int(match.group(1)) if match else 1
+            text = line[2 + match.end():] if match else line[2:]
+            comments.append((text.lower(), weight))
+    total = _TOTAL_HEADER.search(prompt_text)
+    n = max(int(total.group(1)) if total else sum(weight for _, weight in comments), 1)
+
+    def share(words):
+        return sum(weight for comment, weight in comments if any(word in comment for word in words)) / n
+
+    shares = {field: share(words) for field, words in KEYWORDS.items()}
+    negative_share = share(NEGATIVE_WORDS)
+    flags = {field: value > SHARE_THRESHOLD for field, value in shares.items()}
+
+    complaints = [field for field, flag in flags.items() if flag]
+    main_complaint = (COMPLAINTS[max(complaints, key=shares.get)] if complaints
+                      else 'Genel memnuniyet yüksek')
+
+    return {
+        'fitment_problem': flags['fitment_problem'],
+        'fitment_severity': min(10, round(shares['fitment_problem'] * 20)),
+        'quality_sentiment': max(1, 5 - round(negative_share * 8)),
+        'delivery_issue': flags['delivery_issue'],
+        'color_mismatch': flags['color_mismatch'],
+        'main_complaint': main_complaint,
+        'fabric_quality_issue': flags['fabric_quality_issue'],
+        'price_value_perception': 2 if negative_share > SHARE_THRESHOLD else 4,
+    }
+
+
+def packed_answer(prompt_text, answer_fn=default_answer):
+    """
+    Paketlenmiş istek ("### ÜRÜN <kimlik>" bölümleri) için JSON dizisi
+    Returns: liste veya None (paketli istek değilse)
+    """
+    parts = _PACKED_SECTION.split(prompt_text)
+    if len(parts) < 3:
+        return None
+    return [{'urun_id': product_id, **answer_fn(section)}
+            for product_id, section in zip(parts[1::2], parts[2::2])]
+
+
+def canned_answer(answer):
+    """Her istek için aynı sabit yanıt (answer_fn olarak; paketli isteklerde her ürüne)"""
+    return lambda prompt_text: dict(answer)
+
+
+def fixed_latency(seconds):
+    """Her çağrıda sabit gecikme"""
+    return lambda: seconds
+
+
+def lognormal_latency(median_s, sigma=0.5, seed=0):
+    """
+    Gerçek API'ye benzer sağa çarpık gecikme: medyanı median_s olan lognormal
+    (sigma=0.5 → p95 ≈ 2.3 × medyan)
+    """
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def sample():
+        with lock:
+            return median_s * rng.lognormvariate(0.0, sigma)
+    return sample
+
+
+def _timestamp(moment):
+    return moment.isoformat().replace('+00:00', 'Z')
+
+
+class FakeAnthropicServer:
+    """
+    Arka plan thread'inde çalışan sahte API sunucusu
+
+    answer_fn: kullanıcı mesajı metni → sözlük (varsayılan: default_answer)
+    batch_delay: batch'in 'in_progress' görüneceği süre (saniye)
+    latency_fn: () → saniye; her Messages API çağrısından önce beklenir (None = beklemesiz)
+    rate_limit_rate: 429 dönen çağrı oranı (0-1), retry_after: 429'daki retry-after başlığı
+    malformed_rate: bozuk JSON dönen çağrı oranı (0-1)
+    seed: hata kararları için tohum
+    max_batch_requests / max_batch_bytes: tek batch sınırları; aşan batch 400 alır
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, answer_fn=default_answer, batch_delay=0.0,
+                 latency_fn=None, rate_limit_rate=0.0, retry_after=1.0, malformed_rate=0.0, seed=0,
+                 max_batch_requests=100_000, max_batch_bytes=256 * 1024 * 1024):
+        self.answer_fn = answer_fn
+        self.batch_delay = batch_delay
+        self.latency_fn = latency_fn
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.malformed_rate = malformed_rate
+        self.seed = seed
+        self.max_batch_requests = max_batch_requests
+        self.max_batch_bytes = max_batch_bytes
+        self.batches = {}
+        self.message_calls = 0
+        self.batch_requests = 0
+        self.rate_limited = 0
+        self.malformed = 0
+        self._attempts = Counter()  # istek özeti → deneme sayısı
+        self._cached_prefixes = set()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.owner = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Ön planda çalıştır (komut satırı kullanımı için)"""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _next_id(self, prefix):
+        with self._lock:
+            return f"{prefix}_fake_{next(self._ids):06d}"
+
+    def create_message(self, body, malformed=False):
+        """POST /v1/messages gövdesine Message yanıtı üret"""
+        with self._lock:
+            self.message_calls += 1
+        return self._answer(body, malformed)
+
+    def inject_fault(self, body):
+        """
+        Çağrıya uygulanacak hata: '429', 'malformed' veya None
+        Karar (seed, istek özeti, deneme no) hash'inden → tekrar denemeler farklı sonuç alabilir
+        """
+        if not self.rate_limit_rate and not self.malformed_rate:
+            return None
+        digest = hashlib.sha256(json.dumps(body, sort_keys=True).encode('utf-8')).hexdigest()
+        with self._lock:
+            self._attempts[digest] += 1
+            attempt = self._attempts[digest]
+        draw = hashlib.blake2b(f"{self.seed}:{digest}:{attempt}".encode('utf-8'), digest_size=8).digest()
+        u = int.from_bytes(draw, 'big') / 2**64
+        if u < self.rate_limit_rate:
+            fault = '429'
+        elif u < self.rate_limit_rate + self.malformed_rate:
+            fault = 'malformed'
+        else:
+            return None
+        with self._lock:
+            if fault == '429':
+                self.rate_limited += 1
+            else:
+                self.malformed += 1
+        return fault
+
+    def _usage(self, body, text, answer):
+        """
+        Token sayıları; cache_control'lü system blokları ilk görülüşte cache
+        yazma, sonrasında cache okuma olarak sayılır (gerçek API gibi)
+        """
+        usage = {'input_tokens': estimate_tokens(text), 'output_tokens': estimate_tokens(answer),
+                 'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0}
+        for block in _system_blocks(body):
+            tokens = estimate_tokens(block.get('text', ''))
+            if not block.get('cache_control'):
+                usage['input_tokens'] += tokens
+                continue
+            with self._lock:
+                seen = block['text'] in self._cached_prefixes
+                self._cached_prefixes.add(block['text'])
+            usage['cache_read_input_tokens' if seen else 'cache_creation_input_tokens'] += tokens
+        return usage
+
+    def _answer(self, body, malformed=False):
+        text = _request_text(body)
+        packed = packed_answer(text, self.answer_fn)
+        payload = self.answer_fn(text) if packed is None else packed
+        answer = json.dumps(payload, ensure_ascii=False)
+
+        # tool_choice ile zorlanan tool varsa yanıt tool_use bloğu olarak döner
+        # (bozuk yanıt: tool kullanılmamış, JSON yarıda kesilmiş metin)
+        tool_choice = body.get('tool_choice') or {}
+        if malformed:
+            answer = answer[:len(answer) // 2]
+            content = [{'type': 'text', 'text': answer}]
+            stop_reason = 'max_tokens'
+        elif tool_choice.get('type') == 'tool':
+            tool_input = payload if packed is None else {'urunler': payload}
+            content = [{'type': 'tool_use', 'id': self._next_id('toolu'),
+                        'name': tool_choice['name'], 'input': tool_input}]
+            stop_reason = 'tool_use'
+        else:
+            content = [{'type': 'text', 'text': answer}]
+            stop_reason = 'end_turn'
+        return {
+            'id': self._next_id('msg'),
+            'type': 'message',
+            'role': 'assistant',
+            'model': body.get('model', 'fake-model'),
+            'content': content,
+            'stop_reason': stop_reason,
+            'stop_sequence': None,
+            'usage': self._usage(body, text, answer),
+        }
+
+    def batch_limit_error(self, body, size):
+        """Batch sınırları aşıldıysa hata mesajı, yoksa None (size: gövde bayt sayısı)"""
+        n_requests = len(body.get('requests', []))
+        if n_requests > self.max_batch_requests:
+            return f"Batch en fazla {self.max_batch_requests} istek içerebilir ({n_requests})"
+        if size > self.max_batch_bytes:
+            return f"Batch gövdesi en fazla {self.max_batch_bytes} bayt olabilir ({size})"
+        return None
+
+    def create_batch(self, body):
+        """Batch'i kaydet; sonuçlar hemen hesaplanır, batch_delay sonra görünür"""
+        requests = body.get('requests', [])
+        results = [
+            {'custom_id': request['custom_id'],
+             'result': {'type': 'succeeded', 'message': self._answer(request['params'])}}
+            for request in requests
+        ]
+        now = datetime.now(timezone.utc)
+        batch = {
+            'id': self._next_id('msgbatch'),
+            'type': 'message_batch',
+            'created_at': _timestamp(now),
+            'expires_at': _timestamp(now + timedelta(hours=24)),
+            'ended_at': None,
+            'archived_at': None,
+            'cancel_initiated_at': None,
+            'processing_status': 'in_progress',
+            'request_counts': {'processing': len(requests), 'succeeded': 0,
+                               'errored': 0, 'canceled': 0, 'expired': 0},
+            'results_url': None,
+        }
+        with self._lock:
+            self.batch_requests += len(requests)
+            self.batches[batch['id']] = {'batch': batch, 'results': results,
+                                         'ready_at': time.monotonic() + self.batch_delay}
+        return batch
+
+    def get_batch(self, batch_id):
+        """Batch durumunu döndür (süre dolduysa 'ended' olarak işaretle)"""
+        entry = self.batches.get(batch_id)
+        if entry is None:
+            return None
+        batch = entry['batch']
+        if batch['processing_status'] != 'ended' and time.monotonic() >= entry['ready_at']:
+            batch['processing_status'] = 'ended'
+            batch['ended_at'] = _timestamp(datetime.now(timezone.utc))
+            batch['request_counts'] = {'processing': 0, 'succeeded': len(entry['results']),
+                                       'errored': 0, 'canceled': 0, 'expired': 0}
+            batch['results_url'] = f"{self.base_url}/v1/messages/batches/{batch_id}/results"
+        return batch
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """HTTP isteklerini FakeAnthropicServer metodlarına yönlendir"""
+
+    def log_message(self, format, *args):
+        pass  # test çıktısını kirletme
+
+    def _send_json(self, status, payload, content_type='application/json', headers=None):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, error_type, message, headers=None):
+        self._send_json(status, {'type': 'error', 'error': {'type': error_type, 'message': message}},
+                        headers=headers)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_POST(self):
+        owner = self.server.owner
+        path = self.path.split('?')[0].rstrip('/')
+        if path == '/v1/messages':
+            body = self._read_body()
+            if owner.latency_fn is not None:
+                time.sleep(owner.latency_fn())
+            fault = owner.inject_fault(body)
+            if fault == '429':
+                self._send_error(429, 'rate_limit_error', 'Sahte rate limit',
+                                 headers={'retry-after': f"{owner.retry_after:g}"})
+            else:
+                self._send_json(200, owner.create_message(body, malformed=fault == 'malformed'))
+        elif path == '/v1/messages/batches':
+            body = self._read_body()
+            error = owner.batch_limit_error(body, int(self.headers.get('Content-Length') or 0))
+            if error:
+                self._send_error(400, 'invalid_request_error', error)
+            else:
+                self._send_json(200, owner.create_batch(body))
+        else:
+            self._send_error(404, 'not_found_error', f"Bilinmeyen yol: {path}")
+
+    def do_GET(self):
+        owner = self.server.owner
+        parts = self.path.split('?')[0].strip('/').split('/')
+        if parts[:3] != ['v1', 'messages', 'batches'] or len(parts) not in (4, 5):
+            self._send_error(404, 'not_found_error', f"Bilinmeyen yol: {self.path}")
+            return
+
+        batch = owner.get_batch(parts[3])
+        if batch is None:
+            self._send_error(404, 'not_found_error', f"Batch bulunamadı: {parts[3]}")
+        elif len(parts) == 4:
+            self._send_json(200, batch)
+        elif batch['processing_status'] != 'ended':
+            self._send_error(400, 'invalid_request_error', 'Batch henüz tamamlanmadı')
+        else:
+            lines = [json.dumps(result, ensure_ascii=False) for result in owner.batches[parts[3]]['results']]
+            self._send_json(200, ('\n'.join(lines) + '\n').encode('utf-8'), 'application/binary')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Yerel sahte Anthropic API sunucusu")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--batch-delay', type=float, default=5.0)
+    parser.add_argument('--latency-median', type=float, default=0.0, help="saniye (0 = beklemesiz)")
+    parser.add_argument('--latency-sigma', type=float, default=0.5)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=float, default=1.0)
+    parser.add_argument('--malformed-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--canned-answer', help="her istekte dönülecek 8 alanlı JSON dosyası")
+    args = parser.parse_args()
+
+    answer_fn = default_answer
+    if args.canned_answer:
+        with open(args.canned_answer, encoding='utf-8') as f:
+            answer_fn = canned_answer(json.load(f))
+
+    server = FakeAnthropicServer(
+        args.host, args.port, answer_fn=answer_fn, batch_delay=args.batch_delay,
+        latency_fn=lognormal_latency(args.latency_median, args.latency_sigma, args.seed) if args.latency_median else None,
+        rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+        malformed_rate=args.malformed_rate, seed=args.seed
+    )
+    print(f"🧪 Sahte API sunucusu: {server.base_url} (Ctrl+C ile durdur)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -5,11 +5,131 @@ LLM İLE ÖZELLİK MÜHENDİSLİĞİ (CLAUDE 4.5 SONNET)
 """
 
 import pandas as pd
+import numpy as np
 import json
 import anthropic
 import time
 from tqdm import tqdm
 import os
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from turkish_dates import add_parsed_dates
+from review_loader import load_reviews
+from review_store import COMMENT_COLUMNS, ReviewStore
+from profiling import profiler, report_path
+from rate_limit import RateLimiter, backoff_delay, estimate_tokens
+from result_store import ResultStore
+from response_cache import ResponseCache
+from comment_selection import NEAR_DUPLICATE_THRESHOLD, select_comments
+from risk_rules import score_frame, score_record
+from triage import LexiconTriage
+from distillation import DistilledLabeler
+from llm_metrics import LLMCallMetrics, metrics_paths, model_prices
+from llm_schema import LLM_FIELDS, PACKED_TOOL_NAME, TOOL_NAME, tool_definition, validate_result
+from review_fingerprint import comment_fingerprint, fingerprint_change
+from table_io import (BASE_METRICS_SCHEMA, LLM_RESULTS_SCHEMA, LLM_EXTRACTION_SCHEMA,
+                      intermediate_path, read_table, write_table)
+
+# Tüm ürünlerde aynı olan talimatlar: system prompt'ta cache_control ile işaretlenir,
+# böylece ilk çağrıdan sonra önbellekten (daha ucuz ve hızlı) okunur
+SYSTEM_PROMPT = """Bir e-ticaret ürününe ait kullanıcı yorumlarını analiz ediyorsun. Görevin, GENEL eğilimi belirlemek (birkaç aykırı yorumu değil).
+
+Kullanıcının gönderdiği YORUMLAR'dan aşağıdaki bilgileri JSON formatında çıkar. SADECE JSON çıktısı ver, başka açıklama ekleme:
+
+{
+  "fitment_problem": true/false,
+  "fitment_severity": 0-10,
+  "quality_sentiment": 1-5,
+  "delivery_issue": true/false,
+  "color_mismatch": true/false,
+  "main_complaint": "string",
+  "fabric_quality_issue": true/false,
+  "price_value_perception": 1-5
+}
+
+KRİTİK KURALLAR - ÇOK ÖNEMLİ:
+
+1. fitment_problem: SADECE yorumların %20'sinden FAZLASI (5'te 1'i) beden/kalıp problemi belirtiyorsa TRUE. 
+   Örnek: 100 yorumda 20'den fazlası "büyük/küçük/bol/dar" diyorsa TRUE, değilse FALSE.
+
+2. fabric_quality_issue: SADECE yorumların %20'sinden FAZLASI kumaş kalitesinden şikayet ediyorsa TRUE.
+   Örnek: 100 yorumda 20'den fazlası "kumaş kötü/ince/kalitesiz" diyorsa TRUE, değilse FALSE.
+
+3. delivery_issue: SADECE yorumların %20'sinden FAZLASI teslimat sorunu belirtiyorsa TRUE.
+
+4. color_mismatch: SADECE yorumların %20'sinden FAZLASI renk uyumsuzluğu belirtiyorsa TRUE.
+
+5. quality_sentiment: ÇOĞUNLUĞUN genel kalite algısını yansıt.
+   - Çoğunluk "mükemmel/harika/kaliteli" diyorsa → 5
+   - Çoğunluk "iyi/güzel" diyorsa → 4
+   - Çoğunluk "orta" diyorsa → 3
+   - Çoğunluk "kötü" diyorsa → 2
+   - Çoğunluk "berbat" diyorsa → 1
+
+6. main_complaint: En sık tekrarlanan ciddi şikayeti yaz. Eğer ciddi şikayet yoksa "Genel memnuniyet yüksek" yaz.
+
+7. fitment_severity & price_value_perception: 0-10 arası, GENEL eğilimi yansıt.
+
+ÖRNEKLER:
+
+Senaryo 1:
+- 100 yorum
+- 95 kişi: "Mükemmel, harika, bayıldım"
+- 3 kişi: "Beden büyük geldi"
+- 2 kişi: "Kumaş ince"
+→ fitment_problem: FALSE (%3 < %20)
+→ fabric_quality_issue: FALSE (%2 < %20)
+→ quality_sentiment: 5
+→ main_complaint: "Genel memnuniyet yüksek"
+
+Senaryo 2:
+- 100 yorum
+- 30 kişi: "Beden çok büyük, kalıp kötü"
+- 70 kişi: "Güzel ürün"
+→ fitment_problem: TRUE (%30 > %20)
+→ fitment_severity: 7 (ciddi problem)
+→ quality_sentiment: 4 (çoğunluk memnun)
+→ main_complaint: "Beden büyük geliyor"
+
+SADECE YAYGIN SORUNLARI RAPORLA! Birkaç kişinin söylemesi SORUN DEĞİLDİR.
+
+NOT: Aynı veya çok benzer yorumlar "(×k) yorum" şeklinde tek satırda verilir; bu yorum k kişi
+tarafından yazılmıştır. Oranları hesaplarken k kez say ve toplam yorum sayısına böl."""
+SYSTEM_PROMPT_TOKENS = estimate_tokens(SYSTEM_PROMPT)
+
+# Yanıtların usage alanından toplanan token sayaçları
+USAGE_FIELDS = ['input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens']
+
+# Message Batches API'nin tek batch sınırları (istek sayısı, istek gövdesi boyutu)
+BATCH_MAX_REQUESTS = 100_000
+BATCH_MAX_BYTES = 256 * 1024 * 1024
+
+
+def split_batch_requests(entries, max_requests=BATCH_MAX_REQUESTS, max_bytes=BATCH_MAX_BYTES):
+    """
+    Batch isteklerini ({'custom_id', 'params'} listesi) sırayı koruyarak tek batch
+    sınırlarına sığan parçalara böl. Boyut, ASCII-kaçışlı JSON gövdesiyle ölçülür
+    (UTF-8 kodlamasından büyük ya da eşit → güvenli taraf)
+    Returns: parça listesi
+    """
+    envelope = len(json.dumps({'requests': []}))
+    chunks, chunk, size = [], [], envelope
+    for entry in entries:
+        entry_size = len(json.dumps(entry)) + 2  # ayırıcı ", "
+        if chunk and (len(chunk) >= max_requests or size + entry_size > max_bytes):
+            chunks.append(chunk)
+            chunk, size = [], envelope
+        chunk.append(entry)
+        size += entry_size
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+class LLMCallError(Exception):
+    """Tekrar denemelerden sonra bile geçerli yanıt alınamayan çağrı (sebep mesajda)"""
+
 
 class LLMFeatureExtractor:
     """
@@ -17,57 +137,133 @@ class LLMFeatureExtractor:
     Her ürün işlenince anında kaydeder!
     """
     
-    def __init__(self, original_csv_path, product_features_csv_path, output_path, api_key):
-        # Orijinal yorumları yükle
-        self.df_reviews = pd.read_csv(original_csv_path, encoding='utf-8-sig')
+    def __init__(self, original_csv_path, product_features_csv_path, output_path, api_key,
+                 review_store_root=None, base_url=None, result_store_path=None,
+                 response_cache=None, comment_token_budget=4000,
+                 near_duplicate_threshold=NEAR_DUPLICATE_THRESHOLD, triage=None, max_retries=5,
+                 local_model=None):
+        """
+        review_store_root: verilirse yorumlar ham CSV yerine mmap yorum deposundan okunur
+        (Phase 1'in oluşturduğu depo, ham dosyanın hash'i ile bulunur)
+        base_url: Messages API adresi (örn. yerel stub sunucu ile test için)
+        result_store_path: ara sonuçların yazıldığı SQLite deposu
+            (varsayılan: output_path ile aynı isimde .sqlite; output_path
+            tablosu sadece finalize_and_save'de oluşturulur)
+        response_cache: ResponseCache; verilirse aynı istekler API'ye tekrar gönderilmez
+        comment_token_budget: prompt'taki yorumlar için tahmini token üst sınırı (None = sınırsız)
+        near_duplicate_threshold: yorumların birleştirildiği 3-gram Jaccard benzerliği (1.0 = sadece aynılar)
+        triage: LexiconTriage; verilirse açıkça belli ürünler API'ye gönderilmeden etiketlenir
+        max_retries: 429/5xx/bağlantı hatalarında jitter'lı üstel beklemeyle en fazla tekrar sayısı
+        local_model: DistilledLabeler; verilirse güveni eşiğin üstündeki ürünler API'siz
+            etiketlenir, gerisi LLM'e gider
+        """
+        self.review_store = None
+        self.df_reviews = None
         
-        # Parse tarihleri
-        self._parse_dates()
+        if review_store_root:
+            with profiler.stage('review_store'):
+                self.review_store = ReviewStore.open_or_build(original_csv_path, review_store_root)
+        else:
+            # Orijinal yorumları yükle
+            with profiler.stage('load_reviews') as stage:
+                self.df_reviews = load_reviews(original_csv_path)
+                stage['rows_out'] = len(self.df_reviews)
+            
+            # Parse tarihleri
+            with profiler.stage('date_parsing', rows_in=len(self.df_reviews)) as stage:
+                self._parse_dates()
+                stage['rows_out'] = len(self.df_reviews)
+            
+            # Ürün → yorum aralığı indeksi (her ürün için filtre + sıralama yerine dilim)
+            with profiler.stage('review_index', rows_in=len(self.df_reviews)):
+                self._build_review_index()
         
         # Ürün özelliklerini yükle (Phase 1 çıktısı)
-        self.df_products = pd.read_csv(product_features_csv_path)
+        self.df_products = read_table(product_features_csv_path, schema=BASE_METRICS_SCHEMA)
+        
+        # Ürün → Toplam_Yorum_Sayisi (risk sınıfı için O(1) erişim)
+        first_rows = self.df_products.drop_duplicates('Ürün')
+        self.product_review_counts = dict(zip(first_rows['Ürün'], first_rows['Toplam_Yorum_Sayisi']))
+        
+        # Ön eleme (base metrics satırlarına ürün ismiyle O(1) erişim)
+        self.triage = triage
+        self.product_stats = first_rows.set_index('Ürün').to_dict('index') if triage is not None else {}
         
-        # Claude client
-        self.client = anthropic.Anthropic(api_key=api_key)
+        # LLM etiketlerinden eğitilmiş yerel model
+        self.local_model = local_model
+        
+        # Claude client (SDK'nın kendi tekrarları kapalı: backoff _create_with_backoff'ta)
+        self.client = anthropic.Anthropic(api_key=api_key, base_url=base_url, max_retries=0)
+        self.max_retries = max_retries
+        
+        # Eşzamanlı modda processed_products ve sayaçlar için kilit
+        self._lock = threading.Lock()
+        
+        # Yorum seçimi (tekrar birleştirme + bütçe)
+        self.comment_token_budget = comment_token_budget
+        self.near_duplicate_threshold = near_duplicate_threshold
+        
+        # Yanıt önbelleği, gerçek API çağrısı ve token sayaçları
+        self.response_cache = response_cache
+        self.api_calls = 0
+        self.llm_products = set()  # LLM'e gönderilen ürünler (ön eleme raporu için)
+        self.pack_retries = 0
+        self.retries = 0
+        self.token_usage = dict.fromkeys(USAGE_FIELDS, 0)
+        self.metrics = LLMCallMetrics()  # çağrı başına token / gecikme / tekrar
+        
+        # Başarısız ürünler (dead-letter): [{'Ürün': ..., 'Sebep': ...}, ...]
+        self.dead_letters = []
         
         # Output dosya yolu
         self.output_path = output_path
         
+        # Append-only sonuç deposu (her ürün O(1) kayıt)
+        if result_store_path is None:
+            result_store_path = os.path.splitext(output_path)[0] + '.sqlite'
+        self.result_store = ResultStore(result_store_path)
+        
         # İşlenmiş ürünleri takip et
         self.processed_products = self._load_processed_products()
         
     def _parse_dates(self):
         """Tarihleri parse et"""
-        month_mapping = {
-            'Ocak': 'January', 'Şubat': 'February', 'Mart': 'March',
-            'Nisan': 'April', 'Mayıs': 'May', 'Haziran': 'June',
-            'Temmuz': 'July', 'Ağustos': 'August', 'Eylül': 'September',
-            'Ekim': 'October', 'Kasım': 'November', 'Aralık': 'December'
-        }
-        
-        def convert_date(date_str):
-            if pd.isna(date_str):
-                return None
-            for tr, en in month_mapping.items():
-                date_str = date_str.replace(tr, en)
-            try:
-                return pd.to_datetime(date_str, format='%d %B %Y')
-            except:
-                return None
+        self.df_reviews, dropped = add_parsed_dates(self.df_reviews)
+        if dropped:
+            print(f"⚠️ {dropped:,} yorum parse edilemeyen tarih nedeniyle atıldı")
+    
+    def _build_review_index(self):
+        """
+        Yorumları ürün (ilk görülme sırası) + tarih (yeniden eskiye) sırasına diz
+        ve her ürünün [başlangıç, bitiş) aralığını sakla (ReviewStore ile aynı düzen)
+        """
+        df = self.df_reviews[self.df_reviews['Ürün'].notna()]
+        codes, products = pd.factorize(df['Ürün'], sort=False)
+        dates = df['parsed_date'].to_numpy().astype('datetime64[s]').astype('int64')
+        order = np.lexsort((-dates, codes))
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(products)))))
         
-        self.df_reviews['parsed_date'] = self.df_reviews['Tarih'].apply(convert_date)
-        self.df_reviews = self.df_reviews.dropna(subset=['parsed_date'])
+        # ReviewStore ile aynı kolon önceliği (düzeltilmiş yorum yoksa ham 'Yorum')
+        comment_column = next(c for c in COMMENT_COLUMNS if c in df.columns)
+        self._sorted_comments = df[comment_column].to_numpy(dtype=object)[order]
+        self._comment_ranges = {
+            product: (int(offsets[i]), int(offsets[i + 1])) for i, product in enumerate(products)
+        }
     
     def _load_processed_products(self):
         """
         Daha önce işlenmiş ürünleri yükle (kaldığı yerden devam için)
         """
-        if os.path.exists(self.output_path):
-            df_existing = pd.read_csv(self.output_path)
-            processed = set(df_existing['Ürün'].unique())
-            print(f"📂 Mevcut dosya bulundu: {len(processed)} ürün zaten işlenmiş")
-            return processed
-        return set()
+        # Eski sürümden kalan sonuç tablosu varsa bir kereye mahsus depoya aktar
+        if len(self.result_store) == 0 and os.path.exists(self.output_path):
+            df_existing = read_table(self.output_path, schema=LLM_RESULTS_SCHEMA)
+            imported = self.result_store.import_table(df_existing)
+            print(f"📥 {imported} mevcut sonuç depoya aktarıldı: {self.result_store.db_path}")
+        
+        processed = self.result_store.processed_products()
+        if processed:
+            print(f"📂 Mevcut depo bulundu: {len(processed)} ürün zaten işlenmiş")
+        return processed
     
     def _calculate_risk_class(self, row_dict):
         """
@@ -76,46 +272,13 @@ class LLMFeatureExtractor:
         """
         # Phase 1'den Toplam_Yorum_Sayisi al
         product_name = row_dict.get('Ürün')
-        product_info = self.df_products[self.df_products['Ürün'] == product_name]
+        toplam_yorum = self.product_review_counts.get(product_name)
         
-        if len(product_info) == 0:
+        if toplam_yorum is None:
             return 0, 0  # Default: Healthy, score 0
         
-        toplam_yorum = product_info['Toplam_Yorum_Sayisi'].iloc[0]
-        
-        # 1. ENGAGEMENT CHURN (az yorum)
-        if toplam_yorum < 5:
-            return 2, 0  # Engagement churn, score 0 (yorum yetersiz)
-        
-        # 2. QUALITY CHURN (LLM özellikleri)
-        quality_risk = 0
-        
-        # Kalıp problemi VAR ve ciddi
-        if row_dict.get('fitment_problem') == True and row_dict.get('fitment_severity', 0) >= 7:
-            quality_risk += 3
-        elif row_dict.get('fitment_problem') == True:
-            quality_risk += 1
-        
-        # Kumaş kalitesi problemi VAR
-        if row_dict.get('fabric_quality_issue') == True:
-            quality_risk += 2
-        
-        # LLM kalite algısı düşük
-        quality_sentiment = row_dict.get('quality_sentiment', 5)
-        if quality_sentiment <= 2:
-            quality_risk += 3
-        elif quality_sentiment == 3:
-            quality_risk += 1
-        
-        # Teslimat problemi VAR
-        if row_dict.get('delivery_issue') == True:
-            quality_risk += 1
-        
-        # 3. SINIFLANDIRMA
-        if quality_risk >= 4:
-            return 1, quality_risk  # Quality Churn, score
-        else:
-            return 0, quality_risk  # Healthy, score
+        # Kurallar risk_rules'ta (create_risk_class ile aynı motor)
+        return score_record({**row_dict, 'Toplam_Yorum_Sayisi': toplam_yorum})
     
     def _save_single_result(self, result_dict):
         """
@@ -126,150 +289,521 @@ class LLMFeatureExtractor:
         result_dict['Risk_Class'] = risk_class
         result_dict['Risk_Score'] = risk_score
         
-        # Yeni satırı DataFrame'e çevir
-        new_row = pd.DataFrame([result_dict])
-        
-        # Dosya varsa append, yoksa create
-        if os.path.exists(self.output_path):
-            # Mevcut veriyi oku
-            df_existing = pd.read_csv(self.output_path)
-            # Yeni satırı ekle
-            df_updated = pd.concat([df_existing, new_row], ignore_index=True)
-            # Kaydet
-            df_updated.to_csv(self.output_path, index=False, encoding='utf-8-sig')
-        else:
-            # İlk kez oluştur
-            new_row.to_csv(self.output_path, index=False, encoding='utf-8-sig')
+        # Depoya tek satır ekle (dosyanın tamamı yeniden yazılmaz)
+        self.result_store.append(result_dict)
     
     def extract_product_comments(self, product_name, max_comments=100):
         """
         Bir ürüne ait yorumları çek
         Son yorumlara öncelik ver (daha güncel trendler)
         """
-        product_reviews = self.df_reviews[
-            self.df_reviews['Ürün'] == product_name
-        ].sort_values('parsed_date', ascending=False).head(max_comments)
+        if self.review_store is not None:
+            # Depo zaten ürün + tarih (yeniden eskiye) sıralı → sadece dilim
+            return self.review_store.product_comments(product_name, max_comments)
         
-        return product_reviews['duzeltilmis_yorum'].tolist()
+        start, stop = self._comment_ranges.get(product_name, (0, 0))
+        return self._sorted_comments[start:min(stop, start + max_comments)].tolist()
     
     def create_llm_prompt(self, comments_list):
         """
-        Claude için DÜZELTİLMİŞ prompt - Bilimsel eşiklerle
+        Ürüne özel kullanıcı mesajı: sadece yorumlar
+        (sabit kurallar ve örnekler SYSTEM_PROMPT'ta, prompt cache ile tekrar kullanılır)
+        Tekrarlanan yorumlar "(×k)" olarak birleştirilir, toplam yorum sayısı başlıkta verilir
         """
-        # Yorumları birleştir
-        comments_text = "\n".join([f"- {comment}" for comment in comments_list if str(comment) != 'HATA' and pd.notna(comment)])
-        
-        prompt = f"""Bir e-ticaret ürününe ait kullanıcı yorumlarını analiz ediyorsun. Görevin, GENEL eğilimi belirlemek (birkaç aykırı yorumu değil).
-
-YORUMLAR:
-{comments_text}
-
-Aşağıdaki bilgileri JSON formatında çıkar. SADECE JSON çıktısı ver, başka açıklama ekleme:
-
-{{
-  "fitment_problem": true/false,
-  "fitment_severity": 0-10,
-  "quality_sentiment": 1-5,
-  "delivery_issue": true/false,
-  "color_mismatch": true/false,
-  "main_complaint": "string",
-  "fabric_quality_issue": true/false,
-  "price_value_perception": 1-5
-}}
-
-KRİTİK KURALLAR - ÇOK ÖNEMLİ:
-
-1. fitment_problem: SADECE yorumların %20'sinden FAZLASI (5'te 1'i) beden/kalıp problemi belirtiyorsa TRUE. 
-   Örnek: 100 yorumda 20'den fazlası "büyük/küçük/bol/dar" diyorsa TRUE, değilse FALSE.
-
-2. fabric_quality_issue: SADECE yorumların %20'sinden FAZLASI kumaş kalitesinden şikayet ediyorsa TRUE.
-   Örnek: 100 yorumda 20'den fazlası "kumaş kötü/ince/kalitesiz" diyorsa TRUE, değilse FALSE.
-
-3. delivery_issue: SADECE yorumların %20'sinden FAZLASI teslimat sorunu belirtiyorsa TRUE.
-
-4. color_mismatch: SADECE yorumların %20'sinden FAZLASI renk uyumsuzluğu belirtiyorsa TRUE.
-
-5. quality_sentiment: ÇOĞUNLUĞUN genel kalite algısını yansıt.
-   - Çoğunluk "mükemmel/harika/kaliteli" diyorsa → 5
-   - Çoğunluk "iyi/güzel" diyorsa → 4
-   - Çoğunluk "orta" diyorsa → 3
-   - Çoğunluk "kötü" diyorsa → 2
-   - Çoğunluk "berbat" diyorsa → 1
+        prompt = f"""{self._format_comments(comments_list)}
 
-6. main_complaint: En sık tekrarlanan ciddi şikayeti yaz. Eğer ciddi şikayet yoksa "Genel memnuniyet yüksek" yaz.
-
-7. fitment_severity & price_value_perception: 0-10 arası, GENEL eğilimi yansıt.
+SADECE JSON çıktısı ver."""
 
-ÖRNEKLER:
-
-Senaryo 1:
-- 100 yorum
-- 95 kişi: "Mükemmel, harika, bayıldım"
-- 3 kişi: "Beden büyük geldi"
-- 2 kişi: "Kumaş ince"
-→ fitment_problem: FALSE (%3 < %20)
-→ fabric_quality_issue: FALSE (%2 < %20)
-→ quality_sentiment: 5
-→ main_complaint: "Genel memnuniyet yüksek"
-
-Senaryo 2:
-- 100 yorum
-- 30 kişi: "Beden çok büyük, kalıp kötü"
-- 70 kişi: "Güzel ürün"
-→ fitment_problem: TRUE (%30 > %20)
-→ fitment_severity: 7 (ciddi problem)
-→ quality_sentiment: 4 (çoğunluk memnun)
-→ main_complaint: "Beden büyük geliyor"
+        return prompt
+    
+    def _format_comments(self, comments_list):
+        """Yorum bloğu: başlık (toplam yorum) + "- " satırları"""
+        # Aynı/benzer yorumları "(×k)" satırlarına birleştir, token bütçesine sığdır
+        lines, total, omitted = select_comments(
+            comments_list,
+            token_budget=self.comment_token_budget,
+            threshold=self.near_duplicate_threshold
+        )
+        comments_text = "\n".join([f"- {line}" for line in lines])
+        if omitted:
+            comments_text += f"\n(+{omitted} yorum token bütçesi nedeniyle gösterilmedi)"
+        return f"YORUMLAR (toplam {total} yorum):\n{comments_text}"
+    
+    def create_packed_prompt(self, entries):
+        """
+        Birden fazla küçük ürün için tek kullanıcı mesajı
+        entries: [(ürün kimliği, yorumlar), ...]
+        """
+        blocks = "\n\n".join(
+            f"### ÜRÜN {product_id}\n{self._format_comments(comments)}"
+            for product_id, comments in entries
+        )
+        return f"""Aşağıda {len(entries)} farklı ürün var. Her ürünü AYRI AYRI, kendi yorumlarına göre analiz et.
 
-SADECE YAYGIN SORUNLARI RAPORLA! Birkaç kişinin söylemesi SORUN DEĞİLDİR."""
+{blocks}
 
-        return prompt
+SADECE bir JSON DİZİSİ ver: her ürün için bir nesne, "urun_id" alanı ürün kimliği
+(örn. "{entries[0][0]}"), diğer alanlar tek ürün formatıyla aynı."""
+    
+    def _build_request(self, prompt, model, max_tokens=1024, packed=False):
+        """
+        Messages API istek parametreleri (önbellek anahtarı da bunlardan üretilir)
+        Çıktı, tool_choice ile zorlanan tool'un JSON şemasına (8 alan + aralıklar) bağlanır
+        Fiyatı bilinmeyen model daha API'ye gitmeden ValueError verir (maliyet raporu yanlış olmasın)
+        """
+        model_prices(model, self.metrics.prices)
+        return {
+            'model': model,
+            'max_tokens': max_tokens,
+            'system': [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}],
+            'messages': [{"role": "user", "content": prompt}],
+            'tools': [tool_definition(packed)],
+            'tool_choice': {"type": "tool", "name": PACKED_TOOL_NAME if packed else TOOL_NAME}
+        }
     
-    def call_llm_api(self, prompt, model="claude-sonnet-4-5-20250929"):
+    def call_llm_api(self, prompt, model="claude-sonnet-4-5-20250929", rate_limiter=None,
+                     max_tokens=1024, packed=False):
         """
-        Claude API'ye istek gönder
+        Claude API'ye istek gönder (önbellekte varsa API'ye gitmeden döner)
+        rate_limiter: sadece gerçek API çağrılarında uygulanır
+        Returns: doğrulanmış sonuç veya None (sebep yazdırılır)
         """
         try:
-            response = self.client.messages.create(
-                model=model,
-                max_tokens=1024,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            
-            # Response'u temizle
-            response_text = response.content[0].text.strip()
-            
-            # Markdown code block temizliği
-            if response_text.startswith("```json"):
-                response_text = response_text[7:]
-            if response_text.startswith("```"):
-                response_text = response_text[3:]
-            if response_text.endswith("```"):
-                response_text = response_text[:-3]
+            return self._call_llm(prompt, model, rate_limiter, max_tokens, packed)
+        except LLMCallError as e:
+            print(f"⚠️ API hatası: {e}")
+            return None
+    
+    def _call_llm(self, prompt, model="claude-sonnet-4-5-20250929", rate_limiter=None,
+                  max_tokens=1024, packed=False, products=1):
+        """
+        call_llm_api'nin hata fırlatan hali
+        products: isteğin kapsadığı ürün sayısı (telemetri için)
+        Returns: tek ürün için 8 alanlı dict, packed=True ise ürün listesi
+        Raises: LLMCallError (API hatası, parse edilemeyen ya da şemaya uymayan yanıt)
+        """
+        request = self._build_request(prompt, model, max_tokens, packed)
+        cache_key = None
+        if self.response_cache is not None:
+            cache_key = self.response_cache.make_key(request)
+            cached_text = self.response_cache.get(cache_key)
+            if cached_text is not None:
+                return self._validated_payload(self._parse_response_text(cached_text), packed)
+        
+        # Token/dakika sınırına her çağrıda gönderilen sistem prompt'u da girer
+        tokens = SYSTEM_PROMPT_TOKENS + estimate_tokens(prompt)
+        response, timing = self._create_with_backoff(request, rate_limiter, tokens, products)
+        self._record_usage(response.usage)
+        try:
+            result = self._validated_payload(self._response_payload(response), packed)
+        except LLMCallError:
+            # Ücreti ödenmiş ama kullanılamayan yanıt: telemetride hata olarak sayılır
+            self.metrics.record(model, usage=response.usage, products=products,
+                                error='invalid_response', **timing)
+            raise
+        self.metrics.record(model, usage=response.usage, products=products, **timing)
+        
+        # Sadece doğrulanan yanıtlar önbelleğe alınır
+        if cache_key is not None:
+            payload = {'urunler': result} if packed else result
+            self.response_cache.put(cache_key, json.dumps(payload, ensure_ascii=False),
+                                    request={'model': model})
+        return result
+    
+    def _create_with_backoff(self, request, rate_limiter=None, tokens=1, products=1):
+        """
+        messages.create; 429 / 5xx / bağlantı hatalarında jitter'lı üstel bekleme
+        ile en fazla max_retries kez tekrar (sunucunun retry-after değerine uyulur)
+        Returns: (yanıt, {'latency_s', 'retries', 'wait_s'}); başarısız çağrı telemetriye burada yazılır
+        Raises: LLMCallError
+        """
+        wait_s = 0.0
+        for attempt in range(self.max_retries + 1):
+            wait_start = time.perf_counter()
+            if rate_limiter is not None:
+                rate_limiter.acquire(tokens=tokens)
+            with self._lock:
+                self.api_calls += 1
             
-            response_text = response_text.strip()
+            call_start = time.perf_counter()
+            wait_s += call_start - wait_start
+            try:
+                response = self.client.messages.create(**request)
+            except anthropic.APIError as e:
+                status = getattr(e, 'status_code', None)
+                retryable = (isinstance(e, anthropic.APIConnectionError)
+                             or (status is not None and (status == 429 or status >= 500)))
+                if not retryable or attempt == self.max_retries:
+                    self.metrics.record(request['model'], latency_s=time.perf_counter() - call_start,
+                                        retries=attempt, wait_s=wait_s, products=products,
+                                        error=type(e).__name__)
+                    raise LLMCallError(f"{type(e).__name__}: {e}") from e
+                
+                with self._lock:
+                    self.retries += 1
+                delay = backoff_delay(attempt, retry_after=self._retry_after(e))
+                time.sleep(delay)
+                wait_s += delay
+                continue
             
-            # JSON parse et
-            result = json.loads(response_text)
-            return result
+            return response, {'latency_s': time.perf_counter() - call_start,
+                              'retries': attempt, 'wait_s': wait_s}
+    
+    @staticmethod
+    def _retry_after(error):
+        """Hata yanıtındaki retry-after başlığı (saniye) veya None"""
+        response = getattr(error, 'response', None)
+        try:
+            return float(response.headers['retry-after'])
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return None
+    
+    def _response_payload(self, message):
+        """
+        Yanıttaki tool_use girdisi; tool kullanılmamışsa metin bloğu JSON olarak
+        Returns: JSON nesnesi / dizisi veya None
+        """
+        for block in message.content:
+            if getattr(block, 'type', None) == 'tool_use':
+                return block.input
+        text = ''.join(getattr(block, 'text', '') for block in message.content)
+        return self._parse_response_text(text)
+    
+    @staticmethod
+    def _validated_payload(payload, packed=False):
+        """
+        Yanıtı şemaya göre doğrula
+        Tek ürün: 8 alan tip + aralık kontrolü
+        Paket: {"urunler": [...]} veya dizi; elemanlar _process_pack'te tek tek doğrulanır
+        Raises: LLMCallError
+        """
+        if payload is None:
+            raise LLMCallError("yanıt JSON olarak okunamadı")
+        
+        if packed:
+            if isinstance(payload, dict):
+                payload = payload.get('urunler')
+            if not isinstance(payload, list):
+                raise LLMCallError("paket yanıtı ürün listesi içermiyor")
+            return payload
+        
+        errors = validate_result(payload)
+        if errors:
+            raise LLMCallError("şemaya uymayan yanıt: " + "; ".join(errors))
+        return {field: payload[field] for field in LLM_FIELDS}
+    
+    def _record_usage(self, usage):
+        """Yanıttaki token sayılarını (prompt cache okuma/yazma dahil) topla"""
+        with self._lock:
+            for field in USAGE_FIELDS:
+                self.token_usage[field] += getattr(usage, field, None) or 0
+    
+    def _report_usage(self):
+        """Toplam token kullanımı ve prompt cache oranı"""
+        usage = self.token_usage
+        prompt_tokens = (usage['input_tokens'] + usage['cache_creation_input_tokens']
+                         + usage['cache_read_input_tokens'])
+        if prompt_tokens == 0:
+            return
+        print(f"   🔢 Token: {usage['input_tokens']:,} input, {usage['output_tokens']:,} output, "
+              f"{usage['cache_creation_input_tokens']:,} cache yazma, "
+              f"{usage['cache_read_input_tokens']:,} cache okuma "
+              f"(prompt'un %{usage['cache_read_input_tokens'] / prompt_tokens * 100:.1f}'i önbellekten)")
+    
+    @staticmethod
+    def _parse_response_text(response_text):
+        """
+        Claude yanıt metnini JSON'a çevir (markdown code block temizliği dahil)
+        """
+        # Response'u temizle
+        response_text = response_text.strip()
+        
+        # Markdown code block temizliği
+        if response_text.startswith("```json"):
+            response_text = response_text[7:]
+        if response_text.startswith("```"):
+            response_text = response_text[3:]
+        if response_text.endswith("```"):
+            response_text = response_text[:-3]
+        
+        response_text = response_text.strip()
         
+        # JSON parse et
+        try:
+            return json.loads(response_text)
         except json.JSONDecodeError as e:
             print(f"⚠️ JSON parse hatası: {e}")
             return None
-        except Exception as e:
-            print(f"⚠️ API hatası: {e}")
+    
+    def _process_product(self, product_name, rate_limiter=None):
+        """
+        Tek bir ürünü işle: yorumlar → prompt → Claude → kaydet
+        Returns: başarılıysa True
+        """
+        # Yorumları çek
+        with profiler.stage('extract_comments') as stage:
+            comments = self.extract_product_comments(product_name)
+            stage['rows_out'] = len(comments)
+        
+        if len(comments) == 0:
+            print(f"⚠️ {product_name[:50]} için yorum bulunamadı")
+            return False
+        
+        # Yerel ön eleme: açıkça belli ürünler API'siz kaydedilir
+        triage_result = self._triage_product(product_name, comments)
+        if triage_result is True:
+            return True
+        
+        # Yerel model yeterince eminse API'ye gitmeden kaydedilir
+        if triage_result is None and self._local_label(product_name, comments):
+            return True
+        
+        return self._query_product(product_name, comments, triage_result, rate_limiter)
+    
+    def _query_product(self, product_name, comments, triage_result=None, rate_limiter=None):
+        """
+        Tek ürünü Claude'a sor ve kaydet
+        Returns: başarılıysa True
+        """
+        # Claude'a gönder
+        prompt = self.create_llm_prompt(comments)
+        with self._lock:
+            self.llm_products.add(product_name)
+        try:
+            with profiler.stage('llm_call', rows_in=len(comments)):
+                llm_result = self._call_llm(prompt, rate_limiter=rate_limiter)
+        except LLMCallError as e:
+            # Kaybolmasın: çalışmanın sonunda tekrar denenir
+            print(f"⚠️ {product_name[:50]}: {e}")
+            self._add_dead_letter(product_name, str(e))
+            return False
+        
+        # Ürün bilgilerini ekle
+        self._add_product_info(llm_result, product_name, comments, 'llm')
+        self._record_triage_audit(triage_result, llm_result)
+        
+        self._store_result(llm_result)
+        return True
+    
+    def _add_dead_letter(self, product_name, reason):
+        """Başarısız ürünü dead-letter kuyruğuna ekle"""
+        with self._lock:
+            self.dead_letters.append({'Ürün': product_name, 'Sebep': reason})
+    
+    @staticmethod
+    def _add_product_info(result, product_name, comments, source):
+        """Sonuca ürün ismi, yorum sayısı, etiket kaynağı ve yorum kümesi parmak izini ekle"""
+        result['Ürün'] = product_name
+        result['Yorum_Sayisi'] = len(comments)
+        result['Etiket_Kaynagi'] = source
+        result['Yorum_Parmak_Izi'] = comment_fingerprint(comments)
+    
+    def _store_result(self, llm_result):
+        """Sonucu ANINDA kaydet ve ürünü işlenmiş olarak işaretle"""
+        # ANINDA KAYDET! 💾 (depo eşzamanlı yazmaya dayanıklı)
+        with profiler.stage('save_result', rows_in=1):
+            self._save_single_result(llm_result)
+        
+        # İşlenmiş olarak işaretle
+        with self._lock:
+            self.processed_products.add(llm_result['Ürün'])
+    
+    def _process_pack(self, entries, rate_limiter=None):
+        """
+        Küçük ürünleri tek istekte sor, yanıt dizisini ürünlere böl ve doğrula
+        Dizide eksik / hatalı dönen ürünler tek tek tekrar sorulur
+        entries: [(ürün ismi, yorumlar), ...]
+        Returns: başarıyla kaydedilen ürün sayısı
+        """
+        ids = {f"U{i + 1}": entry for i, entry in enumerate(entries)}
+        with self._lock:
+            self.llm_products.update(product_name for product_name, _ in entries)
+        prompt = self.create_packed_prompt([(product_id, comments) for product_id, (_, comments) in ids.items()])
+        try:
+            with profiler.stage('llm_call_packed', rows_in=len(entries)):
+                response = self._call_llm(prompt, rate_limiter=rate_limiter,
+                                          max_tokens=min(8192, 256 * len(entries) + 256),
+                                          packed=True, products=len(entries))
+        except LLMCallError as e:
+            print(f"⚠️ {len(entries)} ürünlük paket: {e}")
+            response = []
+        
+        # urun_id → sonuç (beklenmeyen kimlikler yok sayılır)
+        by_id = {}
+        for item in response:
+            if isinstance(item, dict) and item.get('urun_id') in ids:
+                by_id[item['urun_id']] = item
+        
+        success_count, retry = 0, []
+        for product_id, (product_name, comments) in ids.items():
+            item = by_id.get(product_id)
+            if item is None or validate_result(item):
+                retry.append((product_name, comments))
+                continue
+            llm_result = {field: item[field] for field in LLM_FIELDS}
+            self._add_product_info(llm_result, product_name, comments, 'llm')
+            self._store_result(llm_result)
+            success_count += 1
+        
+        # Sadece başarısız elemanları tek tek tekrar dene
+        if retry:
+            with self._lock:
+                self.pack_retries += len(retry)
+        for product_name, comments in retry:
+            if self._query_product(product_name, comments, rate_limiter=rate_limiter):
+                success_count += 1
+        return success_count
+    
+    def _plan_packs(self, products_to_process, pack_token_budget, max_pack_size):
+        """
+        Ürünleri iş birimlerine ayır: küçük ürünler token bütçesine kadar paketlenir
+        Returns: [(etiket, rate_limiter alan fonksiyon), ...]
+        """
+        units, pack, pack_tokens = [], [], 0
+        small_limit = pack_token_budget // 4  # bundan büyük ürünler tek başına sorulur
+        
+        def flush():
+            if len(pack) == 1:
+                units.append((pack[0][0], partial(self._query_product, *pack[0])))
+            elif pack:
+                units.append((f"{len(pack)} ürünlük paket", partial(self._process_pack, list(pack))))
+        
+        for product_name in tqdm(products_to_process, desc="Packing"):
+            comments = self.extract_product_comments(product_name)
+            if len(comments) == 0:
+                continue
+            
+            tokens = estimate_tokens(self._format_comments(comments))
+            if tokens > small_limit:
+                units.append((product_name, partial(self._process_product, product_name)))
+                continue
+            
+            triage_result = self._triage_product(product_name, comments)
+            if triage_result is True:
+                continue
+            if triage_result is not None:
+                # Denetim örneği: karşılaştırma için tek başına sorulur
+                units.append((product_name, partial(self._query_product, product_name, comments, triage_result)))
+                continue
+            if self._local_label(product_name, comments):
+                continue
+            
+            if pack and (pack_tokens + tokens > pack_token_budget or len(pack) >= max_pack_size):
+                flush()
+                pack, pack_tokens = [], 0
+            pack.append((product_name, comments))
+            pack_tokens += tokens
+        
+        flush()
+        return units
+    
+    def _run_unit(self, unit, rate_limiter=None):
+        """İş birimini çalıştır; Returns: kaydedilen ürün sayısı"""
+        _, task = unit
+        return int(task(rate_limiter=rate_limiter))
+    
+    def _triage_product(self, product_name, comments):
+        """
+        Ön eleme uygula
+        Returns: True  → ürün ön eleme etiketiyle kaydedildi (API çağrısı yok)
+                 dict  → etiketlendi ama denetim örneği (LLM'e de sorulacak)
+                 None  → belirsiz ya da ön eleme kapalı
+        """
+        if self.triage is None:
+            return None
+        
+        with profiler.stage('triage', rows_in=len(comments)):
+            result = self.triage.label(self.product_stats.get(product_name), comments)
+        if result is None:
             return None
+        
+        self._add_product_info(result, product_name, comments, 'triage')
+        if self.triage.should_audit(product_name):
+            return result
+        
+        self._save_single_result(result)
+        self.triage.record_skip()
+        with self._lock:
+            self.processed_products.add(product_name)
+        return True
     
-    def process_all_products(self, max_products=None, delay=1.0):
+    def _local_label(self, product_name, comments):
+        """
+        Yerel modelle etiketlemeyi dene
+        Returns: True → güven eşiğin üstünde, sonuç kaydedildi (API çağrısı yok)
+        """
+        if self.local_model is None:
+            return False
+        
+        with profiler.stage('local_model', rows_in=len(comments)):
+            result = self.local_model.label(comments)
+        if result is None:
+            return False
+        
+        self._add_product_info(result, product_name, comments, 'local_model')
+        self._save_single_result(result)
+        with self._lock:
+            self.processed_products.add(product_name)
+        return True
+    
+    def _report_local_model(self):
+        """Yerel modelin API'siz etiketlediği / LLM'e bıraktığı ürün sayıları"""
+        counts = self.local_model.counts
+        total = counts['labeled'] + counts['fallback']
+        if total == 0:
+            return
+        print(f"   🧠 Yerel model: {counts['labeled']} ürün API'siz etiketlendi, "
+              f"{counts['fallback']} ürün güven < {self.local_model.confidence_threshold} "
+              f"nedeniyle LLM'e gitti (%{counts['labeled'] / total * 100:.1f} kapsama)")
+    
+    def _record_triage_audit(self, triage_result, llm_result):
+        """Denetim örneğinde ön eleme ve LLM etiketlerini (risk sınıfı dahil) karşılaştır"""
+        if not isinstance(triage_result, dict):
+            return
+        triage_result['Risk_Class'], triage_result['Risk_Score'] = self._calculate_risk_class(triage_result)
+        llm_labels = dict(llm_result)
+        llm_labels['Risk_Class'], llm_labels['Risk_Score'] = self._calculate_risk_class(llm_labels)
+        self.triage.record_audit(triage_result, llm_labels)
+    
+    def _report_triage(self):
+        """API tasarrufu ve denetim uyumunu yazdır"""
+        summary = self.triage.report(len(self.llm_products))
+        print(f"   🔎 Ön eleme: {summary['skipped']} ürün API'siz etiketlendi "
+              f"(sağlıklı {summary['healthy']}, engagement {summary['engagement']}, "
+              f"belirsiz {summary['ambiguous']}); {summary['triaged']} üründen "
+              f"{summary['llm_products']} tanesi LLM'e gitti → API çağrısı %{summary['api_call_reduction']*100:.1f} azaldı")
+        if summary['audited']:
+            fields = ', '.join(f"{field} %{rate*100:.0f}" for field, rate in summary['field_agreement'].items())
+            print(f"   🔎 Denetim: {summary['audited']} ürün, Risk_Class uyumu "
+                  f"%{summary['risk_class_agreement']*100:.1f} ({fields})")
+    
+    def process_all_products(self, max_products=None, delay=1.0, max_concurrency=1,
+                             requests_per_minute=None, tokens_per_minute=None,
+                             pack_token_budget=None, max_pack_size=20, refresh_threshold=None,
+                             dead_letter_retries=1):
         """
         Tüm ürünler için LLM özelliklerini çıkar
         HER ÜRÜN İŞLENİNCE ANINDA KAYDEDER!
+        
+        max_concurrency > 1: aynı anda en fazla bu kadar istek (thread havuzu);
+        bu modda sabit delay yerine requests_per_minute / tokens_per_minute
+        token-bucket sınırları uygulanır
+        pack_token_budget: verilirse az yorumlu ürünler bu yorum-token bütçesine
+        kadar (en fazla max_pack_size ürün) tek istekte paketlenir
+        refresh_threshold: verilirse daha önce işlenmiş ürünlerden yorum kümesi bu
+        orandan fazla değişenler (0-1, MinHash tahmini) yeniden sorgulanır
+        dead_letter_retries: başarısız ürünlerin çalışmanın sonunda kaç tur daha
+        deneneceği; yine başarısız olanlar <output>_dead_letter.json'a yazılır
         """
         products = self.df_products['Ürün'].tolist()
         
         # Sadece işlenmemiş ürünleri al
         products_to_process = [p for p in products if p not in self.processed_products]
         
+        # Yenileme: yorumları değişmiş ürünleri de ekle
+        if refresh_threshold is not None:
+            products_to_process += self._changed_products(refresh_threshold)
+        
         if max_products:
             products_to_process = products_to_process[:max_products]
         
@@ -283,47 +817,313 @@ SADECE YAYGIN SORUNLARI RAPORLA! Birkaç kişinin söylemesi SORUN DEĞİLDİR."
             print("\n✅ Tüm ürünler zaten işlenmiş!")
             return
         
-        success_count = 0
+        # İş birimleri: tek ürün veya paket
+        if pack_token_budget:
+            units = self._plan_packs(products_to_process, pack_token_budget, max_pack_size)
+            n_packs = sum(task.func == self._process_pack for _, task in units)
+            print(f"   📦 Paketleme: {len(units)} istek ({n_packs} paket)")
+        else:
+            units = [(product_name, partial(self._process_product, product_name))
+                     for product_name in products_to_process]
         
-        for product_name in tqdm(products_to_process, desc="Processing"):
-            # Yorumları çek
-            comments = self.extract_product_comments(product_name)
-            
-            if len(comments) == 0:
-                print(f"⚠️ {product_name[:50]} için yorum bulunamadı")
-                continue
-            
-            # Claude'a gönder
-            prompt = self.create_llm_prompt(comments)
-            llm_result = self.call_llm_api(prompt)
+        rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute) if max_concurrency > 1 else None
+        success_count = self._run_units(units, delay, max_concurrency, rate_limiter)
+        
+        # Dead-letter: başarısız ürünler çalışmanın sonunda tek tek tekrar denenir
+        for _ in range(dead_letter_retries):
+            if not self.dead_letters:
+                break
+            retry = list(dict.fromkeys(letter['Ürün'] for letter in self.dead_letters))
+            self.dead_letters = []
+            print(f"\n📮 Dead-letter: {len(retry)} başarısız ürün tekrar deneniyor")
+            success_count += self._run_units(
+                [(product_name, partial(self._process_product, product_name)) for product_name in retry],
+                delay, max_concurrency, rate_limiter
+            )
+        
+        print(f"\n✅ {success_count} ürün için LLM özellikleri çıkarıldı ve kaydedildi")
+        print(f"   API çağrısı: {self.api_calls}")
+        if self.retries:
+            print(f"   🔁 429/5xx/bağlantı hatası sonrası tekrar: {self.retries}")
+        if self.pack_retries:
+            print(f"   📦 Paketten tek tek tekrar sorulan ürün: {self.pack_retries}")
+        self._write_dead_letters()
+        self._report_usage()
+        self.metrics.print_summary()
+        if self.triage is not None:
+            self._report_triage()
+        if self.local_model is not None:
+            self._report_local_model()
+        if self.response_cache is not None:
+            self._report_cache()
+    
+    def _run_units(self, units, delay, max_concurrency, rate_limiter=None):
+        """İş birimlerini sırayla (delay ile) ya da thread havuzunda çalıştır; Returns: kaydedilen ürün sayısı"""
+        if max_concurrency > 1:
+            return self._process_concurrently(units, max_concurrency, rate_limiter)
+        
+        success_count = 0
+        for unit in tqdm(units, desc="Processing"):
+            calls_before = self.api_calls
+            success_count += self._run_unit(unit)
             
-            if llm_result:
-                # Ürün bilgilerini ekle
-                llm_result['Ürün'] = product_name
-                llm_result['Yorum_Sayisi'] = len(comments)
+            # Rate limit (önbellekten gelen yanıtlarda beklemeye gerek yok)
+            if self.api_calls > calls_before:
+                time.sleep(delay)
+        return success_count
+    
+    def _dead_letter_path(self):
+        return os.path.splitext(self.output_path)[0] + '_dead_letter.json'
+    
+    def _write_dead_letters(self):
+        """
+        Hâlâ başarısız ürünleri sebepleriyle dosyaya yaz (kuyruk boşsa eski dosyayı sil)
+        Bu ürünler depoda olmadığı için sonraki çalıştırmada yine işlenir
+        """
+        path = self._dead_letter_path()
+        if not self.dead_letters:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.dead_letters, f, ensure_ascii=False, indent=2)
+        print(f"   📮 {len(self.dead_letters)} ürün başarısız kaldı: {path}")
+    
+    def _changed_products(self, threshold):
+        """
+        İşlenmiş ürünlerden yorum kümesi threshold'dan fazla değişenler
+        Parmak izi olmayan eski kayıtlara mevcut parmak izi eklenir (yeniden sorgulanmaz)
+        """
+        stored = self.result_store.field_values('Yorum_Parmak_Izi')
+        changed, backfilled = [], 0
+        with profiler.stage('refresh_scan', rows_in=len(stored)):
+            for product_name in tqdm(self.df_products['Ürün'].tolist(), desc="Refresh scan"):
+                if product_name not in stored:
+                    continue
+                fingerprint = comment_fingerprint(self.extract_product_comments(product_name))
+                if not stored[product_name]:
+                    record = self.result_store.get(product_name)
+                    record['Yorum_Parmak_Izi'] = fingerprint
+                    self.result_store.append(record)
+                    backfilled += 1
+                elif fingerprint_change(stored[product_name], fingerprint) > threshold:
+                    changed.append(product_name)
+        
+        print(f"   🔄 Yenileme: {len(changed)} ürünün yorumları %{threshold*100:.0f}'den fazla değişti"
+              + (f", {backfilled} eski kayda parmak izi eklendi" if backfilled else ""))
+        return changed
+    
+    def _report_cache(self):
+        """Önbellek eviction'ını uygula ve hit/miss özetini yazdır"""
+        removed = self.response_cache.evict()
+        stats = self.response_cache.stats()
+        print(f"   🗃️ Yanıt önbelleği: {stats['hits']} hit / {stats['misses']} miss "
+              f"(%{stats['hit_rate']*100:.1f}), {stats['entries']} kayıt, "
+              f"{stats['size_mb']:.1f} MB" + (f", {removed} kayıt silindi" if removed else ""))
+    
+    def _process_concurrently(self, units, max_concurrency, rate_limiter):
+        """
+        İş birimlerini thread havuzunda işle (en fazla max_concurrency istek uçuşta)
+        """
+        print(f"   ⚡ Eşzamanlı mod: {max_concurrency} istek, "
+              f"limit: {rate_limiter.requests_per_minute or 'sınırsız'} istek/dk, "
+              f"{rate_limiter.tokens_per_minute or 'sınırsız'} token/dk")
+        
+        success_count = 0
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            futures = {
+                executor.submit(self._run_unit, unit, rate_limiter): unit
+                for unit in units
+            }
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Processing"):
+                try:
+                    success_count += future.result()
+                except Exception as e:
+                    print(f"⚠️ {futures[future][0][:50]} işlenemedi: {e}")
+        return success_count
+    
+    def process_all_products_batch(self, max_products=None, model="claude-sonnet-4-5-20250929",
+                                   poll_interval=60.0, batch_state_path=None,
+                                   max_batch_requests=BATCH_MAX_REQUESTS, max_batch_bytes=BATCH_MAX_BYTES):
+        """
+        Gece çalışmaları için BATCH modu (Message Batches API)
+        1. Tüm prompt'ları oluştur (önbellekte olanlar direkt kaydedilir)
+        2. API sınırlarına (max_batch_requests istek, max_batch_bytes gövde) sığan
+           bir veya daha fazla asenkron message batch olarak gönder
+        3. Hepsi tamamlanana kadar yokla, sonuçları akış halinde depoya yaz
+        
+        batch_state_path: gönderilen batch'lerin kimlikleri ve custom_id → ürün eşlemesi
+            (her batch gönderilince güncellenir; yoklama yarıda kesilirse tekrar
+            çalıştırınca aynı batch'ler beklenir)
+        """
+        if batch_state_path is None:
+            batch_state_path = os.path.splitext(self.output_path)[0] + '_batch.json'
+        
+        if os.path.exists(batch_state_path):
+            with open(batch_state_path, encoding='utf-8') as f:
+                state = json.load(f)
+            if 'batch_id' in state:  # tek batch'li eski durum dosyası
+                state['batch_ids'] = [state.pop('batch_id')]
+            print(f"\n📂 Bekleyen batch bulundu: {', '.join(state['batch_ids'])} "
+                  f"({len(state['products'])} ürün)")
+        else:
+            state = self._submit_batch(max_products, model, batch_state_path,
+                                       max_batch_requests, max_batch_bytes)
+            if state is None:
+                return
+        
+        # Hepsi tamamlanana kadar yokla
+        with profiler.stage('batch_wait'):
+            pending = list(state['batch_ids'])
+            while True:
+                processing, succeeded = 0, 0
+                for batch_id in list(pending):
+                    batch = self.client.messages.batches.retrieve(batch_id)
+                    if batch.processing_status == 'ended':
+                        pending.remove(batch_id)
+                    processing += batch.request_counts.processing
+                    succeeded += batch.request_counts.succeeded
+                if not pending:
+                    break
+                print(f"   ⏳ {len(pending)}/{len(state['batch_ids'])} batch işleniyor: "
+                      f"{processing} bekliyor, {succeeded} tamam")
+                time.sleep(poll_interval)
+        
+        # Tüm batch'lerin sonuçlarını akış halinde depoya yaz
+        success_count, failed = 0, []
+        with profiler.stage('batch_results') as stage:
+            for batch_id in state['batch_ids']:
+                for item in self.client.messages.batches.results(batch_id):
+                    product_name, n_comments, cache_key, fingerprint = state['products'][item.custom_id]
+                    try:
+                        if item.result.type != 'succeeded':
+                            self.metrics.record(state['model'], error=item.result.type, batch=True)
+                            raise LLMCallError(f"batch sonucu: {item.result.type}")
+                        self._record_usage(item.result.message.usage)
+                        self.metrics.record(state['model'], usage=item.result.message.usage, batch=True)
+                        llm_result = self._validated_payload(self._response_payload(item.result.message))
+                    except LLMCallError as e:
+                        failed.append({'Ürün': product_name, 'Sebep': str(e)})
+                        continue
+                    
+                    if self.response_cache is not None:
+                        self.response_cache.put(cache_key, json.dumps(llm_result, ensure_ascii=False),
+                                                request={'model': state['model']})
+                    
+                    llm_result['Ürün'] = product_name
+                    llm_result['Yorum_Sayisi'] = n_comments
+                    llm_result['Etiket_Kaynagi'] = 'llm'
+                    llm_result['Yorum_Parmak_Izi'] = fingerprint
+                    self._save_single_result(llm_result)
+                    self.processed_products.add(product_name)
+                    success_count += 1
+            stage['rows_out'] = success_count
+        
+        os.remove(batch_state_path)
+        print(f"\n✅ Batch tamamlandı: {success_count} ürün kaydedildi "
+              f"({len(state['batch_ids'])} batch)")
+        self._report_usage()
+        self.metrics.print_summary()
+        # Başarısızlar depoda değil: sonraki çalıştırmada (canlı ya da batch) tekrar denenir
+        self.dead_letters = failed
+        self._write_dead_letters()
+    
+    def _submit_batch(self, max_products, model, batch_state_path,
+                      max_batch_requests=BATCH_MAX_REQUESTS, max_batch_bytes=BATCH_MAX_BYTES):
+        """
+        İşlenmemiş ürünler için istekleri oluştur, sınırlara göre parçalayıp gönder
+        Durum dosyası her batch'ten sonra yazılır: gönderim yarıda kesilirse gönderilmiş
+        batch'ler kaybolmaz, gönderilmemiş ürünler sonraki çalıştırmada tekrar hazırlanır
+        Returns: batch durumu (batch_ids, custom_id → [ürün, yorum sayısı, önbellek anahtarı,
+                 parmak izi]) veya None
+        """
+        products_to_process = [p for p in self.df_products['Ürün'].tolist()
+                               if p not in self.processed_products]
+        if max_products:
+            products_to_process = products_to_process[:max_products]
+        
+        print(f"\n📦 Batch hazırlanıyor: {len(products_to_process)} ürün")
+        
+        requests, products, cached = {}, {}, 0
+        with profiler.stage('batch_prepare', rows_in=len(products_to_process)):
+            for i, product_name in enumerate(tqdm(products_to_process, desc="Prompts")):
+                comments = self.extract_product_comments(product_name)
+                if len(comments) == 0:
+                    continue
                 
-                # ANINDA KAYDET! 💾
-                self._save_single_result(llm_result)
+                triage_result = self._triage_product(product_name, comments)
+                if triage_result is True:
+                    continue
+                if triage_result is None and self._local_label(product_name, comments):
+                    continue
                 
-                # İşlenmiş olarak işaretle
-                self.processed_products.add(product_name)
-                success_count += 1
-            
-            # Rate limit
-            time.sleep(delay)
+                request = self._build_request(self.create_llm_prompt(comments), model)
+                cache_key = ResponseCache.make_key(request)
+                
+                # Önbellekte olan ürünler batch'e girmez
+                if self.response_cache is not None:
+                    cached_text = self.response_cache.get(cache_key)
+                    try:
+                        llm_result = cached_text and self._validated_payload(
+                            self._parse_response_text(cached_text))
+                    except LLMCallError:
+                        llm_result = None
+                    if llm_result:
+                        self._add_product_info(llm_result, product_name, comments, 'llm')
+                        self._save_single_result(llm_result)
+                        self.processed_products.add(product_name)
+                        cached += 1
+                        continue
+                
+                # custom_id sadece [a-zA-Z0-9_-] içerebilir → ürün ismi eşlemede tutulur
+                custom_id = f"urun-{i:06d}"
+                requests[custom_id] = request
+                products[custom_id] = [product_name, len(comments), cache_key,
+                                       comment_fingerprint(comments)]
         
-        print(f"\n✅ {success_count} ürün için LLM özellikleri çıkarıldı ve kaydedildi")
+        if cached:
+            print(f"   🗃️ {cached} ürün önbellekten kaydedildi")
+        if self.triage is not None:
+            # Batch modunda denetim örnekleri de gönderilir ama karşılaştırma yapılmaz
+            self.llm_products.update(product_name for product_name, *_ in products.values())
+            self._report_triage()
+        if self.local_model is not None:
+            self._report_local_model()
+        if not requests:
+            print("\n✅ Gönderilecek ürün kalmadı!")
+            return None
+        
+        chunks = split_batch_requests(
+            [{'custom_id': custom_id, 'params': request} for custom_id, request in requests.items()],
+            max_batch_requests, max_batch_bytes
+        )
+        state = {'batch_ids': [], 'model': model, 'products': {}}
+        with profiler.stage('batch_submit', rows_in=len(requests)):
+            for chunk in chunks:
+                batch = self.client.messages.batches.create(requests=chunk)
+                self.api_calls += 1
+                state['batch_ids'].append(batch.id)
+                state['products'].update((entry['custom_id'], products[entry['custom_id']])
+                                         for entry in chunk)
+                with open(batch_state_path, 'w', encoding='utf-8') as f:
+                    json.dump(state, f, ensure_ascii=False)
+                print(f"   🚀 Batch gönderildi: {batch.id} ({len(chunk)} istek)")
+        return state
     
     def merge_with_product_features(self):
         """
         LLM özelliklerini Phase 1'deki özelliklerle birleştir
         """
-        if not os.path.exists(self.output_path):
+        if len(self.result_store) == 0:
             print("⚠️ Henüz hiç ürün işlenmemiş!")
             return None
         
-        # LLM sonuçlarını oku
-        df_llm = pd.read_csv(self.output_path)
+        # LLM sonuçlarını depodan tek seferde ara tabloya yaz (compact)
+        with profiler.stage('compact_results') as stage:
+            df_llm = self.result_store.compact(self.output_path, LLM_RESULTS_SCHEMA)
+            stage['rows_out'] = len(df_llm)
+        print(f"💾 Ara sonuçlar yazıldı: {self.output_path} ({len(df_llm)} ürün)")
         
         # Phase 1 ile birleştir
         df_final = self.df_products.merge(
@@ -338,44 +1138,8 @@ SADECE YAYGIN SORUNLARI RAPORLA! Birkaç kişinin söylemesi SORUN DEĞİLDİR."
         """
         Risk_Class ve Risk_Score oluştur (SADECE LLM özellikleriyle)
         """
-        def classify_product(row):
-            # 1. ENGAGEMENT CHURN (az yorum)
-            if row['Toplam_Yorum_Sayisi'] < 5:
-                return 2, 0  # Engagement churn, score 0
-            
-            # 2. QUALITY CHURN (LLM özellikleri)
-            quality_risk = 0
-            
-            # Kalıp problemi VAR ve ciddi
-            if row['fitment_problem'] == True and row['fitment_severity'] >= 7:
-                quality_risk += 3
-            elif row['fitment_problem'] == True:
-                quality_risk += 1
-            
-            # Kumaş kalitesi problemi VAR
-            if row['fabric_quality_issue'] == True:
-                quality_risk += 2
-            
-            # LLM kalite algısı düşük
-            if row['quality_sentiment'] <= 2:
-                quality_risk += 3
-            elif row['quality_sentiment'] == 3:
-                quality_risk += 1
-            
-            # Teslimat problemi VAR
-            if row['delivery_issue'] == True:
-                quality_risk += 1
-            
-            # 3. SINIFLANDIRMA
-            if quality_risk >= 4:
-                return 1, quality_risk  # Quality Churn
-            else:
-                return 0, quality_risk  # Healthy
-        
-        # Her satır için hem class hem score hesapla
-        results = df.apply(classify_product, axis=1)
-        df['Risk_Class'] = results.apply(lambda x: x[0])
-        df['Risk_Score'] = results.apply(lambda x: x[1])
+        # Kurallar risk_rules'ta; tüm tablo tek seferde kolon işlemleriyle puanlanır
+        df['Risk_Class'], df['Risk_Score'] = score_frame(df)
         
         # Dağılımı göster
         risk_dist = df['Risk_Class'].value_counts().sort_index()
@@ -395,13 +1159,17 @@ SADECE YAYGIN SORUNLARI RAPORLA! Birkaç kişinin söylemesi SORUN DEĞİLDİR."
         """
         Tüm işlem bittikten sonra final dosyayı oluştur
         """
-        df_final = self.merge_with_product_features()
+        with profiler.stage('merge_features') as stage:
+            df_final = self.merge_with_product_features()
+            stage['rows_out'] = None if df_final is None else len(df_final)
         
         if df_final is not None:
             # Risk_Class ekle
-            df_final = self.create_risk_class(df_final)
+            with profiler.stage('risk_class', rows_in=len(df_final)):
+                df_final = self.create_risk_class(df_final)
             
-            df_final.to_csv(final_output_path, index=False, encoding='utf-8-sig')
+            with profiler.stage('save', rows_in=len(df_final)):
+                write_table(df_final, final_output_path, schema=LLM_EXTRACTION_SCHEMA)
             
             print(f"\n💾 Final veri kaydedildi: {final_output_path}")
             print(f"\n📊 TOPLAM ÖZELLİK SAYISI: {len(df_final.columns)}")
@@ -440,27 +1208,55 @@ if __name__ == "__main__":
     
     # Dosya yollarını göreceli olarak oluştur
     RAW_DATA = os.path.join(project_root, 'data', 'raw', 'sample_dataset.csv')
-    PHASE1_DATA = os.path.join(project_root, 'data', 'processed', 'base_metrics.csv')
-    TEMP_OUTPUT = os.path.join(project_root, 'data', 'processed', 'llm_results.csv')
-    FINAL_OUTPUT = os.path.join(project_root, 'data', 'processed', 'llm_extraction.csv')
+    PHASE1_DATA = intermediate_path(project_root, 'base_metrics')
+    TEMP_OUTPUT = intermediate_path(project_root, 'llm_results')
+    FINAL_OUTPUT = intermediate_path(project_root, 'llm_extraction')
+    REVIEW_STORE = os.path.join(project_root, 'data', 'processed', 'review_store')
+    RESPONSE_CACHE = os.path.join(project_root, 'data', 'cache', 'llm_responses')
+    LOCAL_MODEL = os.path.join(project_root, 'data', 'models', 'distilled_labeler.pkl')  # distillation.py
     
     # 1. Sınıfı başlat
     extractor = LLMFeatureExtractor(
         original_csv_path=RAW_DATA,
         product_features_csv_path=PHASE1_DATA,
         output_path=TEMP_OUTPUT,
-        api_key=CLAUDE_API_KEY
+        api_key=CLAUDE_API_KEY,
+        review_store_root=REVIEW_STORE,
+        comment_token_budget=4000,  # yorumlar için tahmini token üst sınırı
+        triage=LexiconTriage(audit_rate=0.05),  # açıkça belli ürünler API'siz (None = kapalı)
+        # Yerel model eğitildiyse emin olduğu ürünler API'siz (None = kapalı)
+        local_model=DistilledLabeler.load(LOCAL_MODEL) if os.path.exists(LOCAL_MODEL) else None,
+        response_cache=ResponseCache(
+            RESPONSE_CACHE,
+            max_bytes=500 * 1024**2,  # 500 MB
+            max_age_days=90
+        )
     )
     
     # 2. LLM ile özellik çıkar
+    #    (gece çalışmaları için: extractor.process_all_products_batch(poll_interval=60))
     extractor.process_all_products(
         max_products=None,  # Hepsini işle
-        delay=1.0
+        delay=1.0,
+        max_concurrency=1,  # Eşzamanlı mod için örn. 8 (+ requests_per_minute / tokens_per_minute)
+        requests_per_minute=None,
+        tokens_per_minute=None,
+        pack_token_budget=None,  # örn. 3000: az yorumlu ürünleri tek istekte paketle
+        refresh_threshold=None,  # örn. 0.2: yorumları %20'den fazla değişen ürünleri yeniden sorgula
+        dead_letter_retries=1  # başarısız ürünler sonda bir tur daha denenir
     )
     
     # 3. Final dosyayı oluştur (Risk_Class ile)
     df_final = extractor.finalize_and_save(FINAL_OUTPUT)
     
+    # LLM çağrı telemetrisi: JSON metrik dosyası + Prometheus textfile
+    metrics_json, metrics_prom = metrics_paths(project_root, 'llm_extraction')
+    extractor.metrics.write_report(metrics_json)
+    extractor.metrics.write_prometheus(metrics_prom)
+    
+    # CHURN_PROFILE=1 ise aşama süre/bellek raporu
+    profiler.write_report(report_path(project_root, 'llm_extraction'))
+    
     print("\n" + "=" * 80)
     print("✅TAMAMLANDI!")
     print("=" * 80)
\ No newline at end of file
@@ -0,0 +1,251 @@
+"""
+==================================================================================
+LLM ÇAĞRI TELEMETRİSİ
+==================================================================================
+Her Messages API çağrısı için:
+- model, kapsadığı ürün sayısı (paketli isteklerde > 1)
+- input / output / cache yazma / cache okuma token sayıları
+- gecikme: başarılı (ya da son) HTTP isteğinin duvar saati süresi
+- bekleme: rate limiter + 429/5xx backoff'ta geçen süre
+- tekrar sayısı ve başarısızlık (tekrarlardan sonra hata ya da şemaya uymayan yanıt)
+
+Çalışma sonunda p50/p95/p99 gecikme, ürün başına token ve tahmini maliyet
+JSON metrik dosyasına ve Prometheus textfile formatına (node_exporter
+textfile collector) yazılır.
+
+Kullanım:
+    metrics = LLMCallMetrics()
+    metrics.record(model, latency_s=0.8, usage=response.usage, retries=1)
+    metrics.write_report(path)
+    metrics.write_prometheus(path)
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+
+TOKEN_FIELDS = ['input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens']
+
+# USD / 1M token: (input, output, cache yazma, cache okuma)
+# Anahtar: tarih eki atılmış TAM model kimliği ('claude-opus-4-5-20251101' → 'claude-opus-4-5').
+# Ön ek eşleşmesi yok: yeni bir sürüm ('claude-opus-4-6') eski sürümün fiyatını sessizce
+# almaz, tabloya eklenene kadar hata verir
+PRICES_PER_MTOK = {
+    'claude-sonnet-4-5': (3.00, 15.00, 3.75, 0.30),
+    'claude-sonnet-4': (3.00, 15.00, 3.75, 0.30),      # claude-sonnet-4-20250514
+    'claude-sonnet-4-0': (3.00, 15.00, 3.75, 0.30),
+    'claude-haiku-4-5': (1.00, 5.00, 1.25, 0.10),
+    'claude-opus-4-5': (5.00, 25.00, 6.25, 0.50),
+    'claude-opus-4-1': (15.00, 75.00, 18.75, 1.50),
+    'claude-opus-4': (15.00, 75.00, 18.75, 1.50),      # claude-opus-4-20250514
+    'claude-opus-4-0': (15.00, 75.00, 18.75, 1.50),
+}
+BATCH_DISCOUNT = 0.5  # Message Batches API fiyatı
+PERCENTILES = (50, 95, 99)
+_DATE_SUFFIX = re.compile(r'-\d{8}$')
+
+
+def model_prices(model, prices=PRICES_PER_MTOK):
+    """
+    Modelin fiyat satırı (tarih eki atılmış kimlikle birebir eşleşme)
+    Raises: ValueError (fiyatı bilinmeyen model: maliyet sessizce 0 ya da yanlış sayılmasın)
+    """
+    key = _DATE_SUFFIX.sub('', str(model))
+    if key not in prices:
+        raise ValueError(f"'{model}' için fiyat tanımlı değil; PRICES_PER_MTOK'a '{key}' ekleyin")
+    return prices[key]
+
+
+def _format_value(value):
+    """Prometheus örnek değeri (tamsayılar olduğu gibi, ondalıklar tam hassasiyetle)"""
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+class LLMCallMetrics:
+    """
+    Thread-safe çağrı kaydedici
+    prices: PRICES_PER_MTOK formatında fiyat tablosu (bilinmeyen model maliyet hesabında hata verir)
+    """
+
+    def __init__(self, prices=PRICES_PER_MTOK):
+        self.prices = prices
+        self.calls = []
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self._lock = threading.Lock()
+
+    def record(self, model, latency_s=None, usage=None, retries=0, wait_s=0.0, products=1,
+               error=None, batch=False):
+        """
+        Bir çağrıyı kaydet
+        usage: yanıtın usage nesnesi (ya da dict); başarısız çağrılarda None
+        latency_s: batch sonuçlarında None (ürün başına gecikme yok)
+        """
+        call = {
+            'model': model,
+            'latency_s': latency_s,
+            'wait_s': wait_s,
+            'retries': retries,
+            'products': products,
+            'error': error,
+            'batch': batch,
+        }
+        for field in TOKEN_FIELDS:
+            value = usage.get(field) if isinstance(usage, dict) else getattr(usage, field, None)
+            call[field] = value or 0
+        with self._lock:
+            self.calls.append(call)
+
+    def cost(self, call):
+        """Çağrının tahmini maliyeti (USD)"""
+        prices = model_prices(call['model'], self.prices)
+        cost = sum(call[field] * price for field, price in zip(TOKEN_FIELDS, prices)) / 1e6
+        return cost * BATCH_DISCOUNT if call['batch'] else cost
+
+    def _summarize(self, calls):
+        latencies = np.array([c['latency_s'] for c in calls if c['latency_s'] is not None and not c['error']])
+        products = sum(c['products'] for c in calls if not c['error'])
+        tokens = {field: sum(c[field] for c in calls) for field in TOKEN_FIELDS}
+        summary = {
+            'calls': len(calls),
+            'errors': sum(bool(c['error']) for c in calls),
+            'retries': sum(c['retries'] for c in calls),
+            'products': products,
+            'tokens': tokens,
+            'tokens_per_product': {field: value / products if products else None
+                                   for field, value in tokens.items()},
+            'latency_s': {f'p{q}': float(np.percentile(latencies, q)) if len(latencies) else None
+                          for q in PERCENTILES},
+            'latency_sum_s': float(latencies.sum()),
+            'latency_count': int(len(latencies)),
+            'wait_s': sum(c['wait_s'] for c in calls),
+            'estimated_cost_usd': sum(self.cost(c) for c in calls),
+        }
+        summary['cost_per_product_usd'] = summary['estimated_cost_usd'] / products if products else None
+        return summary
+
+    def summary(self):
+        """Tüm çağrılar + model bazında özet"""
+        with self._lock:
+            calls = list(self.calls)
+        models = sorted({c['model'] for c in calls})
+        return {
+            **self._summarize(calls),
+            'by_model': {model: self._summarize([c for c in calls if c['model'] == model])
+                         for model in models},
+        }
+
+    def print_summary(self):
+        """Çalışma özeti (hiç çağrı yoksa sessiz)"""
+        summary = self.summary()
+        if summary['calls'] == 0:
+            return summary
+
+        latency = summary['latency_s']
+        per_product = summary['tokens_per_product']
+        print(f"   📈 LLM çağrıları: {summary['calls']} çağrı, {summary['products']} ürün, "
+              f"{summary['retries']} tekrar, {summary['errors']} hata")
+        if latency['p50'] is not None:
+            print(f"   📈 Gecikme: p50 {latency['p50']:.2f}s, p95 {latency['p95']:.2f}s, "
+                  f"p99 {latency['p99']:.2f}s (rate limit/backoff beklemesi {summary['wait_s']:.1f}s)")
+        if summary['products']:
+            print(f"   📈 Ürün başına: {per_product['input_tokens']:.0f} input, "
+                  f"{per_product['output_tokens']:.0f} output, "
+                  f"{per_product['cache_read_input_tokens']:.0f} cache okuma token")
+            print(f"   💵 Tahmini maliyet: ${summary['estimated_cost_usd']:.4f} "
+                  f"(ürün başına ${summary['cost_per_product_usd']:.5f})")
+        return summary
+
+    def report(self):
+        return {
+            'started_at': self.started_at,
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'prices_per_mtok': self.prices,
+            **self.summary(),
+        }
+
+    def write_report(self, path):
+        """JSON metrik dosyasını yaz"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        print(f"📈 LLM metrikleri kaydedildi: {path}")
+        return path
+
+    def prometheus_text(self):
+        """Prometheus text exposition formatı (model etiketli)"""
+        summary = self.summary()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP churn_llm_{name} {help_text}")
+            lines.append(f"# TYPE churn_llm_{name} {kind}")
+            for labels, value in samples:
+                if value is None:
+                    continue
+                label_text = ','.join(f'{key}="{val}"' for key, val in labels.items())
+                lines.append(f"churn_llm_{name}{{{label_text}}} {_format_value(value)}" if label_text
+                             else f"churn_llm_{name} {_format_value(value)}")
+
+        by_model = summary['by_model'].items()
+        metric('calls_total', 'counter', 'Messages API calls',
+               [({'model': m}, s['calls']) for m, s in by_model])
+        metric('call_errors_total', 'counter', 'Calls that failed after all retries or returned invalid output',
+               [({'model': m}, s['errors']) for m, s in by_model])
+        metric('retries_total', 'counter', 'Retries after 429/5xx/connection errors',
+               [({'model': m}, s['retries']) for m, s in by_model])
+        metric('products_total', 'counter', 'Products labelled by the LLM',
+               [({'model': m}, s['products']) for m, s in by_model])
+        metric('tokens_total', 'counter', 'Tokens by type',
+               [({'model': m, 'type': field.replace('_tokens', '')}, s['tokens'][field])
+                for m, s in by_model for field in TOKEN_FIELDS])
+        metric('tokens_per_product', 'gauge', 'Tokens per labelled product by type',
+               [({'model': m, 'type': field.replace('_tokens', '')}, s['tokens_per_product'][field])
+                for m, s in by_model for field in TOKEN_FIELDS])
+        metric('estimated_cost_usd_total', 'counter', 'Estimated cost in USD',
+               [({'model': m}, s['estimated_cost_usd']) for m, s in by_model])
+
+        lines.append("# HELP churn_llm_call_latency_seconds Wall-clock latency of successful calls")
+        lines.append("# TYPE churn_llm_call_latency_seconds summary")
+        for m, s in by_model:
+            for q in PERCENTILES:
+                value = s['latency_s'][f'p{q}']
+                if value is not None:
+                    lines.append(f'churn_llm_call_latency_seconds{{model="{m}",quantile="{q / 100:g}"}} '
+                                 f'{_format_value(value)}')
+            lines.append(f'churn_llm_call_latency_seconds_sum{{model="{m}"}} {_format_value(s["latency_sum_s"])}')
+            lines.append(f'churn_llm_call_latency_seconds_count{{model="{m}"}} {s["latency_count"]}')
+
+        metric('wait_seconds_total', 'counter', 'Time spent waiting on rate limiter and backoff',
+               [({'model': m}, s['wait_s']) for m, s in by_model])
+        metric('last_run_timestamp_seconds', 'gauge', 'Unix time the metrics were written',
+               [({}, time.time())])
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """
+        Textfile collector için yaz (geçici dosya + rename: collector yarım dosya okumaz)
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+        print(f"📈 Prometheus metrikleri kaydedildi: {path}")
+        return path
+
+
+def metrics_paths(project_root, script_name):
+    """
+    (JSON, Prometheus) yolları: outputs/metrics/<script>_<zaman>.json ve
+    outputs/metrics/<script>.prom (CHURN_PROMETHEUS_TEXTFILE ile değiştirilebilir)
+    """
+    metrics_dir = os.path.join(project_root, 'outputs', 'metrics')
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    prom_path = os.environ.get('CHURN_PROMETHEUS_TEXTFILE') or os.path.join(metrics_dir, f'{script_name}.prom')
+    return os.path.join(metrics_dir, f'{script_name}_{timestamp}.json'), prom_path
@@ -0,0 +1,85 @@
+"""
+==================================================================================
+LLM ÇIKTI ŞEMASI VE DOĞRULAMA
+==================================================================================
+Claude'dan beklenen 8 alan, tipleri ve geçerli aralıkları.
+Aynı tanımdan tool-use JSON şeması üretilir (model çıktıyı bu şemaya göre
+verir) ve yanıtlar depoya yazılmadan önce validate_result ile doğrulanır.
+"""
+
+# alan → (tip, min, max); str alanlarda aralık yok
+LLM_FIELDS = {
+    'fitment_problem': (bool, None, None),
+    'fitment_severity': (int, 0, 10),
+    'quality_sentiment': (int, 1, 5),
+    'delivery_issue': (bool, None, None),
+    'color_mismatch': (bool, None, None),
+    'main_complaint': (str, None, None),
+    'fabric_quality_issue': (bool, None, None),
+    # JSON şablonunda 1-5, kural 7'de 0-10 geçiyor → ikisini de kabul et
+    'price_value_perception': (int, 0, 10),
+}
+
+
+TOOL_NAME = 'urun_ozellikleri_kaydet'
+PACKED_TOOL_NAME = 'urunler_ozellikleri_kaydet'
+
+_JSON_TYPES = {bool: 'boolean', int: 'integer', str: 'string'}
+
+
+def field_properties():
+    """8 alanın JSON şeması (tip + aralık)"""
+    properties = {}
+    for field, (field_type, low, high) in LLM_FIELDS.items():
+        prop = {'type': _JSON_TYPES[field_type]}
+        if low is not None:
+            prop.update(minimum=low, maximum=high)
+        properties[field] = prop
+    return properties
+
+
+def tool_definition(packed=False):
+    """
+    Çıktıyı şemaya zorlayan tool tanımı
+    packed=True: birden fazla ürün için {"urunler": [{"urun_id": ..., 8 alan}, ...]}
+    """
+    item = {'type': 'object', 'properties': field_properties(), 'required': list(LLM_FIELDS)}
+    if not packed:
+        return {'name': TOOL_NAME,
+                'description': 'Ürün yorumlarından çıkarılan özellikleri kaydet',
+                'input_schema': item}
+
+    packed_item = {
+        'type': 'object',
+        'properties': {'urun_id': {'type': 'string'}, **item['properties']},
+        'required': ['urun_id', *item['required']],
+    }
+    return {'name': PACKED_TOOL_NAME,
+            'description': 'Her ürün için yorumlardan çıkarılan özellikleri kaydet',
+            'input_schema': {'type': 'object',
+                             'properties': {'urunler': {'type': 'array', 'items': packed_item}},
+                             'required': ['urunler']}}
+
+
+def validate_result(result):
+    """
+    Tek ürün sonucunu doğrula
+    Returns: hata mesajları listesi (boş liste = geçerli)
+    """
+    if not isinstance(result, dict):
+        return [f"sonuç bir JSON nesnesi değil: {type(result).__name__}"]
+
+    errors = []
+    for field, (field_type, low, high) in LLM_FIELDS.items():
+        if field not in result:
+            errors.append(f"{field} eksik")
+            continue
+        value = result[field]
+        # bool, int'in alt sınıfı: tamsayı alanlarda true/false kabul edilmez
+        if field_type is int and (isinstance(value, bool) or not isinstance(value, int)):
+            errors.append(f"{field} tamsayı değil: {value!r}")
+        elif field_type is not int and not isinstance(value, field_type):
+            errors.append(f"{field} {field_type.__name__} değil: {value!r}")
+        elif low is not None and not low <= value <= high:
+            errors.append(f"{field} aralık dışında ({low}-{high}): {value!r}")
+    return errors
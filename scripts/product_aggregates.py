@@ -0,0 +1,265 @@
+"""
+==================================================================================
+BİRLEŞTİRİLEBİLİR ÜRÜN AGREGALARI
+==================================================================================
+Ham yorum dosyası parça parça (chunk) okunurken her ürün için kısmi
+istatistikler tutulur ve sonunda birleştirilir:
+- yorum sayısı ve puan histogramı (1-5)
+- Welford / Chan ortalama & M2 (varyans için)
+- min/max puan ve min/max tarih
+- puan~tarih eğimi için ortalama / M2 / ko-moment
+- son 90 günün ürün × gün yorum sayıları (pencere sayımları için)
+Bellek kullanımı yorum sayısıyla değil ÜRÜN sayısıyla orantılıdır.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+RATING_LEVELS = [1, 2, 3, 4, 5]
+HIST_COLUMNS = [f'Puan_{k}_Sayi' for k in RATING_LEVELS]
+
+# Aktivite pencereleri (gün) - referans: veri setindeki en son yorum tarihi
+ACTIVITY_WINDOWS = [7, 30, 90]
+WINDOW_COLUMNS = [f'Yorum_Son_{w}_Gun' for w in ACTIVITY_WINDOWS]
+
+# Referans tarihe bağlı kolonlar (yeni veri geldikçe TÜM ürünlerde değişir)
+TIME_RELATIVE_COLUMNS = [*WINDOW_COLUMNS, 'Son_Yorumdan_Gun']
+
+
+def to_day_numbers(dates):
+    """datetime64 → epoch'tan itibaren gün sayısı (int64)"""
+    return np.asarray(dates).astype('datetime64[D]').astype(np.int64)
+
+
+class ProductAggregates:
+    """
+    Ürün bazlı yeterli istatistikler (sufficient statistics)
+    table index: Ürün
+    recent: son 90 günün (Ürün, gun) → yorum sayısı tablosu
+    """
+    
+    def __init__(self, table=None, recent=None):
+        self.table = table if table is not None else self._empty_table()
+        self.recent = recent if recent is not None else self._empty_recent()
+    
+    @staticmethod
+    def _empty_table():
+        table = pd.DataFrame(columns=[
+            'Marka', 'Genel_Puan', 'ilk_satir', 'n', 'n_puan', 'ortalama', 'm2',
+            'Min_Puan', 'Max_Puan', *HIST_COLUMNS, 'min_tarih', 'max_tarih',
+            't_ortalama', 't_m2', 'tr_c'
+        ])
+        table.index.name = 'Ürün'
+        return table
+    
+    @staticmethod
+    def _empty_recent():
+        return pd.DataFrame({'Ürün': pd.Series(dtype=object),
+                             'gun': pd.Series(dtype=np.int64),
+                             'sayi': pd.Series(dtype=np.int64)})
+    
+    @classmethod
+    def from_reviews(cls, df, row_offset=0):
+        """
+        Bir yorum parçası (parse edilmiş tarihlerle) için kısmi agregaları hesapla
+        row_offset: parçanın ham dosyadaki başlangıç satırı (ürün sırası için)
+        """
+        df = df[df['Ürün'].notna()]
+        if len(df) == 0:
+            return cls()
+        
+        puan = df['Puan']
+        grouped = df.groupby('Ürün', sort=False)
+        grouped_puan = puan.groupby(df['Ürün'], sort=False)
+        first_rows = grouped.head(1).set_index('Ürün')
+        
+        # Eğim istatistikleri (sadece puanı olan satırlar, t = gün)
+        days = pd.Series(to_day_numbers(df['parsed_date']).astype('float64'), index=df.index)
+        rated = puan.notna()
+        t, r, keys = days[rated], puan[rated].astype('float64'), df.loc[rated, 'Ürün']
+        t_mean = t.groupby(keys, sort=False).mean()
+        r_mean = r.groupby(keys, sort=False).mean()
+        dt = t - t_mean.reindex(keys).to_numpy()
+        dr = r - r_mean.reindex(keys).to_numpy()
+        
+        # Tüm kolonlar ürün index'iyle hizalanır: puansız ürünler eğim gruplarında yok,
+        # ve ilk satırı NaN puanlı ürünlerde puanlı satırların sırası farklı
+        products = grouped.size().index
+        first = ~df['Ürün'].duplicated().to_numpy()
+        
+        table = pd.DataFrame({
+            'Marka': first_rows['Marka'],
+            'Genel_Puan': first_rows['Genel Puan'],
+            'ilk_satir': pd.Series(row_offset + np.flatnonzero(first), index=df.loc[first, 'Ürün'].to_numpy()),
+            'n': grouped.size(),
+            'n_puan': grouped_puan.count(),
+            'ortalama': grouped_puan.mean(),
+            'm2': grouped_puan.var(ddof=0) * grouped_puan.count(),
+            'Min_Puan': grouped_puan.min(),
+            'Max_Puan': grouped_puan.max(),
+            'min_tarih': grouped['parsed_date'].min(),
+            'max_tarih': grouped['parsed_date'].max(),
+            't_ortalama': t_mean.reindex(products),
+            't_m2': (dt ** 2).groupby(keys, sort=False).sum().reindex(products),
+            'tr_c': (dt * dr).groupby(keys, sort=False).sum().reindex(products),
+        }, index=products)
+        table[['t_m2', 'tr_c']] = table[['t_m2', 'tr_c']].fillna(0)
+        
+        histogram = pd.crosstab(df['Ürün'], puan).reindex(columns=RATING_LEVELS, fill_value=0)
+        histogram.columns = HIST_COLUMNS
+        table = table.join(histogram.reindex(table.index, fill_value=0))
+        table.index.name = 'Ürün'
+        
+        recent = (
+            pd.DataFrame({'Ürün': df['Ürün'].to_numpy(), 'gun': days.to_numpy(dtype=np.int64)})
+            .groupby(['Ürün', 'gun'], sort=False).size().rename('sayi').reset_index()
+        )
+        return cls(table, cls._prune_recent(recent))
+    
+    @staticmethod
+    def _prune_recent(recent):
+        """En geniş pencereden eski günleri at (referans tarih sadece ileri gider)"""
+        if len(recent) == 0:
+            return recent
+        return recent[recent['gun'] > recent['gun'].max() - max(ACTIVITY_WINDOWS)].reset_index(drop=True)
+    
+    def merge(self, *others):
+        """
+        Kısmi agregaları birleştir (sıra bağımsız, Chan et al. varyans birleştirme)
+        """
+        parts = [p for p in (self, *others) if len(p.table) > 0]
+        if len(parts) <= 1:
+            return parts[0] if parts else ProductAggregates()
+        
+        stacked = pd.concat([p.table for p in parts]).sort_values('ilk_satir', kind='stable')
+        stacked['_toplam'] = stacked['ortalama'].fillna(0) * stacked['n_puan']
+        stacked['_t_toplam'] = stacked['t_ortalama'].fillna(0) * stacked['n_puan']
+        grouped = stacked.groupby(level='Ürün', sort=False)
+        
+        n_puan = grouped['n_puan'].sum()
+        safe_n = n_puan.replace(0, np.nan)
+        mean = grouped['_toplam'].sum() / safe_n
+        t_mean = grouped['_t_toplam'].sum() / safe_n
+        
+        # M2 = Σ M2_i + Σ n_i (ortalama_i - ortalama)^2  (ko-moment için de aynı mantık)
+        delta = stacked['ortalama'] - mean.reindex(stacked.index)
+        t_delta = stacked['t_ortalama'] - t_mean.reindex(stacked.index)
+        stacked['_sapma'] = (stacked['n_puan'] * delta ** 2).fillna(0)
+        stacked['_t_sapma'] = (stacked['n_puan'] * t_delta ** 2).fillna(0)
+        stacked['_tr_sapma'] = (stacked['n_puan'] * t_delta * delta).fillna(0)
+        corrections = stacked.groupby(level='Ürün', sort=False)[['_sapma', '_t_sapma', '_tr_sapma']].sum()
+        
+        # İlk görülen satırın Marka/Genel_Puan değeri (NaN olsa bile, iloc[0] gibi)
+        merged = stacked.loc[~stacked.index.duplicated(), ['Marka', 'Genel_Puan', 'ilk_satir']].copy()
+        merged['n'] = grouped['n'].sum()
+        merged['n_puan'] = n_puan
+        merged['ortalama'] = mean
+        merged['m2'] = grouped['m2'].sum() + corrections['_sapma']
+        merged['Min_Puan'] = grouped['Min_Puan'].min()
+        merged['Max_Puan'] = grouped['Max_Puan'].max()
+        for col in HIST_COLUMNS:
+            merged[col] = grouped[col].sum()
+        merged['min_tarih'] = grouped['min_tarih'].min()
+        merged['max_tarih'] = grouped['max_tarih'].max()
+        merged['t_ortalama'] = t_mean
+        merged['t_m2'] = grouped['t_m2'].sum() + corrections['_t_sapma']
+        merged['tr_c'] = grouped['tr_c'].sum() + corrections['_tr_sapma']
+        
+        recent = (
+            pd.concat([p.recent for p in parts], ignore_index=True)
+            .groupby(['Ürün', 'gun'], sort=False)['sayi'].sum().reset_index()
+        )
+        return ProductAggregates(merged, self._prune_recent(recent))
+    
+    def subset(self, products):
+        """Sadece verilen ürünlerin agregaları"""
+        return ProductAggregates(
+            self.table.loc[products],
+            self.recent[self.recent['Ürün'].isin(products)]
+        )
+    
+    def to_features(self, reference_date=None):
+        """
+        Agregalardan base_metrics.csv şemasında ürün özellik tablosunu üret
+        reference_date: pencere kolonlarının referansı (varsayılan: en son yorum tarihi)
+        """
+        table = self.table.sort_values('ilk_satir', kind='stable')
+        n = table['n'].to_numpy(dtype='int64')
+        hist = {k: table[f'Puan_{k}_Sayi'].to_numpy(dtype='int64') for k in RATING_LEVELS}
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variance = table['m2'].to_numpy(dtype='float64') / (table['n_puan'].to_numpy() - 1)
+            t_m2 = table['t_m2'].to_numpy(dtype='float64')
+            slope = np.where(t_m2 > 0, table['tr_c'].to_numpy(dtype='float64') / t_m2, np.nan)
+        variance[table['n_puan'].to_numpy() < 2] = np.nan
+        
+        date_range = (table['max_tarih'] - table['min_tarih']).dt.days.to_numpy()
+        if (date_range == 0).all():
+            velocity = n.copy()
+        else:
+            with np.errstate(divide='ignore'):
+                velocity = np.where(date_range == 0, n, n / date_range)
+        
+        if reference_date is None:
+            reference_date = table['max_tarih'].max()
+        reference_day = to_day_numbers(np.datetime64(reference_date, 'D'))
+        
+        age = reference_day - self.recent['gun']
+        windows = {}
+        for w, col in zip(ACTIVITY_WINDOWS, WINDOW_COLUMNS):
+            in_window = self.recent[age.to_numpy() < w]
+            windows[col] = (
+                in_window.groupby('Ürün')['sayi'].sum()
+                .reindex(table.index, fill_value=0).to_numpy(dtype='int64')
+            )
+        
+        return pd.DataFrame({
+            'Ürün': table.index.to_numpy(),
+            'Marka': table['Marka'].to_numpy(),
+            'Genel_Puan': table['Genel_Puan'].to_numpy(dtype='float64'),
+            'Toplam_Yorum_Sayisi': n,
+            'Puan_Standart_Sapma': np.sqrt(variance),
+            'Min_Puan': pd.to_numeric(table['Min_Puan']).to_numpy(),
+            'Max_Puan': pd.to_numeric(table['Max_Puan']).to_numpy(),
+            'Puan_5_Oran': hist[5] / n,
+            'Puan_4_Oran': hist[4] / n,
+            'Puan_3_Oran': hist[3] / n,
+            'Puan_2_Oran': hist[2] / n,
+            'Puan_1_Oran': hist[1] / n,
+            'Negatif_Yorum_Oran': (hist[1] + hist[2]) / n,
+            'Pozitif_Yorum_Oran': (hist[4] + hist[5]) / n,
+            'Yorum_Hizi': velocity,
+            **windows,
+            'Puan_Trend_Egim': slope,
+            'Son_Yorumdan_Gun': (reference_day - to_day_numbers(table['max_tarih'])).astype('int64'),
+        })
+    
+    def save_state(self, path, rows_consumed):
+        """
+        Artımlı mod için durumu kaydet: agregalar + işlenen satır sayısı + tarih watermark
+        """
+        pd.to_pickle({
+            'table': self.table,
+            'recent': self.recent,
+            'rows_consumed': rows_consumed,
+            'watermark': self.date_range[1] if len(self) > 0 else pd.NaT,
+        }, path)
+    
+    @classmethod
+    def load_state(cls, path):
+        """
+        Kayıtlı durumu yükle
+        Returns: (aggregates, rows_consumed, watermark) veya dosya yoksa None
+        """
+        if not os.path.exists(path):
+            return None
+        state = pd.read_pickle(path)
+        return cls(state['table'], state['recent']), state['rows_consumed'], state['watermark']
+    
+    @property
+    def date_range(self):
+        return self.table['min_tarih'].min(), self.table['max_tarih'].max()
+    
+    def __len__(self):
+        return len(self.table)
@@ -0,0 +1,174 @@
+"""
+==================================================================================
+AŞAMA BAZLI PROFİLLEME (OPT-IN)
+==================================================================================
+CHURN_PROFILE=1 ile açılır. Her isimli aşama için:
+- duvar saati (wall) ve CPU süresi: cpu_s aşamayı çalıştıran thread'in CPU'su
+  (eşzamanlı LLM aşamalarında diğer thread'ler sayılmaz), process_cpu_s tüm
+  sürecin CPU'su (worker process'ler hariç, diğer thread'ler dahil)
+- RSS: aşama boyunca anlık RSS değişimi (rss_delta_mb, çağrılar toplamı) ve
+  aşama sonundaki en yüksek RSS (rss_end_mb); süreç ömrü boyunca tepe RSS
+  sadece rapor düzeyinde (peak_rss_mb). CHURN_PROFILE_TRACEMALLOC=1 ise
+  tracemalloc tepe değeri de
+- giren / çıkan satır sayısı
+Aynı isimli aşamalar (örn. ürün başına LLM çağrısı) tek kayıtta toplanır.
+Çalışma sonunda makinece okunabilir tek bir JSON rapor yazılır.
+
+Kullanım:
+    from profiling import profiler
+    with profiler.stage('date_parsing', rows_in=len(df)) as stage:
+        ...
+        stage['rows_out'] = len(df)
+    profiler.write_report(path)
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource  # Windows'ta yok
+except ImportError:
+    resource = None
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KB, macOS: byte
+    return peak / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+
+
+def _current_rss_mb():
+    """Anlık RSS (Linux /proc/self/statm; yoksa None)"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+
+
+class StageProfiler:
+    """
+    Aşama süre / bellek / satır sayısı kaydedici
+    """
+    
+    def __init__(self, enabled=False, trace_memory=False):
+        self.enabled = enabled
+        self.trace_memory = trace_memory and enabled
+        self.stages = {}
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self._run_start = time.perf_counter()
+        self._lock = threading.Lock()  # eşzamanlı LLM çağrıları aynı kaydı günceller
+        
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+    
+    @classmethod
+    def from_env(cls):
+        return cls(
+            enabled=os.environ.get('CHURN_PROFILE') == '1',
+            trace_memory=os.environ.get('CHURN_PROFILE_TRACEMALLOC') == '1'
+        )
+    
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """
+        Bir aşamayı ölç. Dönen dict'e 'rows_out' yazılabilir.
+        """
+        info = {'rows_in': rows_in, 'rows_out': None}
+        if not self.enabled:
+            yield info
+            return
+        
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        rss_start = _current_rss_mb()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        process_cpu_start = time.process_time()
+        try:
+            yield info
+        finally:
+            rss_end = _current_rss_mb()
+            self._record(
+                name,
+                wall_s=time.perf_counter() - wall_start,
+                cpu_s=time.thread_time() - cpu_start,
+                process_cpu_s=time.process_time() - process_cpu_start,
+                rss_delta_mb=rss_end - rss_start if rss_end is not None and rss_start is not None else None,
+                rss_end_mb=rss_end,
+                tracemalloc_peak_mb=(tracemalloc.get_traced_memory()[1] / 1024 ** 2
+                                     if self.trace_memory else None),
+                rows_in=info['rows_in'],
+                rows_out=info['rows_out'],
+            )
+    
+    def _record(self, name, **measurements):
+        with self._lock:
+            self._update(name, **measurements)
+    
+    def _update(self, name, wall_s, cpu_s, process_cpu_s, rss_delta_mb, rss_end_mb,
+                tracemalloc_peak_mb, rows_in, rows_out):
+        record = self.stages.setdefault(name, {
+            'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'process_cpu_s': 0.0, 'max_wall_s': 0.0,
+            'rss_delta_mb': None, 'rss_end_mb': None, 'tracemalloc_peak_mb': None,
+            'rows_in': None, 'rows_out': None,
+        })
+        record['calls'] += 1
+        record['wall_s'] += wall_s
+        record['cpu_s'] += cpu_s
+        record['process_cpu_s'] += process_cpu_s
+        record['max_wall_s'] = max(record['max_wall_s'], wall_s)
+        if rss_delta_mb is not None:
+            record['rss_delta_mb'] = (record['rss_delta_mb'] or 0.0) + rss_delta_mb
+            record['rss_end_mb'] = max(record['rss_end_mb'] or 0.0, rss_end_mb)
+        if tracemalloc_peak_mb is not None:
+            record['tracemalloc_peak_mb'] = max(record['tracemalloc_peak_mb'] or 0.0, tracemalloc_peak_mb)
+        for key, value in (('rows_in', rows_in), ('rows_out', rows_out)):
+            if value is not None:
+                record[key] = (record[key] or 0) + int(value)
+    
+    def report(self):
+        return {
+            'script': os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else None,
+            'started_at': self.started_at,
+            'total_wall_s': time.perf_counter() - self._run_start,
+            'peak_rss_mb': _peak_rss_mb(),
+            'stages': self.stages,
+        }
+    
+    def write_report(self, path):
+        """
+        JSON raporu yaz (profilleme kapalıysa hiçbir şey yapmaz)
+        """
+        if not self.enabled:
+            return None
+        
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        
+        print(f"\n⏱️ Profil raporu kaydedildi: {path}")
+        for name, record in self.stages.items():
+            print(f"   {name:<24} {record['wall_s']:>9.3f}s  (x{record['calls']})")
+        return path
+
+
+def report_path(project_root, script_name):
+    """outputs/profile/<script>_<zaman>.json (CHURN_PROFILE_REPORT ile değiştirilebilir)"""
+    if os.environ.get('CHURN_PROFILE_REPORT'):
+        return os.environ['CHURN_PROFILE_REPORT']
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return os.path.join(project_root, 'outputs', 'profile', f'{script_name}_{timestamp}.json')
+
+
+# Süreç genelinde paylaşılan profiler
+profiler = StageProfiler.from_env()
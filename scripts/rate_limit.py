@@ -0,0 +1,99 @@
+"""
+==================================================================================
+TOKEN-BUCKET HIZ SINIRLAYICI
+==================================================================================
+Eşzamanlı LLM çağrıları için hem istek/dakika hem token/dakika sınırı.
+Thread-safe; kova boşsa acquire() yeterli kapasite dolana kadar bekler.
+429/5xx hataları için jitter'lı üstel bekleme süresi de burada.
+"""
+
+import random
+import threading
+import time
+
+
+# Varsayılan kova kapasitesi: bu kadar saniyelik hız (tam dakikalık kapasite ilk
+# saniyede bir dakikalık isteği/token'ı birden gönderip 429'a yol açar)
+DEFAULT_BURST_SECONDS = 5.0
+# Eksik miktar kayan nokta hatası kadar küçük kaldığında bile saat ilerlesin
+MIN_WAIT_S = 0.001
+
+
+def estimate_tokens(text):
+    """
+    Yaklaşık token sayısı (~4 karakter / token)
+    Hız sınırı ve bütçe hesapları için; gerçek sayım API yanıtındadır
+    """
+    return max(1, len(text) // 4)
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0, retry_after=None, rand=random.random):
+    """
+    attempt. tekrar için bekleme süresi (saniye), "full jitter":
+    uniform(0, min(cap, base * 2^attempt)). Sunucu retry-after verdiyse en az o kadar
+    """
+    delay = min(cap, base * 2 ** attempt) * rand()
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class TokenBucket:
+    """
+    Dakikada rate_per_minute birim dolan, en fazla capacity birim tutan kova
+    capacity varsayılanı DEFAULT_BURST_SECONDS saniyelik hız (en az 1); kova dolu başlar
+    """
+    
+    def __init__(self, rate_per_minute, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate_per_second = rate_per_minute / 60.0
+        if capacity is None:
+            capacity = max(1.0, self.rate_per_second * DEFAULT_BURST_SECONDS)
+        self.capacity = capacity
+        self.tokens = float(self.capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+    
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate_per_second)
+        self._updated_at = now
+    
+    def acquire(self, amount=1):
+        """
+        amount birim harca, yoksa bekle. Kapasiteden büyük istekler kova dolunca geçer
+        ve farkı borç olarak bırakır (sonraki istekler borç ödenene kadar bekler)
+        Returns: toplam bekleme süresi (saniye)
+        """
+        needed = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= needed:
+                    self.tokens -= amount
+                    return waited
+                wait = max(MIN_WAIT_S, (needed - self.tokens) / self.rate_per_second)
+            self._sleep(wait)
+            waited += wait
+
+
+class RateLimiter:
+    """
+    İstek/dakika ve token/dakika kovalarını birlikte uygular (None = sınırsız)
+    """
+    
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+    
+    def acquire(self, tokens=0):
+        waited = 0.0
+        if self.request_bucket:
+            waited += self.request_bucket.acquire(1)
+        if self.token_bucket and tokens:
+            waited += self.token_bucket.acquire(tokens)
+        return waited
@@ -0,0 +1,132 @@
+"""
+==================================================================================
+CLAUDE YANIT ÖNBELLEĞİ (İÇERİK ADRESLİ, DİSKTE)
+==================================================================================
+Anahtar = SHA-256(model + mesajlar + üretim parametreleri). Aynı istek tekrar
+gönderilirse API'ye gidilmeden diskteki yanıt kullanılır; bu sayede
+llm_results kaybolsa veya risk kuralları değişse bile yeniden ödeme yapılmaz.
+
+Dizin yapısı: <cache_dir>/<ilk 2 hex>/<anahtar>.json
+Eviction: oluşturulma zamanı (kayıttaki created_at) max_age_days'ten eski
+kayıtlar silinir, ardından toplam boyut max_bytes'ı aşıyorsa en az yakın
+zamanda kullanılanlar silinir. mtime sadece LRU sırası içindir (okumada
+güncellenir); yaş hesabına girmez, yoksa sık okunan kayıtlar hiç eskimezdi.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class ResponseCache:
+    """
+    Disk üstünde kalıcı yanıt önbelleği (thread-safe sayaçlar)
+    """
+
+    def __init__(self, cache_dir, max_bytes=None, max_age_days=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(request):
+        """İstek sözlüğünden (model, messages, max_tokens, ...) deterministik anahtar"""
+        canonical = json.dumps(request, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _is_expired(self, created_at, now):
+        # created_at'i okunamayan (bozuk) kayıtlar da süresi dolmuş sayılır
+        return self.max_age_days is not None and (
+            created_at is None or now - created_at > self.max_age_days * 86400)
+
+    @staticmethod
+    def _created_at(path):
+        """Kaydın oluşturulma zamanı (okunamazsa None)"""
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f).get('created_at')
+        except (OSError, json.JSONDecodeError, AttributeError):
+            return None
+
+    def get(self, key):
+        """Önbellekteki yanıt metni, yoksa (veya süresi dolmuşsa) None"""
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+            if self._is_expired(entry.get('created_at'), time.time()):
+                raise FileNotFoundError(path)
+            os.utime(path)  # LRU için son kullanım zamanı (yaşı etkilemez)
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry['response']
+
+    def put(self, key, response, request=None):
+        """Yanıtı atomik olarak yaz (önce .tmp, sonra os.replace)"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {'key': key, 'created_at': time.time(), 'request': request, 'response': response}
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.json'):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    yield path, stat.st_mtime, stat.st_size
+
+    def evict(self):
+        """
+        Yaş ve boyut sınırlarını uygula
+        Returns: silinen kayıt sayısı
+        """
+        now = time.time()
+        removed = 0
+        kept = []
+        for path, mtime, size in self._entries():
+            # Yaş sınırı varsa kayıtlar okunur (created_at); yoksa sadece stat
+            if self.max_age_days is not None and self._is_expired(self._created_at(path), now):
+                os.remove(path)
+                removed += 1
+            else:
+                kept.append((mtime, size, path))
+
+        if self.max_bytes is not None:
+            total = sum(size for _, size, _ in kept)
+            # En eski kullanılan önce silinir
+            for mtime, size, path in sorted(kept):
+                if total <= self.max_bytes:
+                    break
+                os.remove(path)
+                total -= size
+                removed += 1
+        return removed
+
+    def stats(self):
+        """Hit/miss sayaçları ve diskteki boyut"""
+        entries = list(self._entries())
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(entries),
+            'size_mb': sum(size for _, _, size in entries) / 1024**2,
+        }
@@ -0,0 +1,137 @@
+"""
+==================================================================================
+LLM SONUÇ DEPOSU (SQLite WAL, APPEND-ONLY)
+==================================================================================
+Her ürünün LLM sonucu tek satırlık bir INSERT ile kalıcı hale gelir; kayıt
+maliyeti O(1) ve işlem yarıda kesilse bile önceki sonuçlar bozulmaz.
+WAL modu sayesinde aynı anda birden fazla thread/süreç güvenle yazabilir.
+
+CSV/Parquet'e dönüştürme (compact) sadece çalışma sonunda yapılır.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from table_io import apply_schema, write_table
+
+
+def _json_default(value):
+    """numpy skalerlerini JSON'a çevrilebilir Python tiplerine indir"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"JSON'a çevrilemeyen tip: {type(value).__name__}")
+
+
+class ResultStore:
+    """
+    Ürün başına bir kayıt tutan SQLite deposu (anahtar: Ürün)
+    Aynı ürün tekrar yazılırsa son kayıt geçerlidir
+    """
+
+    def __init__(self, db_path, timeout=30.0):
+        self.db_path = db_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                product TEXT NOT NULL UNIQUE,
+                payload TEXT NOT NULL
+            )
+        """)
+        conn.commit()
+
+    def _connection(self):
+        """Her thread kendi bağlantısını kullanır (sqlite3 bağlantıları paylaşılamaz)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, record):
+        """Tek bir ürün sonucunu kaydet (record['Ürün'] zorunlu)"""
+        self.append_many([record])
+
+    def append_many(self, records):
+        """Birden fazla sonucu tek transaction'da kaydet"""
+        rows = [
+            (record['Ürün'], json.dumps(record, ensure_ascii=False, default=_json_default))
+            for record in records
+        ]
+        if not rows:
+            return
+        conn = self._connection()
+        with conn:
+            # REPLACE: eski satır silinir, yeni satır sona eklenir
+            conn.executemany(
+                "INSERT OR REPLACE INTO results (product, payload) VALUES (?, ?)", rows
+            )
+
+    def processed_products(self):
+        """Kaydı bulunan ürün isimleri"""
+        cursor = self._connection().execute("SELECT product FROM results")
+        return {row[0] for row in cursor}
+
+    def get(self, product):
+        """Ürünün kaydı (yoksa None)"""
+        row = self._connection().execute(
+            "SELECT payload FROM results WHERE product = ?", (product,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def field_values(self, field):
+        """Ürün → kayıttaki tek bir alanın değeri (alan yoksa None)"""
+        cursor = self._connection().execute(
+            "SELECT product, json_extract(payload, ?) FROM results", (f'$."{field}"',)
+        )
+        return dict(cursor.fetchall())
+
+    def records(self):
+        """Tüm kayıtlar (yazılma sırasıyla)"""
+        cursor = self._connection().execute("SELECT payload FROM results ORDER BY seq")
+        return [json.loads(row[0]) for row in cursor]
+
+    def to_frame(self, schema=None):
+        """Kayıtları DataFrame olarak döndür (schema verilirse kolon sırası ve tipleri ona göre)"""
+        df = pd.DataFrame(self.records())
+        if schema is not None:
+            df = apply_schema(df.reindex(columns=list(schema)), schema)
+        return df
+
+    def compact(self, path, schema):
+        """Tüm kayıtları tek seferde CSV/Parquet tablosuna yaz"""
+        df = self.to_frame(schema)
+        write_table(df, path, schema=schema)
+        return df
+
+    def import_table(self, df):
+        """
+        Eski (CSV/Parquet) sonuç tablosunu depoya aktar
+        Returns: aktarılan satır sayısı
+        """
+        records = [
+            {key: value for key, value in record.items() if not pd.isna(value)}
+            for record in df.to_dict(orient='records')
+        ]
+        self.append_many(records)
+        return len(records)
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM results").fetchone()[0]
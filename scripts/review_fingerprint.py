@@ -0,0 +1,66 @@
+"""
+==================================================================================
+YORUM KÜMESİ PARMAK İZİ (MINHASH)
+==================================================================================
+Her LLM sonucu, üretildiği yorum kümesinin MinHash imzasıyla saklanır.
+İki imzanın eşleşen bileşen oranı, yorum kümelerinin Jaccard benzerliğini
+tahmin eder; 1 - benzerlik = değişim oranı.
+
+Yorumlar çoklu küme olarak ele alınır: aynı metnin k. tekrarı ayrı bir
+eleman sayılır ("kumaşı çok kalitesiz#3"), böylece şablon yorumların
+sayısındaki artış da değişim olarak görünür.
+"""
+
+import hashlib
+from collections import Counter
+
+import numpy as np
+
+from comment_selection import normalize_comment
+
+
+N_HASHES = 64
+_PRIME = np.uint64((1 << 61) - 1)
+_rng = np.random.default_rng(20240601)  # sabit tohum: imzalar çalıştırmalar arasında karşılaştırılabilir
+_A = _rng.integers(1, 1 << 32, size=N_HASHES, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 32, size=N_HASHES, dtype=np.uint64)
+
+
+def _element_hashes(comments):
+    """Yorumları (normalize metin, tekrar sırası) elemanlarına ve 32-bit hash'lere çevir"""
+    seen = Counter()
+    hashes = []
+    for comment in comments:
+        if comment is None or comment != comment or str(comment) == 'HATA':
+            continue
+        text = normalize_comment(comment)
+        seen[text] += 1
+        element = f"{text}#{seen[text]}".encode('utf-8')
+        hashes.append(int.from_bytes(hashlib.blake2b(element, digest_size=4).digest(), 'big'))
+    return np.array(hashes, dtype=np.uint64)
+
+
+def comment_fingerprint(comments):
+    """
+    Yorum listesinin MinHash imzası (N_HASHES × 8 hex karakter)
+    Boş liste için boş string
+    """
+    x = _element_hashes(comments)
+    if len(x) == 0:
+        return ''
+    # (a*x + b) mod p; a, x < 2^32 olduğundan uint64'te taşma olmaz
+    permuted = (_A[:, None] * x[None, :] + _B[:, None]) % _PRIME
+    signature = (permuted.min(axis=1) & np.uint64(0xFFFFFFFF)).astype('>u4')
+    return signature.tobytes().hex()
+
+
+def fingerprint_change(old, new):
+    """
+    İki imza arasındaki tahmini değişim oranı (0 = aynı küme, 1 = tamamen farklı)
+    İmzalardan biri yoksa 1.0
+    """
+    if not old or not new or len(old) != len(new):
+        return 0.0 if old == new else 1.0
+    a = np.frombuffer(bytes.fromhex(old), dtype='>u4')
+    b = np.frombuffer(bytes.fromhex(new), dtype='>u4')
+    return float(np.mean(a != b))
@@ -0,0 +1,74 @@
+"""
+==================================================================================
+KOMPAKT YORUM YÜKLEYİCİ
+==================================================================================
+Ham yorum CSV'sini okur ve bellekte kompakt tiplere çevirir:
+- Tekrar eden metin kolonları (Marka, Ürün, Satıcı, Beden, Tarih) → category
+- "1428 TL" / "78 kg" / "185 cm" → sayısal (float32)
+- Puan → int8
+base_metrics.py ve llm_extraction.py tarafından ortak kullanılır.
+"""
+
+import pandas as pd
+
+CATEGORICAL_COLUMNS = ['Marka', 'Ürün', 'Satıcı', 'Beden', 'Tarih']
+
+# Kolon → (kaldırılacak birim, hedef tip)
+NUMERIC_TEXT_COLUMNS = {
+    'Fiyat': ('TL', 'float32'),
+    'Kilo': ('kg', 'float32'),
+    'Boy': ('cm', 'float32'),
+}
+
+
+def _memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def _parse_numeric_text(values, unit):
+    """
+    "1.428,50 TL" → 1428.5, "78 kg" → 78.0 (Türkçe binlik/ondalık ayracı)
+    """
+    text = values.astype('string').str.replace(unit, '', regex=False).str.strip()
+    # Virgül varsa Türkçe format: nokta binlik, virgül ondalık
+    has_comma = text.str.contains(',', regex=False).fillna(False)
+    text = text.where(~has_comma, text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    return pd.to_numeric(text, errors='coerce')
+
+
+def compact_reviews(df, verbose=True):
+    """
+    Yorum tablosunu kompakt tiplere çevir (yerinde değil, yeni DataFrame döner)
+    """
+    memory_before = _memory_mb(df)
+    df = df.copy()
+    
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    
+    for col, (unit, dtype) in NUMERIC_TEXT_COLUMNS.items():
+        if col not in df.columns:
+            continue
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = _parse_numeric_text(df[col], unit)
+        df[col] = df[col].astype(dtype)
+    
+    if 'Puan' in df.columns:
+        # Eksik puan varsa nullable Int8
+        df['Puan'] = df['Puan'].astype('int8' if df['Puan'].notna().all() else 'Int8')
+    
+    if verbose:
+        memory_after = _memory_mb(df)
+        print(f"🗜️ Bellek: {memory_before:,.1f} MB → {memory_after:,.1f} MB "
+              f"({memory_before / max(memory_after, 1e-9):.1f}x küçültme)")
+    
+    return df
+
+
+def load_reviews(csv_path, compact=True, **read_csv_kwargs):
+    """
+    Ham yorum CSV'sini oku, istenirse kompakt tiplere çevir
+    """
+    df = pd.read_csv(csv_path, encoding='utf-8-sig', **read_csv_kwargs)
+    return compact_reviews(df) if compact else df
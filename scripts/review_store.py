@@ -0,0 +1,185 @@
+"""
+==================================================================================
+BELLEK EŞLEMELİ (MMAP) YORUM DEPOSU
+==================================================================================
+Ham yorum dosyası BİR KEZ okunup tarihleri parse edilir ve ürün + tarih
+sırasına dizilmiş kolon dizileri (.npy) olarak diske yazılır.
+Depo, ham dosyanın içerik hash'i ile anahtarlanır: ham veri değişmedikçe
+Phase 1 ve Phase 2 aynı depoyu anında açar (np.load(mmap_mode='r')).
+
+Dizin yapısı: <store_root>/<sha256[:16]>/
+- manifest.json      : biçim sürümü, ürün isimleri, satır sayısı, kaynak hash
+- product_offsets.npy: ürün i'nin satırları [offsets[i], offsets[i+1])
+- parsed_date.npy    : datetime64[s], ürün içinde YENİDEN ESKİYE
+- puan.npy           : int8, eksik puan MISSING_PUAN (-1)
+- comment_bytes.npy  : tüm yorumlar ardışık UTF-8 byte'lar
+- comment_offsets.npy: yorum j → comment_bytes[off[j]:off[j+1]]
+- comment_missing.npy: eksik (NaN) yorum maskesi
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from review_loader import load_reviews
+from turkish_dates import add_parsed_dates
+
+# LLM'e giden yorum kolonu (yoksa ham 'Yorum' kolonu kullanılır)
+COMMENT_COLUMNS = ['duzeltilmis_yorum', 'Yorum']
+
+ARRAY_NAMES = ['product_offsets', 'parsed_date', 'puan', 'comment_bytes', 'comment_offsets', 'comment_missing']
+
+# Depo biçimi: değişince eski depolar yeniden oluşturulur (2: eksik puan 0 değil -1)
+STORE_VERSION = 2
+MISSING_PUAN = -1
+
+
+def file_content_hash(path, block_size=1 << 20):
+    """Ham dosyanın SHA-256 hash'i (blok blok, dosyayı belleğe almadan)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ReviewStore:
+    """
+    Ürün bazlı dilimlenebilen, salt-okunur, mmap yorum deposu
+    """
+    
+    def __init__(self, store_dir):
+        with open(os.path.join(store_dir, 'manifest.json'), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        
+        self.store_dir = store_dir
+        self.products = self.manifest['products']
+        self.product_index = {name: i for i, name in enumerate(self.products)}
+        
+        arrays = {
+            name: np.load(os.path.join(store_dir, f'{name}.npy'), mmap_mode='r')
+            for name in ARRAY_NAMES
+        }
+        self.product_offsets = arrays['product_offsets']
+        self.parsed_date = arrays['parsed_date']
+        self.puan = arrays['puan']
+        self.comment_bytes = arrays['comment_bytes']
+        self.comment_offsets = arrays['comment_offsets']
+        self.comment_missing = arrays['comment_missing']
+    
+    # ------------------------------------------------------------------
+    # Oluşturma
+    # ------------------------------------------------------------------
+    @classmethod
+    def open_or_build(cls, csv_path, store_root, df_reviews=None):
+        """
+        Ham dosyanın hash'ine ait depo varsa aç, yoksa oluştur
+        df_reviews: tarihleri zaten parse edilmiş yorumlar (Phase 1'den, tekrar okumamak için)
+        """
+        content_hash = file_content_hash(csv_path)
+        store_dir = os.path.join(store_root, content_hash[:16])
+        
+        if cls._is_complete(store_dir):
+            print(f"📦 Yorum deposu bulundu: {store_dir}")
+            return cls(store_dir)
+        
+        if df_reviews is None:
+            df_reviews, _ = add_parsed_dates(load_reviews(csv_path))
+        
+        print(f"📦 Yorum deposu oluşturuluyor: {store_dir}")
+        cls._write(df_reviews, store_dir, content_hash)
+        return cls(store_dir)
+    
+    @staticmethod
+    def _is_complete(store_dir):
+        """Manifest'i yazılmış ve güncel biçimdeki depo (yarım / eski depolar değil)"""
+        try:
+            with open(os.path.join(store_dir, 'manifest.json'), encoding='utf-8') as f:
+                return json.load(f).get('version') == STORE_VERSION
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+    
+    @staticmethod
+    def _write(df, store_dir, content_hash):
+        df = df[df['Ürün'].notna()]
+        comment_column = next(c for c in COMMENT_COLUMNS if c in df.columns)
+        
+        # Ürün (ilk görülme sırası) + tarih (yeniden eskiye) sırası
+        codes, products = pd.factorize(df['Ürün'], sort=False)
+        order = np.lexsort((-df['parsed_date'].to_numpy().astype('datetime64[s]').astype('int64'), codes))
+        counts = np.bincount(codes, minlength=len(products))
+        
+        comments = df[comment_column].to_numpy(dtype=object)[order]
+        missing = pd.isna(comments)
+        encoded = [b'' if m else str(c).encode('utf-8') for c, m in zip(comments, missing)]
+        lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+        
+        arrays = {
+            'product_offsets': np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+            'parsed_date': df['parsed_date'].to_numpy().astype('datetime64[s]')[order],
+            'puan': np.nan_to_num(df['Puan'].to_numpy(dtype='float64', na_value=np.nan)[order],
+                                  nan=MISSING_PUAN).astype(np.int8),
+            'comment_bytes': np.frombuffer(b''.join(encoded), dtype=np.uint8),
+            'comment_offsets': np.concatenate(([0], np.cumsum(lengths))).astype(np.int64),
+            'comment_missing': missing.astype(bool),
+        }
+        
+        # Önce geçici dizine yaz, sonra atomik olarak taşı (yarım depo kalmasın).
+        # Geçici dizin her yazıcıya özel: aynı depoyu eşzamanlı oluşturanlar çakışmaz
+        parent = os.path.dirname(os.path.abspath(store_dir))
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=parent, prefix=f'.{os.path.basename(store_dir)}.', suffix='.tmp')
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp_dir, f'{name}.npy'), array)
+            with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': STORE_VERSION,
+                    'source_sha256': content_hash,
+                    'comment_column': comment_column,
+                    'n_reviews': int(len(order)),
+                    'products': [str(p) for p in products],
+                }, f, ensure_ascii=False)
+            
+            # Manifest'siz (yarım kalmış) ya da eski biçimli depo yerine yazılır;
+            # os.replace dolu bir dizinin üzerine taşıyamaz
+            if os.path.exists(store_dir) and not ReviewStore._is_complete(store_dir):
+                shutil.rmtree(store_dir, ignore_errors=True)
+            try:
+                os.replace(tmp_dir, store_dir)
+            except OSError:
+                # Başka bir yazıcı aynı depoyu az önce tamamladı: onunki kullanılır
+                if not ReviewStore._is_complete(store_dir):
+                    raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    
+    # ------------------------------------------------------------------
+    # Okuma
+    # ------------------------------------------------------------------
+    def product_slice(self, product_name):
+        """Ürünün satır aralığı (yoksa boş aralık)"""
+        i = self.product_index.get(product_name)
+        if i is None:
+            return slice(0, 0)
+        return slice(int(self.product_offsets[i]), int(self.product_offsets[i + 1]))
+    
+    def product_comments(self, product_name, max_comments=100):
+        """
+        Ürünün en güncel max_comments yorumu (eksik yorumlar None)
+        """
+        rows = self.product_slice(product_name)
+        stop = min(rows.stop, rows.start + max_comments)
+        
+        offsets = self.comment_offsets
+        return [
+            None if self.comment_missing[j]
+            else bytes(self.comment_bytes[offsets[j]:offsets[j + 1]]).decode('utf-8')
+            for j in range(rows.start, stop)
+        ]
+    
+    def __len__(self):
+        return int(self.manifest['n_reviews'])
@@ -0,0 +1,118 @@
+"""
+==================================================================================
+RİSK SINIFI KURAL MOTORU (TEK KAYNAK, VEKTÖREL)
+==================================================================================
+Risk_Class ve Risk_Score kuralları tek bir yerde, veri olarak tanımlıdır.
+Aynı motor tüm tabloyu NumPy kolon işlemleriyle, tek bir kaydı (dict) ise
+1 satırlık kolonlar olarak değerlendirir; iki yol asla birbirinden ayrışmaz.
+
+Sınıflar:
+    0 = Healthy
+    1 = Quality Churn     (kalite risk puanı >= QUALITY_CHURN_THRESHOLD)
+    2 = Engagement Churn  (Toplam_Yorum_Sayisi < ENGAGEMENT_MIN_REVIEWS, puan 0)
+
+Eksik değerler (NaN/NA/None) hiçbir koşulu sağlamaz.
+"""
+
+import operator
+
+import numpy as np
+import pandas as pd
+
+
+ENGAGEMENT_MIN_REVIEWS = 5
+QUALITY_CHURN_THRESHOLD = 4
+RISK_CLASSES = (0, 1, 2)
+ENGAGEMENT_CLASS = 2
+
+# Kural grupları: her gruptan İLK eşleşen kuralın puanı eklenir (if/elif)
+# Kural = (puan, [(kolon, operatör, değer), ...])  — koşullar VE ile bağlanır
+QUALITY_RULES = [
+    # Kalıp problemi VAR ve ciddi / sadece VAR
+    [(3, [('fitment_problem', '==', True), ('fitment_severity', '>=', 7)]),
+     (1, [('fitment_problem', '==', True)])],
+    # Kumaş kalitesi problemi VAR
+    [(2, [('fabric_quality_issue', '==', True)])],
+    # LLM kalite algısı düşük
+    [(3, [('quality_sentiment', '<=', 2)]),
+     (1, [('quality_sentiment', '==', 3)])],
+    # Teslimat problemi VAR
+    [(1, [('delivery_issue', '==', True)])],
+]
+
+RULE_COLUMNS = sorted({column for group in QUALITY_RULES for _, conditions in group
+                       for column, _, _ in conditions} | {'Toplam_Yorum_Sayisi'})
+
+_OPERATORS = {'==': operator.eq, '>=': operator.ge, '<=': operator.le,
+              '>': operator.gt, '<': operator.lt}
+
+
+def _numeric_column(data, column, n_rows):
+    """Kolonu float dizisine çevir (bool → 1/0, eksik/anlamsız → NaN)"""
+    if column not in data:
+        return np.full(n_rows, np.nan)
+    values = pd.to_numeric(pd.Series(data[column]), errors='coerce')
+    return values.to_numpy(dtype='float64', na_value=np.nan)
+
+
+def _condition(values, op, value):
+    with np.errstate(invalid='ignore'):
+        return _OPERATORS[op](values, float(value))  # NaN karşılaştırmaları False
+
+
+def score_columns(data, n_rows):
+    """
+    Kolon eşlemesi (DataFrame veya {kolon: dizi}) için risk hesapla
+    Returns: (risk_class, risk_score) int64 dizileri
+    """
+    columns = {column: _numeric_column(data, column, n_rows) for column in RULE_COLUMNS}
+
+    quality_risk = np.zeros(n_rows, dtype=np.int64)
+    for group in QUALITY_RULES:
+        conditions = [
+            np.logical_and.reduce([_condition(columns[column], op, value)
+                                   for column, op, value in rule_conditions])
+            for _, rule_conditions in group
+        ]
+        quality_risk += np.select(conditions, [points for points, _ in group], default=0)
+
+    engagement = _condition(columns['Toplam_Yorum_Sayisi'], '<', ENGAGEMENT_MIN_REVIEWS)
+    risk_class = np.where(engagement, ENGAGEMENT_CLASS, np.where(quality_risk >= QUALITY_CHURN_THRESHOLD, 1, 0))
+    risk_score = np.where(engagement, 0, quality_risk)
+    return risk_class.astype(np.int64), risk_score.astype(np.int64)
+
+
+def score_frame(df):
+    """Tüm tablo için (risk_class, risk_score) dizileri"""
+    return score_columns(df, len(df))
+
+
+def score_record(record):
+    """Tek kayıt (dict) için (risk_class, risk_score)"""
+    risk_class, risk_score = score_columns({key: [value] for key, value in record.items()}, 1)
+    return int(risk_class[0]), int(risk_score[0])
+
+
+def training_mask(sources, risk_class):
+    """
+    Model eğitimine girecek satırlar
+    LLM etiketliler (kaynak eksikse 'llm' sayılır) + Engagement Churn sınıfındaki
+    tüm satırlar: o sınıf sadece yorum sayısından gelir, ön eleme (triage) veya yerel
+    model özellikleri sınıfı değiştirmez. Diğer sınıflarda LLM dışı etiketler tahmindir
+    """
+    from_llm = pd.Series(sources).fillna('llm').to_numpy() == 'llm'
+    risk_class = _numeric_column({'Risk_Class': risk_class}, 'Risk_Class', len(from_llm))
+    return from_llm | _condition(risk_class, '==', ENGAGEMENT_CLASS)
+
+
+def check_class_counts(risk_class, min_count):
+    """
+    Her risk sınıfında en az min_count örnek olduğunu doğrula
+    Raises: ValueError (eksik sınıflar ve sayılarıyla)
+    """
+    counts = pd.Series(np.asarray(risk_class)).value_counts()
+    missing = {cls: int(counts.get(cls, 0)) for cls in RISK_CLASSES if counts.get(cls, 0) < min_count}
+    if missing:
+        detail = ', '.join(f"sınıf {cls}: {count}" for cls, count in missing.items())
+        raise ValueError(f"Eğitim için her sınıfta en az {min_count} ürün gerekli ({detail})")
+    return counts
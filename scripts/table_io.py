@@ -0,0 +1,131 @@
+"""
+==================================================================================
+ARA DOSYA OKUMA/YAZMA (CSV veya PARQUET)
+==================================================================================
+Pipeline ara dosyaları (base_metrics, llm_results, llm_extraction) açık
+şemalarla yazılır/okunur. Parquet'te tipler (boolean LLM kolonları dahil)
+korunur ve sadece istenen kolonlar okunur (projection pushdown).
+Format dosya uzantısından belirlenir: .csv veya .parquet
+"""
+
+import os
+import pandas as pd
+
+# CHURN_INTERMEDIATE_FORMAT=parquet ile tüm ara dosyalar Parquet olur (pyarrow gerekli)
+INTERMEDIATE_FORMAT = os.environ.get('CHURN_INTERMEDIATE_FORMAT', 'csv')
+
+BASE_METRICS_SCHEMA = {
+    'Ürün': 'string',
+    'Marka': 'string',
+    'Genel_Puan': 'float64',
+    'Toplam_Yorum_Sayisi': 'int64',
+    'Puan_Standart_Sapma': 'float64',
+    'Min_Puan': 'Int8',
+    'Max_Puan': 'Int8',
+    'Puan_5_Oran': 'float64',
+    'Puan_4_Oran': 'float64',
+    'Puan_3_Oran': 'float64',
+    'Puan_2_Oran': 'float64',
+    'Puan_1_Oran': 'float64',
+    'Negatif_Yorum_Oran': 'float64',
+    'Pozitif_Yorum_Oran': 'float64',
+    'Yorum_Hizi': 'float64',
+    'Yorum_Son_7_Gun': 'int64',
+    'Yorum_Son_30_Gun': 'int64',
+    'Yorum_Son_90_Gun': 'int64',
+    'Puan_Trend_Egim': 'float64',
+    'Son_Yorumdan_Gun': 'int64',
+}
+
+LLM_FEATURE_SCHEMA = {
+    'fitment_problem': 'boolean',
+    'fitment_severity': 'Int8',
+    'quality_sentiment': 'Int8',
+    'delivery_issue': 'boolean',
+    'color_mismatch': 'boolean',
+    'main_complaint': 'string',
+    'fabric_quality_issue': 'boolean',
+    'price_value_perception': 'Int8',
+}
+
+LLM_RESULTS_SCHEMA = {
+    **LLM_FEATURE_SCHEMA,
+    'Ürün': 'string',
+    'Yorum_Sayisi': 'Int32',
+    'Risk_Class': 'Int8',
+    'Risk_Score': 'Int8',
+    'Etiket_Kaynagi': 'string',  # 'llm', 'triage' (yerel ön eleme) veya 'local_model' (distillation)
+    'Yorum_Parmak_Izi': 'string',  # yorum kümesinin MinHash imzası (yenileme modu için)
+}
+
+LLM_EXTRACTION_SCHEMA = {**BASE_METRICS_SCHEMA, **LLM_RESULTS_SCHEMA}
+
+_BOOL_TEXT = {'true': True, 'false': False, '1': True, '0': False}
+
+
+def intermediate_path(project_root, name):
+    """data/processed/<name>.<csv|parquet>"""
+    return os.path.join(project_root, 'data', 'processed', f'{name}.{INTERMEDIATE_FORMAT}')
+
+
+def _is_parquet(path):
+    return str(path).endswith('.parquet')
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError("Parquet ara dosyaları için 'pyarrow' gerekli: pip install pyarrow") from e
+
+
+def apply_schema(df, schema):
+    """
+    Şemadaki kolonları (varsa) hedef tiplere çevir
+    CSV'den gelen 'True'/'False' metinleri boolean'a çevrilir
+    """
+    df = df.copy()
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if dtype == 'boolean':
+            if not pd.api.types.is_bool_dtype(values):
+                values = values.map(
+                    lambda v: _BOOL_TEXT.get(str(v).strip().lower(), pd.NA) if pd.notna(v) else pd.NA
+                )
+        elif dtype.lower().startswith(('int', 'float')):
+            values = pd.to_numeric(values, errors='coerce')
+            if dtype.startswith('Int'):
+                values = values.round()
+        df[col] = values.astype(dtype)
+    return df
+
+
+def write_table(df, path, schema=None):
+    """
+    Tabloyu uzantıya göre CSV (utf-8-sig) veya Parquet olarak yaz
+    """
+    if schema:
+        df = apply_schema(df, schema)
+    
+    if _is_parquet(path):
+        _require_pyarrow()
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False, encoding='utf-8-sig')
+
+
+def read_table(path, columns=None, schema=None):
+    """
+    Tabloyu oku, sadece istenen kolonları yükle (Parquet'te diskten de sadece onlar okunur)
+    """
+    if _is_parquet(path):
+        _require_pyarrow()
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        df = pd.read_csv(path, encoding='utf-8-sig', usecols=columns, float_precision='round_trip')
+        if columns is not None:
+            df = df[columns]
+    
+    return apply_schema(df, schema) if schema else df
@@ -9,6 +9,9 @@ from imblearn.over_sampling import SMOTE
 import shap
 import warnings
 import os
+from table_io import LLM_EXTRACTION_SCHEMA, intermediate_path, read_table
+from profiling import profiler, report_path
+from risk_rules import check_class_counts, training_mask
 warnings.filterwarnings('ignore')
 
 print("=" * 80)
@@ -20,17 +23,14 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(script_dir)
 
 # Dosya yollarını göreceli olarak oluştur
-data_path = os.path.join(project_root, 'data', 'processed', 'llm_extraction.csv')
+data_path = intermediate_path(project_root, 'llm_extraction')
 output_dir = os.path.join(project_root, 'outputs')
 
 # Output dizini yoksa oluştur
 os.makedirs(output_dir, exist_ok=True)
 
-# Veriyi yükle
-df = pd.read_csv(data_path, encoding='utf-8-sig')
-
-print(f"\n✅ {len(df)} ürün yüklendi")
-print("\n🔧 Özellikler hazırlanıyor...")
+SMOTE_NEIGHBORS = 3
+MIN_CLASS_SAMPLES = 6  # %25 test ayrılınca train'de ≥ SMOTE_NEIGHBORS + 1 kalır
 
 llm_features = [
     'fitment_problem',
@@ -42,19 +42,37 @@ llm_features = [
     'price_value_perception'
 ]
 
-# Boolean'ları int'e çevir
-for col in llm_features:
-    if df[col].dtype == 'bool' or df[col].dtype == 'object':
-        try:
-            if df[col].dtype == 'object':
-                df[col] = df[col].map({'True': 1, 'False': 0, True: 1, False: 0})
-            else:
-                df[col] = df[col].astype(int)
-        except:
-            df[col] = 0
+# Veriyi yükle (sadece gereken kolonlar, şemalı tipler)
+with profiler.stage('load') as stage:
+    df = read_table(
+        data_path,
+        columns=['Ürün', *llm_features, 'Risk_Class', 'Etiket_Kaynagi'],
+        schema=LLM_EXTRACTION_SCHEMA
+    )
+    stage['rows_out'] = len(df)
 
-# NaN doldur
-df[llm_features] = df[llm_features].fillna(0)
+print(f"\n✅ {len(df)} ürün yüklendi")
+
+# Ön eleme (triage) ve yerel model (local_model) özellikleri yorumlardan değil
+# kurallardan/modelden türetilmiş şablon değerler; eğitime girerlerse model
+# Risk_Class'ı üreten kuralı öğrenir. Engagement Churn ise sadece yorum sayısına
+# bağlı, kaynağı ne olursa olsun etiketi kesin: o satırlar kalır (sınıf dağılımı bozulmaz)
+source = df['Etiket_Kaynagi'].fillna('llm')
+keep = training_mask(source, df['Risk_Class'])
+excluded = source[~keep].value_counts()
+df = df[keep].reset_index(drop=True)
+if len(excluded):
+    print(f"   LLM dışı etiketli {excluded.sum()} ürün eğitimden çıkarıldı "
+          f"({', '.join(f'{name}: {count}' for name, count in excluded.items())})")
+
+# Stratify (test'te her sınıftan ≥1) ve SMOTE (train'de k_neighbors + 1) için alt sınır
+class_counts = check_class_counts(df['Risk_Class'].astype(int), MIN_CLASS_SAMPLES)
+print(f"   Sınıf dağılımı: {class_counts.sort_index().to_dict()}")
+print("\n🔧 Özellikler hazırlanıyor...")
+
+# Boolean/nullable kolonları sayıya çevir, NaN doldur
+df[llm_features] = df[llm_features].astype('Float32').fillna(0).astype('float32')
+df['Risk_Class'] = df['Risk_Class'].astype(int)
 
 # X ve y
 X = df[llm_features].copy()
@@ -80,8 +98,10 @@ print(f"   Test:  {len(X_test)} sample")
 # SMOTE
 # ============================================================================
 print(f"\n⚖️ SMOTE uygulanıyor...")
-smote = SMOTE(random_state=42, k_neighbors=3)
-X_train_balanced, y_train_balanced = smote.fit_resample(X_train, y_train)
+smote = SMOTE(random_state=42, k_neighbors=SMOTE_NEIGHBORS)
+with profiler.stage('smote', rows_in=len(X_train)) as stage:
+    X_train_balanced, y_train_balanced = smote.fit_resample(X_train, y_train)
+    stage['rows_out'] = len(X_train_balanced)
 
 print(f"✅ Train size: {len(X_train)} → {len(X_train_balanced)}")
 
@@ -110,7 +130,8 @@ model = XGBClassifier(
     eval_metric='mlogloss'
 )
 
-model.fit(X_train_balanced, y_train_balanced, sample_weight=sample_weights)
+with profiler.stage('fit', rows_in=len(X_train_balanced)):
+    model.fit(X_train_balanced, y_train_balanced, sample_weight=sample_weights)
 print("✅ Model eğitildi!")
 
 # ============================================================================
@@ -119,7 +140,8 @@ print("✅ Model eğitildi!")
 print(f"\n📈 Model Değerlendirmesi:")
 print("=" * 80)
 
-y_pred = model.predict(X_test)
+with profiler.stage('predict', rows_in=len(X_test)):
+    y_pred = model.predict(X_test)
 
 accuracy = accuracy_score(y_test, y_pred)
 f1 = f1_score(y_test, y_pred, average='weighted')
@@ -150,7 +172,8 @@ plt.ylabel('True Label')
 plt.xlabel('Predicted Label')
 plt.tight_layout()
 confusion_matrix_path = os.path.join(output_dir, 'confusion_matrix.png')
-plt.savefig(confusion_matrix_path, dpi=300)
+with profiler.stage('plotting'):
+    plt.savefig(confusion_matrix_path, dpi=300)
 plt.close()
 print(f"\n💾 Confusion matrix kaydedildi: {confusion_matrix_path}")
 
@@ -174,7 +197,8 @@ for i, (bar, val) in enumerate(zip(bars, importance_df['importance'])):
     plt.text(val, i, f' {val:.3f}', va='center', fontsize=9)
 plt.tight_layout()
 feature_importance_path = os.path.join(output_dir, 'feature_importance.png')
-plt.savefig(feature_importance_path, dpi=300)
+with profiler.stage('plotting'):
+    plt.savefig(feature_importance_path, dpi=300)
 plt.close()
 print(f"💾 Feature importance kaydedildi: {feature_importance_path}")
 
@@ -182,8 +206,9 @@ print(f"💾 Feature importance kaydedildi: {feature_importance_path}")
 # SHAP
 # ============================================================================
 print(f"\n🔍 SHAP analizi başlıyor...")
-explainer = shap.TreeExplainer(model)
-shap_values = explainer.shap_values(X_test.head(100))
+with profiler.stage('shap', rows_in=len(X_test.head(100))):
+    explainer = shap.TreeExplainer(model)
+    shap_values = explainer.shap_values(X_test.head(100))
 
 for class_idx, class_name in enumerate(class_names):
     plt.figure(figsize=(12, 8))
@@ -202,7 +227,8 @@ for class_idx, class_name in enumerate(class_names):
     plt.title(f'SHAP - {class_name}', fontsize=16)
     plt.tight_layout()
     shap_path = os.path.join(output_dir, f'shap_{class_idx}_{class_name.replace(" ", "_")}.png')
-    plt.savefig(shap_path, dpi=300)
+    with profiler.stage('plotting'):
+        plt.savefig(shap_path, dpi=300)
     plt.close()
     print(f"   💾 SHAP {class_name} kaydedildi: {shap_path}")
 
@@ -228,4 +254,7 @@ print(f"\n❌ Yanlış Tahmin: {len(wrong)}/{len(results_df)}")
 print("\n" + "=" * 80)
 print(f"\n📌 SONUÇLAR:")
 print(f"   Accuracy: {accuracy:.1%}")
-print(f"   F1-Score: {f1:.1%}")
\ No newline at end of file
+print(f"   F1-Score: {f1:.1%}")
+
+# CHURN_PROFILE=1 ise aşama süre/bellek raporu
+profiler.write_report(report_path(project_root, 'train_model'))
\ No newline at end of file
@@ -0,0 +1,185 @@
+"""
+==================================================================================
+YEREL ÖN ELEME (LEXICON TRIAGE)
+==================================================================================
+Açıkça belli olan ürünler Claude'a gönderilmeden etiketlenir:
+
+- Engagement churn : Toplam_Yorum_Sayisi < ENGAGEMENT_MIN_REVIEWS
+                     (risk kuralları zaten sınıf 2'ye zorlar)
+- Açıkça sağlıklı  : Pozitif_Yorum_Oran > min_positive_ratio VE
+                     hiçbir yorumda Türkçe şikayet kalıbı yok
+
+Geri kalan (belirsiz) ürünler LLM'e gider. Ön elemeyle etiketlenen ürünlerin
+küçük, deterministik bir örneği (audit_rate) yine LLM'e gönderilir ve iki
+etiket karşılaştırılarak uyum oranı raporlanır.
+"""
+
+import hashlib
+import re
+import threading
+
+from comment_selection import normalize_comments
+from risk_rules import ENGAGEMENT_MIN_REVIEWS
+
+
+# Şikayet kalıpları (normalize edilmiş metinde, kelime başından aranır)
+COMPLAINT_PATTERNS = {
+    'fitment_problem': [r'dar(?:\b|dı|acık)', r'bol(?:\b|dü)', r'küçük', r'büyük',
+                        r'kalıb\w* (?:kötü|hatalı|sorunlu)', r'uymadı', r'olmadı'],
+    'fabric_quality_issue': [r'kalitesiz', r'ince\b', r'iç gösteriyor', r'dikiş\w* (?:hatalı|kötü)',
+                             r'tüylen', r'yırtı', r'sökül', r'çekti', r'boya\w* (?:verdi|attı)'],
+    'delivery_issue': [r'geç geldi', r'gecik', r'hasarlı', r'teslimat', r'eksik geldi',
+                       r'yanlış ürün', r'kargo\w* (?:geç|kötü|berbat)'],
+    'color_mismatch': [r'soluk', r'solmuş', r'renk\w* (?:farklı|attı|tutmadı)', r'alakası yok'],
+    'negative': [r'beğenmedim', r'berbat', r'rezalet', r'iade', r'pişman', r'hayal kırıklığı',
+                 r'bir daha almam', r'tavsiye etmiyorum', r'tavsiye etmem', r'yazık', r'maalesef',
+                 r'beklediğim gibi gelmedi', r'kötü', r'hatalı', r'idare eder', r'beklenti'],
+}
+COMPLAINT_TEXT = {
+    'fitment_problem': 'Beden/kalıp uyumsuz',
+    'fabric_quality_issue': 'Kumaş kalitesiz',
+    'delivery_issue': 'Teslimat sorunlu',
+    'color_mismatch': 'Renk görselden farklı',
+}
+FEATURE_FLAGS = list(COMPLAINT_TEXT)
+SHARE_THRESHOLD = 0.20  # prompt'taki %20 kuralı
+
+_COMPILED = {
+    group: re.compile(r'\b(?:' + '|'.join(patterns) + r')')
+    for group, patterns in COMPLAINT_PATTERNS.items()
+}
+
+
+# normalize_comments metninde satır (yorum) başına en fazla bir eşleşme
+_LINE_PATTERNS = {
+    group: re.compile(pattern.pattern + r'[^\n]*')
+    for group, pattern in _COMPILED.items()
+}
+
+
+def complaint_shares(comments):
+    """
+    Her şikayet grubu için kalıp geçen yorumların oranı
+    Returns: {grup: oran}, geçerli yorum sayısı
+    """
+    text, n = normalize_comments(comments)
+    return shares_from_text(text, n), n
+
+
+def shares_from_text(text, n):
+    """complaint_shares, normalize_comments çıktısı üzerinden (metin tekrar normalize edilmez)"""
+    if n == 0:
+        return dict.fromkeys(_COMPILED, 0.0)
+    return {group: len(pattern.findall(text)) / n for group, pattern in _LINE_PATTERNS.items()}
+
+
+class LexiconTriage:
+    """
+    Base metrics + şikayet kalıpları ile API'siz etiketleme
+
+    min_positive_ratio: sağlıklı sayılmak için Pozitif_Yorum_Oran alt sınırı (hariç)
+    max_complaint_share: sağlıklı ürünlerde izin verilen şikayetli yorum oranı
+    audit_rate: ön elemeyle etiketlenip yine de LLM'e sorulacak ürün oranı
+    """
+
+    def __init__(self, min_positive_ratio=0.9, max_complaint_share=0.0, audit_rate=0.05):
+        self.min_positive_ratio = min_positive_ratio
+        self.max_complaint_share = max_complaint_share
+        self.audit_rate = audit_rate
+        self.counts = {'healthy': 0, 'engagement': 0, 'ambiguous': 0, 'skipped': 0}
+        self.audits = []  # (ön eleme etiketi, LLM etiketi)
+        self._lock = threading.Lock()
+
+    def label(self, stats, comments):
+        """
+        Ürünü etiketlemeye çalış
+        stats: ürünün base metrics satırı (dict)
+        Returns: LLM çıktısıyla aynı alanlara sahip dict veya None (belirsiz)
+        """
+        shares, n = complaint_shares(comments)
+        reviews = stats.get('Toplam_Yorum_Sayisi') if stats else None
+        positive = stats.get('Pozitif_Yorum_Oran') if stats else None
+
+        if reviews is not None and reviews < ENGAGEMENT_MIN_REVIEWS:
+            kind, result = 'engagement', self._from_shares(shares, stats)
+        elif (positive is not None and positive > self.min_positive_ratio and n > 0
+              and max(shares.values()) <= self.max_complaint_share):
+            kind, result = 'healthy', self._healthy(positive)
+        else:
+            kind, result = 'ambiguous', None
+
+        with self._lock:
+            self.counts[kind] += 1
+        return result
+
+    @staticmethod
+    def _healthy(positive_ratio):
+        return {
+            'fitment_problem': False,
+            'fitment_severity': 0,
+            'quality_sentiment': 5 if positive_ratio >= 0.95 else 4,
+            'delivery_issue': False,
+            'color_mismatch': False,
+            'main_complaint': 'Genel memnuniyet yüksek',
+            'fabric_quality_issue': False,
+            'price_value_perception': 4,
+        }
+
+    @staticmethod
+    def _from_shares(shares, stats):
+        """Az yorumlu ürünler: %20 kuralını kalıp oranlarına uygula"""
+        flags = {field: shares[field] > SHARE_THRESHOLD for field in FEATURE_FLAGS}
+        complaints = [field for field in FEATURE_FLAGS if flags[field]]
+        mean_rating = stats.get('Genel_Puan') if stats else None
+        if mean_rating is None or mean_rating != mean_rating:
+            mean_rating = 5 - 4 * shares['negative']
+        return {
+            'fitment_problem': flags['fitment_problem'],
+            'fitment_severity': min(10, round(shares['fitment_problem'] * 10)),
+            'quality_sentiment': int(min(5, max(1, round(mean_rating)))),
+            'delivery_issue': flags['delivery_issue'],
+            'color_mismatch': flags['color_mismatch'],
+            'main_complaint': (COMPLAINT_TEXT[max(complaints, key=shares.get)] if complaints
+                               else 'Genel memnuniyet yüksek'),
+            'fabric_quality_issue': flags['fabric_quality_issue'],
+            'price_value_perception': 2 if shares['negative'] > SHARE_THRESHOLD else 4,
+        }
+
+    def should_audit(self, product_name):
+        """Ürün ismine göre deterministik örnekleme (her çalıştırmada aynı ürünler)"""
+        digest = hashlib.sha256(str(product_name).encode('utf-8')).digest()
+        return int.from_bytes(digest[:4], 'big') / 2**32 < self.audit_rate
+
+    def record_skip(self):
+        """Ürün API'ye gitmeden ön eleme etiketiyle kaydedildi"""
+        with self._lock:
+            self.counts['skipped'] += 1
+
+    def record_audit(self, triage_result, llm_result):
+        """Denetim örneği: Risk_Class/Risk_Score içeren iki etiketi sakla"""
+        with self._lock:
+            self.audits.append((triage_result, llm_result))
+
+    def report(self, llm_products):
+        """
+        API tasarrufu ve denetim uyumu
+        llm_products: bu çalışmada LLM'e gönderilen farklı ürün sayısı (HTTP denemeleri,
+        tekrarlar ve paketler değil ürünler; denetim örnekleri dahil)
+        api_call_reduction: ön elemeden geçen ürünlerden LLM'e gitmeyenlerin oranı
+        """
+        triaged = self.counts['healthy'] + self.counts['engagement'] + self.counts['ambiguous']
+        summary = {
+            **self.counts,
+            'triaged': triaged,
+            'llm_products': llm_products,
+            'api_call_reduction': 1 - llm_products / triaged if triaged else 0.0,
+            'audited': len(self.audits),
+        }
+        if self.audits:
+            summary['risk_class_agreement'] = sum(
+                t['Risk_Class'] == l['Risk_Class'] for t, l in self.audits) / len(self.audits)
+            summary['field_agreement'] = {
+                field: sum(bool(t[field]) == bool(l.get(field)) for t, l in self.audits) / len(self.audits)
+                for field in FEATURE_FLAGS
+            }
+        return summary
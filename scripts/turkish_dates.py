@@ -0,0 +1,52 @@
+"""
+==================================================================================
+TÜRKÇE TARİH PARSING (ORTAK MODÜL)
+==================================================================================
+base_metrics.py ve llm_extraction.py tarafından ortak kullanılır.
+Her FARKLI tarih metni sadece BİR KEZ parse edilir, sonuç satırlara dağıtılır.
+"""
+
+import pandas as pd
+
+MONTH_MAPPING = {
+    'Ocak': 'January', 'Şubat': 'February', 'Mart': 'March',
+    'Nisan': 'April', 'Mayıs': 'May', 'Haziran': 'June',
+    'Temmuz': 'July', 'Ağustos': 'August', 'Eylül': 'September',
+    'Ekim': 'October', 'Kasım': 'November', 'Aralık': 'December'
+}
+
+DATE_FORMAT = '%d %B %Y'
+
+
+def parse_turkish_dates(dates):
+    """
+    "10 Şubat 2025" gibi Türkçe tarihleri datetime'a çevir
+    Parse edilemeyen değerler NaT olur
+    """
+    # Lookup tablosu: tekrar eden tarih metinleri tek satıra iner
+    codes, uniques = pd.factorize(dates, sort=False)
+    
+    translated = pd.Series(uniques, dtype='object').astype(str)
+    for tr, en in MONTH_MAPPING.items():
+        translated = translated.str.replace(tr, en, regex=False)
+    
+    parsed_uniques = pd.to_datetime(translated, format=DATE_FORMAT, errors='coerce')
+    
+    # Sonuçları satırlara dağıt (-1 kodu = NaN tarih → NaT)
+    return pd.Series(
+        pd.DatetimeIndex(parsed_uniques).take(codes, allow_fill=True, fill_value=pd.NaT),
+        index=dates.index,
+        name='parsed_date'
+    )
+
+
+def add_parsed_dates(df, date_column='Tarih'):
+    """
+    DataFrame'e 'parsed_date' kolonu ekle ve parse edilemeyen satırları at
+    Returns: (df, dropped_count)
+    """
+    df['parsed_date'] = parse_turkish_dates(df[date_column])
+    
+    before = len(df)
+    df = df.dropna(subset=['parsed_date'])
+    return df, before - len(df)
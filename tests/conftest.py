@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+# scripts/ modülleri birbirini düz isimle import ediyor (paket değil)
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
+
+SAMPLE_DATASET = os.path.join(os.path.dirname(SCRIPTS_DIR), 'data', 'raw', 'sample_dataset.csv')
+
+
+@pytest.fixture
+def sample_reviews():
+    import pandas as pd
+    return pd.read_csv(SAMPLE_DATASET, encoding='utf-8-sig')
+
+
+@pytest.fixture
+def base_metrics_csv(sample_reviews, tmp_path):
+    """Örnek veri setinin Phase 1 çıktısı (LLMFeatureExtractor girdisi)"""
+    from base_metrics import build_product_features
+    from table_io import BASE_METRICS_SCHEMA, write_table
+    from turkish_dates import add_parsed_dates
+
+    parsed, _ = add_parsed_dates(sample_reviews)
+    path = tmp_path / 'base_metrics.csv'
+    write_table(build_product_features(parsed), str(path), schema=BASE_METRICS_SCHEMA)
+    return str(path)
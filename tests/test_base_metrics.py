@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from base_metrics import _exact_group_std, build_product_features
+from review_loader import load_reviews
+from turkish_dates import add_parsed_dates
+from conftest import SAMPLE_DATASET
+
+
+# ============================================================================
+# REFERANS: tek gruplu geçişten önceki ürün başına döngü (baseline)
+# ============================================================================
+MONTH_MAPPING = {
+    'Ocak': 'January', 'Şubat': 'February', 'Mart': 'March',
+    'Nisan': 'April', 'Mayıs': 'May', 'Haziran': 'June',
+    'Temmuz': 'July', 'Ağustos': 'August', 'Eylül': 'September',
+    'Ekim': 'October', 'Kasım': 'November', 'Aralık': 'December'
+}
+
+
+def legacy_parse_dates(df):
+    def convert_date(date_str):
+        if pd.isna(date_str):
+            return None
+        for tr, en in MONTH_MAPPING.items():
+            date_str = date_str.replace(tr, en)
+        try:
+            return pd.to_datetime(date_str, format='%d %B %Y')
+        except Exception:
+            return None
+
+    df = df.copy()
+    df['parsed_date'] = df['Tarih'].apply(convert_date)
+    return df.dropna(subset=['parsed_date'])
+
+
+def legacy_product_features(df):
+    def review_velocity(product_df):
+        date_range = (product_df['parsed_date'].max() - product_df['parsed_date'].min()).days
+        if date_range == 0:
+            return len(product_df)
+        return len(product_df) / date_range
+
+    product_stats = []
+    for product_name in df['Ürün'].unique():
+        product_df = df[df['Ürün'] == product_name].copy()
+        product_stats.append({
+            'Ürün': product_name,
+            'Marka': product_df['Marka'].iloc[0],
+            'Genel_Puan': product_df['Genel Puan'].iloc[0],
+            'Toplam_Yorum_Sayisi': len(product_df),
+            'Puan_Standart_Sapma': product_df['Puan'].std(),
+            'Min_Puan': product_df['Puan'].min(),
+            'Max_Puan': product_df['Puan'].max(),
+            'Puan_5_Oran': (product_df['Puan'] == 5).sum() / len(product_df),
+            'Puan_4_Oran': (product_df['Puan'] == 4).sum() / len(product_df),
+            'Puan_3_Oran': (product_df['Puan'] == 3).sum() / len(product_df),
+            'Puan_2_Oran': (product_df['Puan'] == 2).sum() / len(product_df),
+            'Puan_1_Oran': (product_df['Puan'] == 1).sum() / len(product_df),
+            'Negatif_Yorum_Oran': (product_df['Puan'] <= 2).sum() / len(product_df),
+            'Pozitif_Yorum_Oran': (product_df['Puan'] >= 4).sum() / len(product_df),
+            'Yorum_Hizi': review_velocity(product_df),
+        })
+    return pd.DataFrame(product_stats)
+
+
+LEGACY_COLUMNS = list(legacy_product_features(pd.DataFrame({
+    'Ürün': ['x'], 'Marka': ['m'], 'Genel Puan': [4.0], 'Puan': [5.0],
+    'parsed_date': [pd.Timestamp('2025-01-01')]
+})).columns)
+
+
+def assert_matches_legacy(raw, loaded=None):
+    """loaded: build_product_features'a verilecek (örn. kompakt dtype'lı) aynı veri"""
+    expected = legacy_product_features(legacy_parse_dates(raw))
+    parsed, _ = add_parsed_dates((raw if loaded is None else loaded).copy())
+    actual = build_product_features(parsed)[LEGACY_COLUMNS]
+    text_columns = ['Ürün', 'Marka']
+    pd.testing.assert_frame_equal(
+        actual.astype({col: object for col in text_columns}),
+        expected.astype({col: object for col in text_columns}),
+        check_dtype=False, check_exact=True
+    )
+
+
+# ============================================================================
+# TESTLER
+# ============================================================================
+def test_sample_dataset_matches_legacy(sample_reviews):
+    assert_matches_legacy(sample_reviews)
+
+
+def test_compact_dtypes_match_legacy(sample_reviews):
+    # load_reviews kategorik / küçük tamsayı dtype'ları kullanır (referans ham dtype'larla)
+    assert_matches_legacy(sample_reviews, loaded=load_reviews(SAMPLE_DATASET))
+
+
+def _review(product, rating, date, brand='Marka', overall=4.0):
+    return {'Marka': brand, 'Ürün': product, 'Genel Puan': overall, 'Puan': rating, 'Tarih': date}
+
+
+def test_edge_cases_match_legacy():
+    raw = pd.DataFrame([
+        # Tek yorumlu ürün (std NaN, hız = yorum sayısı)
+        _review('Tek', 5, '3 Mart 2025'),
+        # NaN puanlar: bir kısmı ve tamamı
+        _review('Karisik', np.nan, '1 Ocak 2025'),
+        _review('Karisik', 2, '15 Ocak 2025'),
+        _review('Karisik', 4, '20 Şubat 2025'),
+        _review('Karisik', np.nan, '20 Şubat 2025'),
+        _review('Puansiz', np.nan, '5 Nisan 2025'),
+        _review('Puansiz', np.nan, '9 Nisan 2025'),
+        # Parse edilemeyen tarihler atılır (tüm satırları atılan ürün hiç görünmez)
+        _review('Tarihsiz', 3, 'dün'),
+        _review('Tarihsiz', 1, None),
+        _review('Yarim', 1, '31 Şubat 2025'),
+        _review('Yarim', 2, '10 Mayıs 2025'),
+        _review('Yarim', 5, 'Mayıs 2025'),
+        # Tüm yorumları aynı günde (hız = yorum sayısı)
+        _review('AyniGun', 5, '7 Haziran 2025', brand='Diger', overall=2.5),
+        _review('AyniGun', 1, '7 Haziran 2025', brand='Diger', overall=2.5),
+        _review('Tek', 4, '3 Mart 2025'),
+    ])
+    raw['Puan'] = raw['Puan'].astype('float64')
+    assert_matches_legacy(raw)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_frames_match_legacy(seed):
+    rng = np.random.default_rng(seed)
+    n = 300
+    months = list(MONTH_MAPPING)
+    dates = [f"{d} {months[m]} 2025" for d, m in zip(rng.integers(1, 29, n), rng.integers(0, 12, n))]
+    dates = [date if rng.random() > 0.05 else 'geçersiz' for date in dates]
+    ratings = rng.integers(1, 6, n).astype('float64')
+    ratings[rng.random(n) < 0.1] = np.nan
+    raw = pd.DataFrame({
+        'Marka': [f"M{i % 3}" for i in range(n)],
+        'Ürün': [f"Ürün {i}" for i in rng.integers(0, 40, n)],
+        'Genel Puan': rng.uniform(1, 5, n).round(1),
+        'Puan': ratings,
+        'Tarih': dates,
+    })
+    assert_matches_legacy(raw)
+
+
+def test_exact_group_std_is_bit_identical_to_series_std():
+    # Uzun segmentler (> 128) numpy'nin ikili toplamasında blok sınırlarını da geçer
+    rng = np.random.default_rng(7)
+    counts = rng.integers(1, 600, 300)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    values = rng.choice([1.0, 2.0, 3.0, 4.0, 5.0, np.nan], counts.sum()) * rng.choice([1, 1e-9], counts.sum())
+
+    expected = [pd.Series(chunk).std() for chunk in np.split(values, (starts + counts)[:-1])]
+    np.testing.assert_array_equal(_exact_group_std(values, starts, counts), expected)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from comment_selection import group_comments, normalize_comment, normalize_comments, select_comments
+from rate_limit import estimate_tokens
+
+
+COMMENTS = [
+    'Kumaşı çok kalitesiz',
+    'kumaşı ÇOOOK kalitesiz!!',
+    'Kumaşı çok kalitesiz.',
+    'Beden büyük geldi',
+    'Beden büyük geldi ama güzel',
+    None,
+    np.nan,
+    'HATA',
+    'Harika ürün',
+]
+
+
+def test_exact_duplicates_are_merged_after_normalization():
+    groups = group_comments(COMMENTS, threshold=1.0)
+
+    assert groups == [('Kumaşı çok kalitesiz', 3), ('Beden büyük geldi', 1),
+                      ('Beden büyük geldi ama güzel', 1), ('Harika ürün', 1)]
+
+
+def test_near_duplicates_are_merged_above_threshold():
+    groups = dict(group_comments(COMMENTS, threshold=0.6))
+
+    assert groups['Beden büyük geldi'] == 2
+    assert sum(groups.values()) == 6  # geçersiz yorumlar (None, NaN, 'HATA') sayılmaz
+
+
+def test_normalize_comments_matches_per_comment_normalization():
+    text, n = normalize_comments(COMMENTS)
+
+    valid = [c for c in COMMENTS if isinstance(c, str) and c != 'HATA']
+    assert n == len(valid)
+    assert text.split('\n') == [normalize_comment(c) for c in valid]
+
+
+def test_without_budget_every_group_is_kept():
+    lines, total, omitted = select_comments(COMMENTS, threshold=1.0)
+
+    assert lines[0] == '(×3) Kumaşı çok kalitesiz'
+    assert (total, omitted) == (6, 0)
+
+
+@pytest.mark.parametrize('budget', [0, 5, 8, 12, 20, 1000])
+def test_token_budget_cutoff(budget):
+    lines, total, omitted = select_comments(COMMENTS, token_budget=budget, threshold=1.0)
+
+    used = sum(estimate_tokens(line) + 1 for line in lines)
+    assert used <= budget
+    kept = sum(int(line[2:line.index(')')]) if line.startswith('(×') else 1 for line in lines)
+    assert kept + omitted == total == 6
+
+
+def test_budget_prefers_most_repeated_groups():
+    top_line = '(×3) Kumaşı çok kalitesiz'
+    lines, _, omitted = select_comments(COMMENTS, token_budget=estimate_tokens(top_line) + 1, threshold=1.0)
+
+    assert lines == [top_line]
+    assert omitted == 3
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import SAMPLE_DATASET
+from distillation import DistilledLabeler
+from fake_anthropic_server import FakeAnthropicServer
+from llm_extraction import LLMFeatureExtractor
+from llm_schema import LLM_FIELDS, validate_result
+
+
+FITMENT = ['beden çok büyük geldi', 'kalıbı dar, iade ettim', 'bir beden küçük alın', 'kalıp bol']
+HAPPY = ['harika ürün çok beğendim', 'kumaşı kaliteli, tavsiye ederim', 'tam beklediğim gibi', 'çok şık']
+LABELS = {
+    'fitment': {'fitment_problem': True, 'fitment_severity': 7, 'quality_sentiment': 3,
+                'delivery_issue': False, 'color_mismatch': False, 'main_complaint': 'Beden uyumsuz',
+                'fabric_quality_issue': False, 'price_value_perception': 3},
+    'happy': {'fitment_problem': False, 'fitment_severity': 0, 'quality_sentiment': 5,
+              'delivery_issue': False, 'color_mismatch': False, 'main_complaint': 'Genel memnuniyet yüksek',
+              'fabric_quality_issue': False, 'price_value_perception': 4},
+}
+
+
+def _training_set(n_products=80, seed=0):
+    rng = np.random.default_rng(seed)
+    comment_lists, labels = [], []
+    for i in range(n_products):
+        kind = 'fitment' if i % 2 else 'happy'
+        pool = FITMENT if kind == 'fitment' else HAPPY
+        comment_lists.append(list(rng.choice(pool, size=rng.integers(3, 10))))
+        labels.append(LABELS[kind])
+    return comment_lists, pd.DataFrame(labels)
+
+
+def _extractor(workdir, base_metrics_csv, **kwargs):
+    return LLMFeatureExtractor(original_csv_path=SAMPLE_DATASET, product_features_csv_path=base_metrics_csv,
+                               output_path=str(workdir / 'llm_results.csv'), api_key='test', **kwargs)
+
+
+@pytest.fixture(scope='module')
+def labeler():
+    return DistilledLabeler(confidence_threshold=0.5, n_features=2**12).fit(*_training_set())
+
+
+def test_confident_products_get_valid_llm_format(labeler):
+    result = labeler.label(['beden çok büyük geldi', 'kalıp bol', 'bir beden küçük alın'])
+
+    assert validate_result(result) == []
+    assert {field: result[field] for field in LLM_FIELDS} == LABELS['fitment']
+    assert labeler.counts['labeled'] >= 1
+
+
+def test_defers_to_llm_below_confidence_threshold(labeler):
+    # Eğitimde hiç görülmemiş / karışık yorumlar düşük güven alır
+    products = [['beden çok büyük geldi'] * 4, ['kargo geç geldi', 'renk farklı'],
+                ['harika ürün çok beğendim', 'kalıbı dar, iade ettim']]
+    _, confidence = labeler.predict(products)
+    threshold = float(np.median(confidence))
+
+    strict = DistilledLabeler(confidence_threshold=threshold, n_features=labeler.n_features)
+    strict.heads, strict.frequent_labels = labeler.heads, labeler.frequent_labels
+    results = [strict.label(comments) for comments in products]
+
+    assert [result is None for result in results] == list(confidence < threshold)
+    assert strict.counts == {'labeled': int((confidence >= threshold).sum()),
+                             'fallback': int((confidence < threshold).sum())}
+
+
+def test_threshold_above_one_always_defers(labeler, tmp_path):
+    path = str(tmp_path / 'model.pkl')
+    labeler.save(path)
+    never = DistilledLabeler.load(path, confidence_threshold=1.01)
+
+    assert never.label(['beden çok büyük geldi'] * 5) is None
+    assert never.counts == {'labeled': 0, 'fallback': 1}
+
+
+def test_extractor_sends_only_low_confidence_products_to_llm(sample_reviews, tmp_path, base_metrics_csv):
+    products = set(sample_reviews['Ürün'])
+    local_model = DistilledLabeler(confidence_threshold=1.01, n_features=2**12).fit(*_training_set())
+
+    with FakeAnthropicServer() as server:
+        extractor = _extractor(tmp_path, base_metrics_csv, base_url=server.base_url, local_model=local_model)
+        extractor.process_all_products(delay=0.0)
+
+    # Eşik aşılamaz: her ürün yerel modelden LLM'e düşer
+    assert local_model.counts == {'labeled': 0, 'fallback': len(products)}
+    assert server.message_calls == len(products)
+    assert set(extractor.result_store.field_values('Etiket_Kaynagi').values()) == {'llm'}
+
+    # Eşik 0: hiçbir ürün LLM'e gitmez, kaynak 'local_model'
+    local_model.confidence_threshold = 0.0
+    with FakeAnthropicServer() as server:
+        extractor = _extractor(tmp_path / 'local', base_metrics_csv, base_url=server.base_url,
+                               local_model=local_model)
+        extractor.process_all_products(delay=0.0)
+
+    assert server.message_calls == 0
+    assert extractor.processed_products == products
+    assert set(extractor.result_store.field_values('Etiket_Kaynagi').values()) == {'local_model'}
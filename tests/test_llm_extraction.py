@@ -0,0 +1,252 @@
+import json
+from functools import partial
+
+import anthropic
+import pandas as pd
+import pytest
+
+import llm_extraction
+from conftest import SAMPLE_DATASET
+from fake_anthropic_server import FakeAnthropicServer
+from llm_extraction import SYSTEM_PROMPT_TOKENS, LLMFeatureExtractor, split_batch_requests
+from rate_limit import backoff_delay
+from review_fingerprint import comment_fingerprint, fingerprint_change
+from triage import LexiconTriage
+
+
+def _extractor(tmp_path, base_metrics_csv, **kwargs):
+    return LLMFeatureExtractor(
+        original_csv_path=SAMPLE_DATASET,
+        product_features_csv_path=base_metrics_csv,
+        output_path=str(tmp_path / 'llm_results.csv'),
+        api_key='test',
+        **kwargs
+    )
+
+
+def _comments(extractor, products):
+    return {product: [None if pd.isna(c) else c for c in extractor.extract_product_comments(product)]
+            for product in products}
+
+
+def test_in_memory_index_falls_back_to_raw_comment_column(sample_reviews, tmp_path, base_metrics_csv):
+    # Örnek veri setinde 'duzeltilmis_yorum' yok: ReviewStore gibi 'Yorum'a düşülmeli
+    assert 'duzeltilmis_yorum' not in sample_reviews.columns
+    products = sample_reviews['Ürün'].unique()
+
+    in_memory = _extractor(tmp_path, base_metrics_csv)
+    from_store = _extractor(tmp_path, base_metrics_csv, review_store_root=str(tmp_path / 'store'))
+
+    assert _comments(in_memory, products) == _comments(from_store, products)
+    assert all(_comments(in_memory, products).values())
+
+
+def test_concurrent_run_survives_rate_limits(monkeypatch, sample_reviews, tmp_path, base_metrics_csv):
+    # Testi hızlı tutmak için bekleme tabanı küçültülür; sunucunun retry-after'ı yine uygulanır
+    monkeypatch.setattr(llm_extraction, 'backoff_delay', partial(backoff_delay, base=0.01))
+    products = set(sample_reviews['Ürün'])
+
+    with FakeAnthropicServer(rate_limit_rate=0.3, retry_after=0.01, seed=3) as server:
+        extractor = _extractor(tmp_path, base_metrics_csv, base_url=server.base_url, max_retries=10)
+        extractor.process_all_products(delay=0.0, max_concurrency=8,
+                                       requests_per_minute=6000, tokens_per_minute=10_000_000)
+
+    assert server.rate_limited > 0
+    assert extractor.retries == server.rate_limited
+    assert not extractor.dead_letters
+    assert extractor.processed_products == products
+
+
+def test_split_batch_requests_respects_count_and_size_limits():
+    entries = [{'custom_id': f"urun-{i:06d}", 'params': {'text': 'ş' * (i % 7 * 50)}} for i in range(40)]
+
+    by_count = split_batch_requests(entries, max_requests=16)
+    assert [len(chunk) for chunk in by_count] == [16, 16, 8]
+
+    max_bytes = 2000
+    by_size = split_batch_requests(entries, max_bytes=max_bytes)
+    assert len(by_size) > 1
+    assert [entry for chunk in by_size for entry in chunk] == entries
+    for chunk in by_size:
+        assert len(json.dumps({'requests': chunk})) <= max_bytes
+        assert len(json.dumps({'requests': chunk}, ensure_ascii=False).encode('utf-8')) <= max_bytes
+
+
+@pytest.mark.parametrize('max_batch_requests, n_batches', [(100_000, 1), (8, 3)])
+def test_batch_mode_submits_polls_and_merges_all_batches(sample_reviews, tmp_path, base_metrics_csv,
+                                                         max_batch_requests, n_batches):
+    products = set(sample_reviews['Ürün'])
+    state_path = tmp_path / 'batch.json'
+
+    with FakeAnthropicServer(batch_delay=0.2, max_batch_requests=max_batch_requests) as server:
+        extractor = _extractor(tmp_path, base_metrics_csv, base_url=server.base_url)
+        extractor.process_all_products_batch(poll_interval=0.05, batch_state_path=str(state_path),
+                                             max_batch_requests=max_batch_requests)
+
+    assert len(server.batches) == n_batches
+    assert server.batch_requests == len(products)
+    assert extractor.processed_products == products
+    assert not state_path.exists()
+
+
+def test_batch_over_the_limit_is_rejected_by_fake_server(tmp_path, base_metrics_csv):
+    state_path = tmp_path / 'batch.json'
+
+    with FakeAnthropicServer(max_batch_requests=8) as server:
+        extractor = _extractor(tmp_path, base_metrics_csv, base_url=server.base_url)
+        with pytest.raises(anthropic.BadRequestError):
+            extractor.process_all_products_batch(poll_interval=0.05, batch_state_path=str(state_path))
+
+    assert not server.batches
+    assert not state_path.exists()
+
+
+def test_batch_mode_resumes_every_submitted_batch(sample_reviews, tmp_path, base_metrics_csv):
+    state_path = tmp_path / 'batch.json'
+
+    with FakeAnthropicServer(batch_delay=0.2) as server:
+        submitter = _extractor(tmp_path, base_metrics_csv, base_url=server.base_url)
+        submitter._submit_batch(None, 'claude-sonnet-4-5-20250929', str(state_path), max_batch_requests=6)
+        state = json.loads(state_path.read_text(encoding='utf-8'))
+        assert state['batch_ids'] == list(server.batches)
+        assert len(state['batch_ids']) == 4
+
+        # Yoklama yarıda kesildi: yeni süreç durum dosyasından tüm batch'leri bekler
+        resumed = _extractor(tmp_path, base_metrics_csv, base_url=server.base_url)
+        resumed.process_all_products_batch(poll_interval=0.05, batch_state_path=str(state_path))
+
+    assert len(server.batches) == 4
+    assert resumed.processed_products == set(sample_reviews['Ürün'])
+
+
+def test_static_instructions_live_in_the_cached_system_prefix(sample_reviews, tmp_path, base_metrics_csv):
+    products = sample_reviews['Ürün'].unique()[:2]
+    extractor = _extractor(tmp_path, base_metrics_csv)
+    requests = [extractor._build_request(extractor.create_llm_prompt(extractor.extract_product_comments(p)),
+                                         'claude-sonnet-4-5-20250929') for p in products]
+
+    # Sistem bloğu ürünler arasında birebir aynı ve cache_control ile işaretli
+    assert requests[0]['system'] == requests[1]['system']
+    assert requests[0]['system'][0]['cache_control'] == {'type': 'ephemeral'}
+    # Kullanıcı mesajı sadece ürüne özel yorumları taşır, kuralları tekrar etmez
+    for request in requests:
+        prompt = request['messages'][0]['content']
+        assert prompt.startswith('YORUMLAR (toplam ')
+        assert 'KRİTİK KURALLAR' not in prompt
+    assert requests[0]['messages'] != requests[1]['messages']
+
+
+def test_system_prefix_is_read_from_prompt_cache_after_first_call(sample_reviews, tmp_path, base_metrics_csv):
+    with FakeAnthropicServer() as server:
+        extractor = _extractor(tmp_path, base_metrics_csv, base_url=server.base_url)
+        extractor.process_all_products(max_products=3, delay=0.0)
+
+    usage = extractor.token_usage
+    assert usage['cache_creation_input_tokens'] == SYSTEM_PROMPT_TOKENS
+    assert usage['cache_read_input_tokens'] == 2 * SYSTEM_PROMPT_TOKENS
+
+
+def test_refresh_requeries_only_products_changed_above_threshold(sample_reviews, tmp_path, base_metrics_csv):
+    extractor = _extractor(tmp_path, base_metrics_csv)
+    unchanged, changed, slightly, legacy = sample_reviews['Ürün'].unique()[:4]
+
+    def stored(product, comments):
+        extractor.result_store.append({'Ürün': product, 'Yorum_Parmak_Izi': comment_fingerprint(comments)})
+
+    comments = {p: list(extractor.extract_product_comments(p)) for p in (unchanged, changed, slightly)}
+    stored(unchanged, comments[unchanged])
+    stored(changed, [f"eski yorum {i}" for i in range(len(comments[changed]))])
+    stored(slightly, comments[slightly] + ['kaldırılan tek yorum'])
+    extractor.result_store.append({'Ürün': legacy})  # parmak izi olmayan eski kayıt
+
+    threshold = 0.5
+    assert fingerprint_change(extractor.result_store.get(slightly)['Yorum_Parmak_Izi'],
+                              comment_fingerprint(comments[slightly])) <= threshold
+    assert extractor._changed_products(threshold) == [changed]
+    # Eski kayda mevcut parmak izi eklenir ama yeniden sorgulanmaz
+    assert extractor.result_store.get(legacy)['Yorum_Parmak_Izi'] == \
+        comment_fingerprint(extractor.extract_product_comments(legacy))
+    assert extractor._changed_products(threshold) == [changed]
+
+
+VALID_ANSWER = {'fitment_problem': False, 'fitment_severity': 0, 'quality_sentiment': 4,
+                'delivery_issue': False, 'color_mismatch': False, 'main_complaint': 'Genel memnuniyet yüksek',
+                'fabric_quality_issue': False, 'price_value_perception': 4}
+
+
+def _scripted_llm(monkeypatch, extractor, packed_response):
+    """_call_llm yerine: paket çağrısı packed_response'u döner (istisna ise fırlatır), tekil çağrılar geçerli yanıt"""
+    calls = []
+
+    def call_llm(prompt, rate_limiter=None, max_tokens=1024, packed=False, products=1, **kwargs):
+        calls.append('packed' if packed else 'single')
+        if not packed:
+            return dict(VALID_ANSWER)
+        if isinstance(packed_response, Exception):
+            raise packed_response
+        return packed_response
+
+    monkeypatch.setattr(extractor, '_call_llm', call_llm)
+    return calls
+
+
+def test_partial_pack_response_retries_only_failed_products(monkeypatch, sample_reviews, tmp_path, base_metrics_csv):
+    extractor = _extractor(tmp_path, base_metrics_csv)
+    products = sample_reviews['Ürün'].unique()[:4]
+    entries = [(p, extractor.extract_product_comments(p)) for p in products]
+    calls = _scripted_llm(monkeypatch, extractor, [
+        {'urun_id': 'U1', **VALID_ANSWER},
+        {'urun_id': 'U2', **VALID_ANSWER, 'quality_sentiment': 9},  # aralık dışı
+        {'urun_id': 'U9', **VALID_ANSWER},                          # bilinmeyen kimlik
+        'bozuk eleman',
+        {'urun_id': 'U4', **{k: v for k, v in VALID_ANSWER.items() if k != 'main_complaint'}},  # eksik alan
+    ])  # U3 hiç yok
+
+    assert extractor._process_pack(entries) == 4
+
+    assert calls == ['packed', 'single', 'single', 'single']
+    assert extractor.pack_retries == 3
+    assert extractor.processed_products == set(products)
+    assert extractor.result_store.get(products[1])['quality_sentiment'] == 4
+
+
+def test_failed_pack_call_falls_back_to_every_product(monkeypatch, sample_reviews, tmp_path, base_metrics_csv):
+    extractor = _extractor(tmp_path, base_metrics_csv)
+    products = sample_reviews['Ürün'].unique()[:3]
+    entries = [(p, extractor.extract_product_comments(p)) for p in products]
+    calls = _scripted_llm(monkeypatch, extractor, llm_extraction.LLMCallError("paket yanıtı ürün listesi içermiyor"))
+
+    assert extractor._process_pack(entries) == 3
+
+    assert calls == ['packed'] + ['single'] * 3
+    assert extractor.pack_retries == 3
+    assert not extractor.dead_letters
+    assert extractor.processed_products == set(products)
+
+
+def test_triage_reduction_counts_products_not_http_attempts(monkeypatch, sample_reviews, tmp_path, base_metrics_csv):
+    monkeypatch.setattr(llm_extraction, 'backoff_delay', partial(backoff_delay, base=0.01))
+    products = set(sample_reviews['Ürün'])
+    triage = LexiconTriage(audit_rate=0.0)
+
+    with FakeAnthropicServer(rate_limit_rate=0.3, retry_after=0.01, seed=5) as server:
+        extractor = _extractor(tmp_path, base_metrics_csv, base_url=server.base_url, triage=triage,
+                               max_retries=10)
+        extractor.process_all_products(delay=0.0, pack_token_budget=2000)
+
+    summary = triage.report(len(extractor.llm_products))
+    assert summary['triaged'] == len(products)
+    assert summary['llm_products'] == len(products) - summary['skipped'] == triage.counts['ambiguous']
+    # 429 tekrarları HTTP denemelerini artırır ama tasarruf oranını değiştirmez
+    assert extractor.api_calls == server.rate_limited + server.message_calls
+    assert extractor.retries > 0
+    assert summary['api_call_reduction'] == pytest.approx(summary['skipped'] / len(products))
+
+
+def test_unknown_model_fails_before_any_api_call(tmp_path, base_metrics_csv):
+    with FakeAnthropicServer() as server:
+        extractor = _extractor(tmp_path, base_metrics_csv, base_url=server.base_url)
+        with pytest.raises(ValueError, match='claude-opus-4-6'):
+            extractor.call_llm_api('YORUMLAR (toplam 1 yorum):\n- güzel', model='claude-opus-4-6')
+
+    assert server.message_calls == 0
@@ -0,0 +1,43 @@
+import pytest
+
+from llm_metrics import PRICES_PER_MTOK, LLMCallMetrics, model_prices
+
+
+@pytest.mark.parametrize('model, key', [
+    ('claude-sonnet-4-5-20250929', 'claude-sonnet-4-5'),
+    ('claude-sonnet-4-5', 'claude-sonnet-4-5'),
+    ('claude-sonnet-4-20250514', 'claude-sonnet-4'),
+    ('claude-haiku-4-5-20251001', 'claude-haiku-4-5'),
+    ('claude-opus-4-5-20251101', 'claude-opus-4-5'),
+    ('claude-opus-4-1-20250805', 'claude-opus-4-1'),
+    ('claude-opus-4-20250514', 'claude-opus-4'),
+])
+def test_prices_are_keyed_by_exact_model_id(model, key):
+    assert model_prices(model) == PRICES_PER_MTOK[key]
+
+
+def test_newer_opus_does_not_get_the_old_opus_price():
+    assert model_prices('claude-opus-4-5-20251101')[:2] == (5.00, 25.00)
+    assert model_prices('claude-opus-4-1')[:2] == (15.00, 75.00)
+
+
+@pytest.mark.parametrize('model', ['claude-opus-4-6', 'claude-sonnet-4-7-20260101', 'claude-opus', 'fake-model'])
+def test_unknown_model_fails_loudly(model):
+    with pytest.raises(ValueError, match='PRICES_PER_MTOK'):
+        model_prices(model)
+
+    metrics = LLMCallMetrics()
+    metrics.record(model, latency_s=0.1, usage={'input_tokens': 10, 'output_tokens': 5})
+    with pytest.raises(ValueError):
+        metrics.summary()
+
+
+def test_cost_uses_token_prices_and_batch_discount():
+    metrics = LLMCallMetrics()
+    usage = {'input_tokens': 1_000_000, 'output_tokens': 100_000,
+             'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 2_000_000}
+    metrics.record('claude-opus-4-5-20251101', latency_s=1.0, usage=usage)
+    metrics.record('claude-opus-4-5-20251101', usage=usage, batch=True)
+
+    assert metrics.cost(metrics.calls[0]) == pytest.approx(5.00 + 2.50 + 1.00)
+    assert metrics.summary()['estimated_cost_usd'] == pytest.approx(1.5 * 8.50)
@@ -0,0 +1,66 @@
+import pytest
+
+from llm_schema import LLM_FIELDS, tool_definition, validate_result
+
+
+VALID = {
+    'fitment_problem': True,
+    'fitment_severity': 7,
+    'quality_sentiment': 4,
+    'delivery_issue': False,
+    'color_mismatch': False,
+    'main_complaint': 'Beden büyük geliyor',
+    'fabric_quality_issue': False,
+    'price_value_perception': 3,
+}
+
+
+def test_valid_result_has_no_errors():
+    assert validate_result(VALID) == []
+    # Sınır değerleri dahil
+    assert validate_result({**VALID, 'fitment_severity': 0, 'quality_sentiment': 5,
+                            'price_value_perception': 10}) == []
+
+
+@pytest.mark.parametrize('field, value', [
+    ('fitment_severity', -1),
+    ('fitment_severity', 11),
+    ('quality_sentiment', 0),
+    ('quality_sentiment', 6),
+    ('price_value_perception', 11),
+])
+def test_out_of_range_values_are_rejected(field, value):
+    assert validate_result({**VALID, field: value}) == [f"{field} aralık dışında "
+                                                        f"({LLM_FIELDS[field][1]}-{LLM_FIELDS[field][2]}): {value!r}"]
+
+
+@pytest.mark.parametrize('field', list(LLM_FIELDS))
+def test_missing_field_is_rejected(field):
+    result = {key: value for key, value in VALID.items() if key != field}
+    assert validate_result(result) == [f"{field} eksik"]
+
+
+@pytest.mark.parametrize('field, value', [
+    ('fitment_severity', True),   # bool, int'in alt sınıfı ama kabul edilmez
+    ('quality_sentiment', 4.0),
+    ('quality_sentiment', '4'),
+    ('fitment_problem', 'true'),
+    ('main_complaint', None),
+])
+def test_wrong_types_are_rejected(field, value):
+    errors = validate_result({**VALID, field: value})
+    assert len(errors) == 1 and errors[0].startswith(field)
+
+
+def test_every_problem_is_reported():
+    errors = validate_result({'fitment_severity': 42})
+    assert len(errors) == len(LLM_FIELDS)
+    assert validate_result(['not', 'a', 'dict']) == ["sonuç bir JSON nesnesi değil: list"]
+
+
+@pytest.mark.parametrize('packed', [False, True])
+def test_tool_schema_requires_every_field_with_ranges(packed):
+    schema = tool_definition(packed)['input_schema']
+    item = schema['properties']['urunler']['items'] if packed else schema
+    assert set(LLM_FIELDS) <= set(item['required'])
+    assert item['properties']['quality_sentiment'] == {'type': 'integer', 'minimum': 1, 'maximum': 5}
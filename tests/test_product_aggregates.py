@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from base_metrics import LeakFreeProductPreparator
+
+
+def _features(csv_path, **kwargs):
+    preparator = LeakFreeProductPreparator(str(csv_path), **kwargs)
+    preparator.parse_turkish_dates()
+    preparator.create_product_features()
+    return _comparable(preparator.product_features)
+
+
+def _comparable(frame):
+    """Bellek içi mod kompakt dtype'lar (category) kullanır; değerler karşılaştırılır"""
+    frame = frame.reset_index(drop=True)
+    text_columns = [col for col in frame.columns if not pd.api.types.is_numeric_dtype(frame[col])]
+    return frame.astype({col: object for col in text_columns})
+
+
+@pytest.fixture
+def reviews_with_missing_ratings(sample_reviews, tmp_path):
+    """İlk satırının puanı NaN olan ürünler (puanlı satır sırası ≠ ilk görülme sırası)"""
+    df = sample_reviews.copy()
+    df['Puan'] = df['Puan'].astype('float64')
+    first_rows = df.drop_duplicates(subset='Ürün').index
+    df.loc[first_rows[[1, 4, 7]], 'Puan'] = np.nan
+    # Hiç puanı olmayan ürün de olsun
+    df.loc[df['Ürün'] == df.loc[first_rows[10], 'Ürün'], 'Puan'] = np.nan
+    path = tmp_path / 'reviews.csv'
+    df.to_csv(path, index=False, encoding='utf-8-sig')
+    return path
+
+
+@pytest.mark.parametrize('chunksize', [50, 7])
+def test_chunked_matches_in_memory_with_missing_ratings(reviews_with_missing_ratings, chunksize):
+    expected = _features(reviews_with_missing_ratings)
+    chunked = _features(reviews_with_missing_ratings, chunksize=chunksize)
+    pd.testing.assert_frame_equal(chunked, expected, check_dtype=False, rtol=1e-9)
+
+
+def test_incremental_matches_in_memory_with_missing_ratings(reviews_with_missing_ratings, tmp_path):
+    expected = _features(reviews_with_missing_ratings)
+    state_path = str(tmp_path / 'state.pkl')
+    output_path = str(tmp_path / 'base_metrics.csv')
+    preparator = LeakFreeProductPreparator(str(reviews_with_missing_ratings), chunksize=50, state_path=state_path)
+    preparator.parse_turkish_dates()
+    preparator.create_product_features()
+    saved = _comparable(preparator.save_processed_data(output_path))
+    pd.testing.assert_frame_equal(saved, expected, check_dtype=False, rtol=1e-9)
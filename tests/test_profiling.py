@@ -0,0 +1,44 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from profiling import StageProfiler, _current_rss_mb
+
+
+def test_stage_cpu_excludes_other_threads():
+    profiler = StageProfiler(enabled=True)
+    stop = threading.Event()
+
+    def burn():
+        while not stop.is_set():
+            sum(range(10_000))
+
+    worker = threading.Thread(target=burn)
+    worker.start()
+    try:
+        with profiler.stage('bekleme'):
+            time.sleep(0.3)
+    finally:
+        stop.set()
+        worker.join()
+
+    record = profiler.stages['bekleme']
+    assert record['cpu_s'] < 0.05
+    assert record['process_cpu_s'] > 0.1
+
+
+@pytest.mark.skipif(_current_rss_mb() is None, reason="/proc/self/statm yok")
+def test_stage_rss_is_per_stage():
+    profiler = StageProfiler(enabled=True)
+    with profiler.stage('buyuk'):
+        block = np.ones(64 * 1024 ** 2 // 8)  # 64 MB, sayfalar dokunulmuş
+    del block
+    with profiler.stage('kucuk'):
+        small = np.ones(1024)
+
+    # Süreç tepe değeri değil: büyük aşamadan sonraki aşama kendi değişimini raporlar
+    assert profiler.stages['buyuk']['rss_delta_mb'] > 50
+    assert abs(profiler.stages['kucuk']['rss_delta_mb']) < 10
+    assert small.sum() == 1024
@@ -0,0 +1,96 @@
+import random
+
+import pytest
+
+from rate_limit import DEFAULT_BURST_SECONDS, MIN_WAIT_S, RateLimiter, TokenBucket, backoff_delay
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_initial_burst_is_capped():
+    clock = FakeClock()
+    bucket = TokenBucket(600, clock=clock, sleep=clock.sleep)  # 10/s
+
+    # Başlangıçta sadece DEFAULT_BURST_SECONDS saniyelik istek geçer, bir dakikalık değil
+    waits = [bucket.acquire(1) for _ in range(100)]
+    burst = waits.index(next(w for w in waits if w > 0))
+    assert burst == int(10 * DEFAULT_BURST_SECONDS)
+
+    # Sonrası saniyede 10 istek: 1000 istek ≈ kapasite + 95 saniye (saat hep ilerler)
+    clock.now = 0.0
+    bucket = TokenBucket(600, clock=clock, sleep=clock.sleep)
+    for _ in range(1000):
+        bucket.acquire(1)
+    assert clock.now == pytest.approx((1000 - 10 * DEFAULT_BURST_SECONDS) / 10, abs=0.5)
+
+
+def test_small_rates_allow_one_request():
+    clock = FakeClock()
+    bucket = TokenBucket(6, clock=clock, sleep=clock.sleep)  # 0.1/s → kapasite en az 1
+    assert bucket.acquire(1) == 0
+    assert bucket.acquire(1) == pytest.approx(10.0)
+
+
+def test_request_larger_than_capacity_leaves_debt():
+    clock = FakeClock()
+    bucket = TokenBucket(60_000, clock=clock, sleep=clock.sleep)  # 1000 token/s, kapasite 5000
+
+    assert bucket.acquire(8000) == 0  # kova dolu: geçer, 3000 token borç
+    # Sonraki küçük istek borç + kendisi kadar bekler
+    assert bucket.acquire(1000) == pytest.approx(4.0)
+
+
+def test_debt_is_paid_before_later_requests():
+    clock = FakeClock()
+    bucket = TokenBucket(60, capacity=10, clock=clock, sleep=clock.sleep)  # 1/s
+
+    assert bucket.acquire(25) == 0  # kova dolu (10): geçer, 15 borç
+    assert bucket.tokens == pytest.approx(-15)
+    # Borçlu kovada kapasiteden büyük istek de önce kovanın dolmasını bekler
+    assert bucket.acquire(25) == pytest.approx(25.0)
+    assert bucket.acquire(1) == pytest.approx(16.0)
+
+
+def test_wait_never_smaller_than_minimum():
+    clock = FakeClock()
+    clock.now = 1e6  # büyük saat değerinde 1e-17'lik adımlar kaybolur
+    bucket = TokenBucket(600, capacity=1, clock=clock, sleep=clock.sleep)
+    bucket.tokens = 1 - 1e-15
+    start = clock.now
+    assert bucket.acquire(1) >= MIN_WAIT_S
+    assert clock.now > start
+
+
+def test_rate_limiter_keeps_configured_rates():
+    limiter = RateLimiter(requests_per_minute=120, tokens_per_minute=60_000)
+    assert (limiter.requests_per_minute, limiter.tokens_per_minute) == (120, 60_000)
+    assert limiter.request_bucket.capacity == pytest.approx(10)  # 5 s'lik patlama
+
+
+@pytest.mark.parametrize('attempt', range(8))
+def test_backoff_full_jitter_bounds(attempt):
+    ceiling = min(60.0, 2 ** attempt)
+    assert backoff_delay(attempt, rand=lambda: 0.0) == 0.0
+    assert backoff_delay(attempt, rand=lambda: 0.999999) == pytest.approx(ceiling, rel=1e-5)
+
+    rng = random.Random(attempt)
+    delays = [backoff_delay(attempt, rand=rng.random) for _ in range(500)]
+    assert all(0.0 <= delay < ceiling for delay in delays)
+    assert len(set(delays)) == len(delays)  # jitter: tekrarlar aynı anda uyanmaz
+
+
+def test_backoff_respects_cap_and_retry_after():
+    assert backoff_delay(20, rand=lambda: 0.5) == pytest.approx(30.0)
+    assert backoff_delay(20, base=0.5, cap=4.0, rand=lambda: 1.0) == pytest.approx(4.0)
+    # Sunucunun retry-after değeri alt sınırdır
+    assert backoff_delay(0, retry_after=7.5, rand=lambda: 0.1) == 7.5
+    assert backoff_delay(5, retry_after=2.0, rand=lambda: 0.5) == pytest.approx(16.0)
@@ -0,0 +1,44 @@
+import json
+import os
+import time
+
+from response_cache import ResponseCache
+
+
+def _age(cache, key, days):
+    """Kaydı days gün önce oluşturulmuş gibi yeniden yaz (mtime şimdi kalır)"""
+    cache.put(key, 'yanıt')
+    path = cache._path(key)
+    with open(path, encoding='utf-8') as f:
+        entry = json.load(f)
+    entry['created_at'] = time.time() - days * 86400
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(entry, f)
+    return path
+
+
+def test_read_entries_still_expire_by_creation_time(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_age_days=7)
+    old = _age(cache, 'aa' * 32, days=10)
+    fresh = _age(cache, 'bb' * 32, days=1)
+
+    # Okuma mtime'ı yeniler ama yaşı değiştirmez
+    assert cache.get('aa' * 32) is None
+    assert cache.get('bb' * 32) == 'yanıt'
+    assert cache.evict() == 1
+    assert not os.path.exists(old) and os.path.exists(fresh)
+
+
+def test_size_eviction_uses_last_access_order(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    keys = [c * 64 for c in 'abc']
+    for i, key in enumerate(keys):
+        cache.put(key, 'x' * 100)
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+    cache.get(keys[0])  # en eski yazılan ama en son kullanılan
+    # created_at'in ondalık hane sayısı değişebilir: kayıt boyutları tek tek ölçülür
+    cache.max_bytes = sum(os.path.getsize(cache._path(key)) for key in (keys[0], keys[2]))
+
+    assert cache.evict() == 1
+    assert cache.get(keys[0]) is not None
+    assert not os.path.exists(cache._path(keys[1]))
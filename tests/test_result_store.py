@@ -0,0 +1,73 @@
+import multiprocessing
+import os
+import threading
+
+import numpy as np
+
+from result_store import ResultStore
+
+
+def _record(writer, i):
+    return {'Ürün': f"ürün-{writer}-{i}", 'quality_sentiment': np.int64(i % 5 + 1), 'Yazan': writer}
+
+
+def _write_records(db_path, writer, n):
+    store = ResultStore(db_path)
+    for i in range(n):
+        store.append(_record(writer, i))
+    store.close()
+
+
+def _write_then_crash(db_path, n):
+    # Süreç bağlantıyı kapatmadan ve temizlik yapmadan ölür (kill -9 benzeri)
+    store = ResultStore(db_path)
+    for i in range(n):
+        store.append(_record('crash', i))
+    os._exit(1)
+
+
+def test_concurrent_thread_writers(tmp_path):
+    store = ResultStore(str(tmp_path / 'results.db'))
+    threads = [threading.Thread(target=lambda w=w: [store.append(_record(w, i)) for i in range(50)])
+               for w in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(store) == 400
+    assert store.processed_products() == {f"ürün-{w}-{i}" for w in range(8) for i in range(50)}
+
+
+def test_concurrent_process_writers(tmp_path):
+    db_path = str(tmp_path / 'results.db')
+    ResultStore(db_path).close()
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=_write_records, args=(db_path, w, 100)) for w in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+
+    assert [process.exitcode for process in processes] == [0] * 4
+    store = ResultStore(db_path)
+    assert len(store) == 400
+    assert store.get('ürün-3-99') == {'Ürün': 'ürün-3-99', 'quality_sentiment': 5, 'Yazan': 3}
+
+
+def test_resume_after_crash(tmp_path):
+    db_path = str(tmp_path / 'results.db')
+    process = multiprocessing.get_context('fork').Process(target=_write_then_crash, args=(db_path, 30))
+    process.start()
+    process.join(timeout=60)
+    assert process.exitcode == 1
+
+    # Yeniden açılan depo çökmeden önce yazılan tüm kayıtları görür ve yazmaya devam eder
+    store = ResultStore(db_path)
+    assert store.processed_products() == {f"ürün-crash-{i}" for i in range(30)}
+    store.append({'Ürün': 'ürün-crash-0', 'quality_sentiment': 1, 'Yazan': 'resume'})
+    store.append(_record('resume', 0))
+
+    assert len(store) == 31
+    assert store.get('ürün-crash-0')['Yazan'] == 'resume'  # son kayıt geçerli
+    assert [record['Ürün'] for record in store.records()][-2:] == ['ürün-crash-0', 'ürün-resume-0']
@@ -0,0 +1,47 @@
+import pytest
+
+from review_fingerprint import N_HASHES, comment_fingerprint, fingerprint_change
+
+
+COMMENTS = [f"yorum {i}: kumaş {'iyi' if i % 2 else 'ince'}, beden {i % 7}" for i in range(100)]
+
+
+def test_identical_sets_do_not_change():
+    old = comment_fingerprint(COMMENTS)
+    assert len(old) == N_HASHES * 8
+    assert fingerprint_change(old, comment_fingerprint(list(reversed(COMMENTS)))) == 0.0
+    # Normalizasyon farkları (büyük harf, boşluk, noktalama, geçersiz yorum) değişim sayılmaz
+    noisy = [c.replace('yorum', 'YORUM').replace(' ', '  ') + '!!' for c in COMMENTS] + [None, float('nan'), 'HATA']
+    assert fingerprint_change(old, comment_fingerprint(noisy)) == 0.0
+
+
+@pytest.mark.parametrize('n_replaced', [10, 50, 90])
+def test_change_estimates_jaccard_distance(n_replaced):
+    new = COMMENTS[n_replaced:] + [f"yeni yorum {i}" for i in range(n_replaced)]
+    kept = len(COMMENTS) - n_replaced
+    expected = 1 - kept / (len(COMMENTS) + n_replaced)
+
+    change = fingerprint_change(comment_fingerprint(COMMENTS), comment_fingerprint(new))
+    assert change == pytest.approx(expected, abs=0.2)  # 64 hash: std ≈ 0.06
+
+
+def test_repeated_template_comments_count_as_change():
+    base = ['kumaşı çok kalitesiz'] * 5 + COMMENTS[:5]
+    more = ['kumaşı çok kalitesiz'] * 15 + COMMENTS[:5]
+    assert fingerprint_change(comment_fingerprint(base), comment_fingerprint(more)) > 0.2
+
+
+def test_missing_signatures():
+    assert comment_fingerprint([]) == ''
+    assert fingerprint_change('', '') == 0.0
+    assert fingerprint_change('', comment_fingerprint(COMMENTS)) == 1.0
+    assert fingerprint_change(comment_fingerprint(COMMENTS), None) == 1.0
+
+
+def test_threshold_separates_small_and_large_changes():
+    old = comment_fingerprint(COMMENTS)
+    small = comment_fingerprint(COMMENTS + ['yeni yorum'])
+    large = comment_fingerprint(COMMENTS[:30] + [f"yeni yorum {i}" for i in range(70)])
+
+    threshold = 0.3
+    assert fingerprint_change(old, small) <= threshold < fingerprint_change(old, large)
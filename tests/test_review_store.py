@@ -0,0 +1,85 @@
+import json
+import multiprocessing
+import os
+
+import numpy as np
+import pandas as pd
+
+from review_store import MISSING_PUAN, STORE_VERSION, ReviewStore, file_content_hash
+
+
+def _reviews_csv(tmp_path):
+    df = pd.DataFrame({
+        'Ürün': ['A', 'A', 'B', 'B', 'B'],
+        'Yorum': ['güzel', None, 'dar geldi', 'kumaş ince', 'iade'],
+        'Puan': [5, np.nan, 2, 0, 1],
+        'Tarih': ['1 Ocak 2024', '2 Ocak 2024', '3 Şubat 2024', '4 Şubat 2024', '5 Şubat 2024'],
+    })
+    path = tmp_path / 'reviews.csv'
+    df.to_csv(path, index=False, encoding='utf-8-sig')
+    return str(path)
+
+
+def _store_dir(csv_path, root):
+    return os.path.join(root, file_content_hash(csv_path)[:16])
+
+
+def _open(csv_path, root):
+    return ReviewStore.open_or_build(csv_path, root)
+
+
+def test_missing_rating_is_not_stored_as_zero(tmp_path):
+    store = ReviewStore.open_or_build(_reviews_csv(tmp_path), str(tmp_path / 'store'))
+
+    # Ürün içinde yeniden eskiye: A = [eksik, 5], B = [1, 0, 2]
+    assert store.puan[store.product_slice('A')].tolist() == [MISSING_PUAN, 5]
+    assert store.puan[store.product_slice('B')].tolist() == [1, 0, 2]
+    assert store.product_comments('A') == [None, 'güzel']
+
+
+def test_directory_without_manifest_is_rebuilt(tmp_path):
+    csv_path, root = _reviews_csv(tmp_path), str(tmp_path / 'store')
+    store_dir = _store_dir(csv_path, root)
+    os.makedirs(store_dir)
+    with open(os.path.join(store_dir, 'puan.npy'), 'wb') as f:
+        f.write(b'partial write')
+
+    store = ReviewStore.open_or_build(csv_path, root)
+
+    assert store.manifest['version'] == STORE_VERSION
+    assert len(store) == 5
+    assert sorted(os.listdir(root)) == [os.path.basename(store_dir)]  # geçici dizin kalmadı
+
+
+def test_old_format_store_is_rebuilt(tmp_path):
+    csv_path, root = _reviews_csv(tmp_path), str(tmp_path / 'store')
+    store_dir = _store_dir(csv_path, root)
+    ReviewStore.open_or_build(csv_path, root)
+    manifest_path = os.path.join(store_dir, 'manifest.json')
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    del manifest['version']  # eksik puanı 0 yazan eski biçim
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    np.save(os.path.join(store_dir, 'puan.npy'), np.zeros(5, dtype=np.int8))
+
+    store = ReviewStore.open_or_build(csv_path, root)
+
+    assert store.manifest['version'] == STORE_VERSION
+    assert MISSING_PUAN in store.puan
+
+
+def test_concurrent_builders_share_one_complete_store(tmp_path):
+    csv_path, root = _reviews_csv(tmp_path), str(tmp_path / 'store')
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=_open, args=(csv_path, root)) for _ in range(6)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+
+    assert [process.exitcode for process in processes] == [0] * 6
+    assert os.listdir(root) == [os.path.basename(_store_dir(csv_path, root))]
+    store = ReviewStore(_store_dir(csv_path, root))
+    assert store.products == ['A', 'B']
+    assert store.product_comments('B') == ['iade', 'kumaş ince', 'dar geldi']
@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from risk_rules import check_class_counts, score_frame, score_record, training_mask
+
+
+# ============================================================================
+# REFERANS: vektörel motordan önceki satır bazlı kurallar (baseline)
+# ============================================================================
+def legacy_classify_row(row):
+    """create_risk_class içindeki classify_product"""
+    if row['Toplam_Yorum_Sayisi'] < 5:
+        return 2, 0
+
+    quality_risk = 0
+    if row['fitment_problem'] == True and row['fitment_severity'] >= 7:
+        quality_risk += 3
+    elif row['fitment_problem'] == True:
+        quality_risk += 1
+    if row['fabric_quality_issue'] == True:
+        quality_risk += 2
+    if row['quality_sentiment'] <= 2:
+        quality_risk += 3
+    elif row['quality_sentiment'] == 3:
+        quality_risk += 1
+    if row['delivery_issue'] == True:
+        quality_risk += 1
+
+    if quality_risk >= 4:
+        return 1, quality_risk
+    return 0, quality_risk
+
+
+def legacy_create_risk_class(df):
+    """Eski create_risk_class: NA → NaN, satır satır apply"""
+    rows = df.astype(object).where(df.notna(), np.nan)
+    results = rows.apply(legacy_classify_row, axis=1)
+    return results.apply(lambda x: x[0]).to_numpy(), results.apply(lambda x: x[1]).to_numpy()
+
+
+def legacy_calculate_risk_class(row_dict, toplam_yorum):
+    """Eski _calculate_risk_class (Toplam_Yorum_Sayisi ürün tablosundan gelir)"""
+    if toplam_yorum < 5:
+        return 2, 0
+
+    quality_risk = 0
+    if row_dict.get('fitment_problem') == True and row_dict.get('fitment_severity', 0) >= 7:
+        quality_risk += 3
+    elif row_dict.get('fitment_problem') == True:
+        quality_risk += 1
+    if row_dict.get('fabric_quality_issue') == True:
+        quality_risk += 2
+    quality_sentiment = row_dict.get('quality_sentiment', 5)
+    if quality_sentiment <= 2:
+        quality_risk += 3
+    elif quality_sentiment == 3:
+        quality_risk += 1
+    if row_dict.get('delivery_issue') == True:
+        quality_risk += 1
+
+    if quality_risk >= 4:
+        return 1, quality_risk
+    return 0, quality_risk
+
+
+# Her eşiğin iki yanı ve eksik değerler
+BOUNDARY_VALUES = {
+    'Toplam_Yorum_Sayisi': [np.nan, 0, 4, 5, 6, 250],
+    'fitment_problem': [True, False, np.nan],
+    'fitment_severity': [np.nan, 0, 6, 7, 8, 10],
+    'fabric_quality_issue': [True, False, np.nan],
+    'quality_sentiment': [np.nan, 1, 2, 3, 4, 5],
+    'delivery_issue': [True, False, np.nan],
+}
+NULLABLE_DTYPES = {
+    'Toplam_Yorum_Sayisi': 'Int64', 'fitment_problem': 'boolean', 'fitment_severity': 'Int64',
+    'fabric_quality_issue': 'boolean', 'quality_sentiment': 'Int64', 'delivery_issue': 'boolean',
+}
+
+
+def random_frame(rng, n_rows):
+    return pd.DataFrame({
+        column: [values[i] for i in rng.integers(0, len(values), n_rows)]
+        for column, values in BOUNDARY_VALUES.items()
+    })
+
+
+# ============================================================================
+# TESTLER
+# ============================================================================
+@pytest.mark.parametrize('seed', range(50))
+@pytest.mark.parametrize('nullable', [False, True])
+def test_score_frame_matches_legacy(seed, nullable):
+    rng = np.random.default_rng(seed)
+    df = random_frame(rng, int(rng.integers(1, 80)))
+    if nullable:
+        # llm_results nullable dtype'larla okunur (NA)
+        df = df.astype(NULLABLE_DTYPES)
+
+    expected_class, expected_score = legacy_create_risk_class(df)
+    risk_class, risk_score = score_frame(df)
+    np.testing.assert_array_equal(risk_class, expected_class)
+    np.testing.assert_array_equal(risk_score, expected_score)
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_score_record_matches_legacy(seed):
+    rng = np.random.default_rng(seed)
+    df = random_frame(rng, 40)
+    # Toplam_Yorum_Sayisi ürün tablosundan gelir (eksikse kayıt zaten skorlanmaz)
+    df['Toplam_Yorum_Sayisi'] = rng.choice([0, 4, 5, 6, 250], size=len(df))
+    for record in df.to_dict('records'):
+        toplam_yorum = record.pop('Toplam_Yorum_Sayisi')
+        # Eksik anahtarlar: eski kod varsayılan değer kullanırdı
+        for key in list(record):
+            if rng.random() < 0.15:
+                del record[key]
+        expected = legacy_calculate_risk_class(record, toplam_yorum)
+        assert score_record({**record, 'Toplam_Yorum_Sayisi': toplam_yorum}) == expected
+
+
+def test_score_record_matches_score_frame():
+    rng = np.random.default_rng(0)
+    df = random_frame(rng, 500)
+    risk_class, risk_score = score_frame(df)
+    records = [score_record(record) for record in df.to_dict('records')]
+    assert records == list(zip(risk_class.tolist(), risk_score.tolist()))
+
+
+def test_training_mask_keeps_engagement_rows_from_any_source():
+    sources = pd.Series(['llm', None, 'triage', 'triage', 'local_model', 'local_model'], dtype='string')
+    risk_class = pd.array([1, 0, 0, 2, 1, 2], dtype='Int64')
+
+    mask = training_mask(sources, risk_class)
+
+    assert mask.tolist() == [True, True, False, True, False, True]
+
+
+def test_training_mask_treats_missing_class_as_not_engagement():
+    mask = training_mask(['triage', 'llm'], pd.array([None, None], dtype='Int64'))
+    assert mask.tolist() == [False, True]
+
+
+def test_check_class_counts_reports_short_classes():
+    counts = check_class_counts([0] * 6 + [1] * 7 + [2] * 6, min_count=6)
+    assert counts.to_dict() == {0: 6, 1: 7, 2: 6}
+
+    with pytest.raises(ValueError, match=r"sınıf 1: 2, sınıf 2: 0"):
+        check_class_counts([0] * 6 + [1] * 2, min_count=6)